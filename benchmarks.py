@@ -0,0 +1,420 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+    Benchmarks for tree-graph-labeling
+    ~~~~~~~~~~~~~~~~~~~
+
+    Times the stages of the labeling pipeline on different tree families.
+
+    The results can be written into a JSON file, and two result files can be compared to find the regressions:
+
+        python benchmarks.py --json new.json
+        python benchmarks.py --compare old.json new.json
+
+    :copyright: 2017, Dénes Bartha
+    :license: MIT, see LICENSE for more details
+    :email: denesb@gmail.com
+    :maintainer: Dénes Bartha
+"""
+import argparse
+import itertools
+import json
+import platform
+import random
+import sys
+import time
+
+import tree_labeling
+
+
+def path_tree(n):
+    """Returns the pre-order traversal of a path with n nodes (rooted at one of its ends)."""
+    return range(n)
+
+
+def star_tree(n):
+    """Returns the pre-order traversal of a star with n nodes."""
+    return [0] + [1] * (n - 1)
+
+
+def caterpillar_tree(n):
+    """Returns the pre-order traversal of a caterpillar with n nodes (every node of the spine has one leaf)."""
+    lst = []
+    while len(lst) < n:
+        d = len(lst) // 2
+        lst.extend([d, d + 1])
+    return lst[:n]
+
+
+def random_tree(n, seed=0):
+    """Returns the pre-order traversal of a random recursive tree with n nodes.
+
+    Every node (except the root) is attached to a uniformly chosen earlier node.
+    """
+    rnd = random.Random(seed)
+    children = [[] for _ in xrange(n)]
+    for i in xrange(1, n):
+        children[rnd.randrange(i)].append(i)
+    lst, stack = [], [(0, 0)]
+    while stack:
+        (node, distance) = stack.pop()
+        lst.append(distance)
+        stack.extend((c, distance + 1) for c in reversed(children[node]))
+    return lst
+
+
+def kary_tree(n, k=3):
+    """Returns the pre-order traversal of a complete k-ary tree with n nodes."""
+    lst, stack = [], [(0, 0)]
+    while stack:
+        (i, distance) = stack.pop()
+        lst.append(distance)
+        stack.extend((c, distance + 1) for c in xrange(k * i + k, k * i, -1) if c < n)
+    return lst
+
+
+def binary_tree(n):
+    """Returns the pre-order traversal of a complete binary tree with n nodes."""
+    return kary_tree(n, 2)
+
+
+def symmetric_tree(n, seed=0):
+    """Returns the pre-order traversal of a symmetric bicentral tree with n nodes (n rounded down to even).
+
+    The tree consists of two copies of a random tree whose roots are connected: the roots are the two centers.
+    """
+    half = random_tree(max(1, n // 2), seed)
+    return half + [d + 1 for d in half]
+
+
+TREE_FAMILIES = [
+    ("path", path_tree),
+    ("star", star_tree),
+    ("caterpillar", caterpillar_tree),
+    ("random", random_tree),
+    ("binary", binary_tree),
+    ("kary", kary_tree),
+    ("symmetric", symmetric_tree),
+]
+
+# the deep tree families used by the enumeration benchmark
+DEEP_TREE_FAMILIES = [
+    ("caterpillar", caterpillar_tree),
+    ("binary", binary_tree),
+]
+
+# the asymmetric and the symmetric trees of tests.py with the alphabet sizes of their parallel enumeration (they
+# have 18 million and 1 million labelings)
+PARALLEL_TEST_TREES = [
+    ("asymmetric", [0, 1, 2, 3, 4, 4, 5, 5, 3, 4], 6),
+    ("symmetric", [0, 1, 2, 3, 1, 2, 3], 8),
+]
+
+# the tree families whose branches are repeated many times (the memoized engine composes the labelings of their
+# isomorphic branches only once and steps the multisets of the equivalent siblings)
+REPEATED_TREE_FAMILIES = [
+    ("star", star_tree),
+    ("kary", kary_tree),
+]
+
+# the labeling engines of the enumeration benchmark
+ENGINES = [
+    ("dict", tree_labeling.get_labeled_graphs),
+    ("compact", lambda lst, max_label: tree_labeling.get_labeled_graphs(lst, max_label, compact=True)),
+    ("delta", tree_labeling.get_labeling_deltas),
+    ("memoized", lambda lst, max_label: tree_labeling.get_labeled_graphs(lst, max_label, memoized=True)),
+    ("compiled", lambda lst, max_label: tree_labeling.get_labeled_graphs(lst, max_label, compiled=True)),
+]
+
+
+def timed(func, *args):
+    """Calls the given function and returns its result and its running time in seconds."""
+    start = time.time()
+    result = func(*args)
+    return result, time.time() - start
+
+
+def best_time(repeat, func, *args):
+    """Calls the given function repeatedly and returns its last result and its best running time in seconds."""
+    (result, seconds) = timed(func, *args)
+    for _ in xrange(repeat - 1):
+        seconds = min(seconds, timed(func, *args)[1])
+    return result, seconds
+
+
+def bench_preprocessing(sizes, repeat=1):
+    """Times the center finding and the balancing of the tree families.
+
+    Args:
+        sizes:  the node counts of the trees
+        repeat: the count of the runs of every stage (the best time is kept)
+
+    Returns:
+        list:   (family, size, find_center seconds, balance_tree_list seconds, gen_tree_from_list seconds) tuples
+    """
+    results = []
+    for (name, gen_tree) in TREE_FAMILIES:
+        for n in sizes:
+            lst = gen_tree(n)
+            (centers, center_time) = best_time(repeat, tree_labeling.find_center, lst)
+            (_, balance_time) = best_time(repeat, tree_labeling.balance_tree_list, lst, centers)
+            # building, sorting the tree and generating its "equivalence-tree"
+            (_, tree_time) = best_time(repeat, tree_labeling.gen_tree_from_list, lst)
+            results.append((name, n, center_time, balance_time, tree_time))
+    return results
+
+
+def labelings_per_second(labelings, count, repeat=1):
+    """Returns the number of labelings generated per second.
+
+    Args:
+        labelings:  a generator of labelings
+        count:      the number of labelings to time (after the first one)
+        repeat:     the count of the consecutive timed windows of count labelings (the best speed is kept)
+    """
+    next(labelings)
+    best = 0
+    for _ in xrange(repeat):
+        start = time.time()
+        generated = sum(1 for _ in itertools.islice(labelings, count))
+        if generated == 0:
+            break
+        best = max(best, generated / max(time.time() - start, 1e-9))
+    return best
+
+
+def bench_next_labeling(sizes, max_labels=(2, 3, 5), count=10000, repeat=1):
+    """Measures the steady-state speed of next_labeling on every tree family, alphabet size and labeling mode.
+
+    Args:
+        sizes:      the node counts of the trees
+        max_labels: the labeling alphabets' sizes
+        count:      the number of labelings to generate per timed window
+        repeat:     the count of the timed windows (the best speed is kept)
+
+    Returns:
+        list:       (family, size, max_label, edge_labeling, labelings/sec) tuples
+    """
+    results = []
+    for (name, gen_tree) in TREE_FAMILIES:
+        for n in sizes:
+            (_, t, et) = tree_labeling.gen_tree_from_list(gen_tree(n))
+            for max_label in max_labels:
+                for edge_labeling in (False, True):
+                    tree_labeling.reset_labeling(t, -1 if t[0].symm else 0)
+                    labelings = tree_labeling.next_labeling(t, et, max_label, edge_labeling)
+                    results.append((name, n, max_label, edge_labeling, labelings_per_second(labelings, count,
+                                                                                             repeat)))
+    return results
+
+
+def bench_enumeration(sizes, max_label=3, count=10000):
+    """Measures the enumeration speed of the labeling engines on deep trees and on trees with repeated branches.
+
+    Args:
+        sizes:      the node counts of the trees
+        max_label:  an int that specifies the labeling alphabet's size
+        count:      the number of labelings to generate per tree and engine
+
+    Returns:
+        list:       (family, size, engine, labelings/sec) tuples
+    """
+    results = []
+    for (name, gen_tree) in DEEP_TREE_FAMILIES + REPEATED_TREE_FAMILIES:
+        for n in sizes:
+            lst = gen_tree(n)
+            for (engine, labelings) in ENGINES:
+                results.append((name, n, engine, labelings_per_second(labelings(lst, max_label), count)))
+    return results
+
+
+def count_shard(labelings):
+    """Counts the labelings of a shard in a worker process (the reducer of bench_parallel)."""
+    return sum(1 for _ in labelings)
+
+
+def bench_parallel(sizes, max_label=3, count=100000, processes=(1, 2, 4)):
+    """Measures the wall-clock speed of get_labeled_graphs_parallel against the serial compact engine.
+
+    The time includes the start of the pool and the transfer of the labelings to the parent process, so the speeds
+    show the break-even point of the parallel enumeration (the count of the labelings and of the CPUs where it pays off).
+    The 'processes=N,reducer' engines count the labelings in the workers (see count_shard): they show the scaling
+    without the tuples of the parent process. The deep tree families are measured with the given alphabet, the trees
+    of tests.py with their own alphabets (see PARALLEL_TEST_TREES).
+
+    Args:
+        sizes:      the node counts of the trees
+        max_label:  an int that specifies the labeling alphabet's size
+        count:      the number of labelings to consume per tree and engine
+        processes:  the counts of the worker processes
+
+    Returns:
+        list:       (family, size, max_label, engine, labelings/sec) tuples (the engine is 'serial', 'processes=N'
+                    or 'processes=N,reducer')
+    """
+    cases = [(name, gen_tree(n), max_label) for (name, gen_tree) in DEEP_TREE_FAMILIES for n in sizes]
+    cases.extend(PARALLEL_TEST_TREES)
+    results = []
+    for (name, lst, m) in cases:
+        engines = [("serial", lambda: tree_labeling.get_labeled_graphs(lst, m, compact=True))]
+        engines.extend(("processes=%d" % p, lambda p=p: tree_labeling.get_labeled_graphs_parallel(
+            lst, m, processes=p)) for p in processes)
+        for (engine, labelings) in engines:
+            start = time.time()
+            generated = sum(1 for _ in itertools.islice(labelings(), count))
+            results.append((name, len(lst), m, engine, generated / max(time.time() - start, 1e-9)))
+        for p in processes:
+            start = time.time()
+            shards = tree_labeling.get_labeled_graphs_parallel(lst, m, processes=p, reducer=count_shard)
+            generated = 0
+            for shard_count in shards:
+                generated += shard_count
+                if generated >= count:
+                    break
+            shards.close()
+            results.append((name, len(lst), m, "processes=%d,reducer" % p, generated / max(time.time() - start, 1e-9)))
+    return results
+
+
+def result(stage, family, n, metric, value, max_label=None, edge_labeling=None, engine=None):
+    """Returns a machine-readable benchmark result (a dictionary that can be written into JSON)."""
+    return {'stage': stage, 'family': family, 'nodes': n, 'max_label': max_label, 'edge_labeling': edge_labeling,
+            'engine': engine, 'metric': metric, 'value': value}
+
+
+def run_suite(sizes, enumeration_sizes, max_labels, count, repeat, processes=(1, 2, 4)):
+    """Runs every benchmark and returns the results.
+
+    Args:
+        sizes:              the node counts of the trees for the preprocessing stages
+        enumeration_sizes:  the node counts of the trees for the enumeration
+        max_labels:         the labeling alphabets' sizes of the enumeration
+        count:              the number of labelings to generate per case
+        repeat:             the count of the runs of every preprocessing stage and the count of the timed windows of
+                            the enumeration (the best result is kept)
+        processes:          the counts of the worker processes of the parallel enumeration (empty to skip it)
+
+    Returns:
+        list:               the results (see result)
+    """
+    results = []
+    for (name, n, center_time, balance_time, tree_time) in bench_preprocessing(sizes, repeat):
+        results.append(result('find_center', name, n, 'seconds', center_time))
+        results.append(result('balance_tree_list', name, n, 'seconds', balance_time))
+        results.append(result('gen_tree_from_list', name, n, 'seconds', tree_time))
+    for (name, n, max_label, edge_labeling, speed) in bench_next_labeling(enumeration_sizes, max_labels, count,
+                                                                          repeat):
+        results.append(result('next_labeling', name, n, 'labelings_per_second', speed, max_label, edge_labeling))
+    for (name, n, engine, speed) in bench_enumeration(enumeration_sizes, max_labels[-1], count):
+        results.append(result('engines', name, n, 'labelings_per_second', speed, max_labels[-1], False, engine))
+    if processes:
+        for (name, n, max_label, engine, speed) in bench_parallel(enumeration_sizes, max_labels[-1], count,
+                                                                  processes):
+            results.append(result('parallel', name, n, 'labelings_per_second', speed, max_label, False, engine))
+    return results
+
+
+def result_key(res):
+    """Returns the key that identifies the case of a result (the results of two runs are matched by it)."""
+    return tuple(res.get(field) for field in ('stage', 'family', 'nodes', 'max_label', 'edge_labeling', 'engine'))
+
+
+def compare_results(old, new, threshold, min_seconds=1e-3):
+    """Compares the results of two runs and returns the regressions.
+
+    Args:
+        old:            the results of the baseline run
+        new:            the results of the new run
+        threshold:      the relative slowdown that is reported as a regression (0.1 means 10%)
+        min_seconds:    the times below this are considered noise (they are not compared)
+
+    Returns:
+        list:       (old result, new result, slowdown) tuples of the regressions
+    """
+    baseline = dict((result_key(res), res) for res in old)
+    regressions = []
+    for res in new:
+        base = baseline.get(result_key(res))
+        if base is None or base['metric'] != res['metric'] or min(base['value'], res['value']) <= 0:
+            continue
+        # the times should not grow and the speeds should not drop
+        if res['metric'] == 'seconds':
+            if max(base['value'], res['value']) < min_seconds:
+                continue
+            slowdown = res['value'] / base['value'] - 1
+        else:
+            slowdown = base['value'] / res['value'] - 1
+        if slowdown > threshold:
+            regressions.append((base, res, slowdown))
+    return regressions
+
+
+def describe(res):
+    """Returns a short description of the case of a result."""
+    parts = [res['stage'], res['family'], "n=%d" % res['nodes']]
+    if res.get('max_label') is not None:
+        parts.append("max_label=%d" % res['max_label'])
+    if res.get('edge_labeling') is not None:
+        parts.append("edge" if res['edge_labeling'] else "vertex")
+    if res.get('engine') is not None:
+        parts.append(res['engine'])
+    return " ".join(parts)
+
+
+def print_results(results):
+    """Prints the results as a table."""
+    print "%-60s %16s" % ("case", "value")
+    for res in results:
+        if res['metric'] == 'seconds':
+            print "%-60s %15.4fs" % (describe(res), res['value'])
+        else:
+            print "%-60s %11.0f lbl/s" % (describe(res), res['value'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks the stages of the labeling pipeline.")
+    parser.add_argument('sizes', type=int, nargs='*', default=[10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6],
+                        help="the node counts of the trees for the preprocessing stages")
+    parser.add_argument('--enumeration-sizes', type=int, nargs='+', default=None,
+                        help="the node counts of the trees for the enumeration (the sizes up to 10^4 by default)")
+    parser.add_argument('--max-labels', type=int, nargs='+', default=[2, 3, 5],
+                        help="the labeling alphabets' sizes of the enumeration")
+    parser.add_argument('--count', type=int, default=10000, help="the number of labelings to generate per case")
+    parser.add_argument('--repeat', type=int, default=3,
+                        help="the count of the runs / timed windows of every case (the best result is kept)")
+    parser.add_argument('--processes', type=int, nargs='*', default=[1, 2, 4],
+                        help="the counts of the worker processes of the parallel enumeration (none to skip it)")
+    parser.add_argument('--json', metavar='FILE', help="write the results into a JSON file")
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'),
+                        help="compare two JSON result files instead of running the benchmarks")
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help="the relative slowdown that is reported as a regression (default 0.1)")
+    parser.add_argument('--min-seconds', type=float, default=1e-3,
+                        help="the times below this are not compared (default 0.001)")
+    args = parser.parse_args()
+
+    if args.compare:
+        results = []
+        for file_name in args.compare:
+            with open(file_name) as f:
+                results.append(json.load(f)['results'])
+        (old, new) = results
+        regressions = compare_results(old, new, args.threshold, args.min_seconds)
+        for (base, res, slowdown) in regressions:
+            print "REGRESSION %-60s %+.1f%% (%g -> %g)" % (describe(res), 100 * slowdown, base['value'],
+                                                            res['value'])
+        print "%d regressions in %d cases" % (len(regressions), len(new))
+        return 1 if regressions else 0
+
+    enumeration_sizes = args.enumeration_sizes or [n for n in args.sizes if n <= 10 ** 4]
+    results = run_suite(args.sizes, enumeration_sizes, args.max_labels, args.count, args.repeat, args.processes)
+    print_results(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'python': platform.python_version(), 'platform': platform.platform(), 'time': time.time(),
+                       'args': vars(args), 'results': results}, f, indent=1, sort_keys=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
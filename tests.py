@@ -10,6 +10,13 @@
     :email: denesb@gmail.com
     :maintainer: Dénes Bartha
 """
+import io
+import itertools
+import os
+import random
+import shutil
+import sys
+import tempfile
 import unittest
 import tree_labeling
 
@@ -23,6 +30,11 @@ class TestTreeLabeling(unittest.TestCase):
     def check_lst_equal(l1, l2):
         return len(l1) == len(l2) and l1 == l2
 
+    @staticmethod
+    def fits_label_counts(labeling, label_counts, at_most):
+        return all(cnt is None or (labeling.count(label) <= cnt if at_most else labeling.count(label) == cnt)
+                   for (label, cnt) in enumerate(label_counts))
+
     def test_get_labeled_graphs(self):
         # tests for malformed / bad inputs
         with self.assertRaises(ValueError):
@@ -67,7 +79,666 @@ class TestTreeLabeling(unittest.TestCase):
 
         # edge labelings
         assert len(self.gen_colour_lst(tree_labeling.get_labeled_graphs([0, 1, 2, 2, 1, 1], 2, True))) == 12
-        assert len(self.gen_colour_lst(tree_labeling.get_labeled_graphs([0, 1, 2, 2, 1, 1], 3, True))) == 99
+        assert len(self.gen_colour_lst(tree_labeling.get_labeled_graphs([0, 1, 2, 2, 1, 1], 3, True))) == 63
+        # symmetric edge labelings
+        assert self.check_lst_equal(self.gen_colour_lst(tree_labeling.get_labeled_graphs([0, 1], 3, True)),
+                                    [(0,), (1,), (2,)])
+        assert len(set(self.gen_colour_lst(tree_labeling.get_labeled_graphs([0, 1, 2, 3], 3, True)))) == 18
+        assert len(self.gen_colour_lst(tree_labeling.get_labeled_graphs([0, 1, 2, 3], 3, True))) == 18
+
+    def test_count_labelings(self):
+        with self.assertRaises(ValueError):
+            tree_labeling.count_labelings([1, 2])
+        with self.assertRaises(ValueError):
+            tree_labeling.count_labelings([0, 1], 0)
+
+        # the counts have to be the same as the count of the generated labelings
+        for lst in ([0], [0, 1], [0, 1, 2], [0, 1, 1, 2], [0, 1, 2, 3], [0, 1, 2, 3, 1, 2, 3], [0, 1, 2, 2, 1, 1],
+                    [0, 1, 2, 3, 4, 4, 5, 5, 3, 4], [0, 1, 2, 2, 1, 2, 2], [0, 1, 1, 1, 2, 2, 2]):
+            for max_label in (1, 2, 3):
+                for edge_labeling in (False, True):
+                    assert tree_labeling.count_labelings(lst, max_label, edge_labeling) == \
+                        len(self.gen_colour_lst(tree_labeling.get_labeled_graphs(lst, max_label, edge_labeling)))
+
+        # star with 2000 leaves: the leaves' labels form a multiset
+        assert tree_labeling.count_labelings([0] + [1] * 2000, 3) == 3 * tree_labeling.multichoose(3, 2000)
+        assert tree_labeling.count_labelings([0] + [1] * 2000, 3, True) == tree_labeling.multichoose(3, 2000)
+
+    def test_label_counts(self):
+        with self.assertRaises(ValueError):
+            list(tree_labeling.get_labeled_graphs([0, 1, 1], 3, label_counts=[1, 2]))
+        with self.assertRaises(ValueError):
+            tree_labeling.count_labelings([0, 1, 1], 2, label_counts=[1, -1])
+
+        for lst in ([0], [0, 1, 2, 3], [0, 1, 2, 2, 1, 1], [0, 1, 2, 3, 4, 4, 5, 5, 3, 4],
+                    [0, 1, 2, 1, 2, 1, 2, 3, 2, 3]):
+            for edge_labeling in (False, True):
+                labelings = self.gen_colour_lst(tree_labeling.get_labeled_graphs(lst, 3, edge_labeling))
+                # the generating polynomial counts the labelings of every histogram
+                histograms = {}
+                for labeling in labelings:
+                    histogram = tuple(labeling.count(label) for label in xrange(3))
+                    histograms[histogram] = histograms.get(histogram, 0) + 1
+                assert tree_labeling.count_labelings_by_histogram(lst, 3, edge_labeling) == histograms
+
+                for (label_counts, at_most) in (([None, 1, 2], False), ([2, 2, 2], True), ([None, None, 0], False)):
+                    # the constrained labelings come in the order of the unconstrained ones
+                    expected = [labeling for labeling in labelings
+                                if self.fits_label_counts(labeling, label_counts, at_most)]
+                    assert self.gen_colour_lst(tree_labeling.get_labeled_graphs(
+                        lst, 3, edge_labeling, label_counts=label_counts, at_most=at_most)) == expected
+                    assert tree_labeling.count_labelings(lst, 3, edge_labeling, label_counts, at_most) == len(expected)
+
+        # 3 nodes with label 1, 5 nodes with label 2 and the rest with label 0 on a star with 2000 leaves
+        assert tree_labeling.count_labelings([0] + [1] * 2000, 3, label_counts=[None, 3, 5]) == 3
+        assert list(tree_labeling.get_labeled_graphs([0] + [1] * 2000, 3, label_counts=[None, 3, 5]))[0] == \
+            tuple([0] + [2] * 5 + [1] * 3 + [0] * 1992)
+
+    def test_compatible(self):
+        with self.assertRaises(ValueError):
+            list(tree_labeling.get_labeled_graphs([0, 1, 1], 2, compatible=[[True, False]]))
+        with self.assertRaises(ValueError):
+            tree_labeling.count_labelings([0, 1, 1], 2, label_counts=[1, 2], compatible=lambda a, b: a != b)
+
+        # proper colorings (adjacent vertices get different labels) and monotone labelings (parent label <= child label)
+        for (compatible, directed) in ((lambda a, b: a != b, False), ([[True, True, True], [False, True, True],
+                                                                        [False, False, True]], True)):
+            matrix = tree_labeling.compatibility_matrix(compatible, 3)
+            for lst in ([0], [0, 1, 2, 3], [0, 1, 2, 2, 1, 1], [0, 1, 2, 3, 3, 1, 2], [0, 1, 2, 1, 2, 1, 2, 3, 2]):
+                (lst, t, _) = tree_labeling.gen_tree_from_list(lst)
+                # the parent of every node in the pre-order traversal (the labelings are indexed by it)
+                parents = [None] + [max(j for j in xrange(i) if lst[j] == lst[i] - 1) for i in xrange(1, len(lst))]
+
+                def vertex_compatible(labeling):
+                    if t[0].symm and not matrix[labeling[0]][labeling[1]] and not matrix[labeling[1]][labeling[0]]:
+                        return False
+                    return all(matrix[labeling[parents[i]]][labeling[i]] for i in xrange(2 if t[0].symm else 1,
+                                                                                         len(lst)))
+
+                def edge_compatible(labeling):
+                    # the edges are indexed by their lower nodes, the central edge of a symmetric tree belongs to node 1
+                    return all(matrix[labeling[(1 if parents[i] == 0 else parents[i]) - 1]][labeling[i - 1]]
+                               for i in xrange(2, len(lst)) if parents[i] != 0 or (t[0].symm and i != 1))
+
+                for (edge_labeling, fits) in ((False, vertex_compatible), (True, edge_compatible)):
+                    expected = [labeling for labeling in tree_labeling.get_labeled_graphs(lst, 3, edge_labeling)
+                                if fits(labeling)]
+                    assert self.gen_colour_lst(tree_labeling.get_labeled_graphs(
+                        lst, 3, edge_labeling, compatible=compatible)) == expected
+                    assert tree_labeling.count_labelings(lst, 3, edge_labeling, compatible=compatible) == len(expected)
+
+        # a path has two proper 2-colorings, but they are equivalent
+        assert tree_labeling.count_labelings(range(1000), 2, compatible=lambda a, b: a != b) == 1
+        assert len(list(tree_labeling.get_labeled_graphs(range(1000), 2, compatible=lambda a, b: a != b))) == 1
+
+    def test_instrumented_labelings(self):
+        for lst in ([0], [0, 1], [0, 1, 2, 2, 1, 1], [0, 1, 2, 3, 4, 4, 5, 5, 3, 4]):
+            for edge_labeling in (False, True):
+                labelings = self.gen_colour_lst(tree_labeling.get_labeled_graphs(lst, 3, edge_labeling))
+                (stats, instrumented) = tree_labeling.get_labeled_graphs_instrumented(lst, 3, edge_labeling)
+                assert self.check_lst_equal(self.gen_colour_lst(instrumented), labelings)
+                assert stats.labelings == stats.calls['graph_labeling_to_list'] == len(labelings)
+                # the last step finds no more labelings
+                assert stats.calls['next_labeling'] == len(labelings)
+                assert sum(stats.copied_sizes.itervalues()) == stats.calls['copy_branch_labeling']
+                assert stats.nodes_per_labeling() >= 0 and 'next_labeling' in str(stats)
+                (stats, instrumented) = tree_labeling.get_labeled_graphs_instrumented(lst, 3, edge_labeling,
+                                                                                      compact=True)
+                assert self.check_lst_equal(self.gen_colour_lst(instrumented), labelings)
+                assert stats.labelings == stats.calls['labels_to_tuple'] == len(labelings)
+                # the first step sets the first labeling and the last step finds no more labelings
+                assert stats.calls['step_compact_labeling'] == len(labelings) + 1
+                assert stats.calls['CompactTree'] == 1 and stats.calls['next_labeling'] == 0
+
+        # the equivalent leaves of a star are copied
+        (stats, instrumented) = tree_labeling.get_labeled_graphs_instrumented([0, 1, 1, 1], 2)
+        self.gen_colour_lst(instrumented)
+        assert stats.copied_sizes == {1: stats.calls['copy_branch_labeling']} and stats.calls['copy_branch_labeling']
+
+        # the profiler is enabled only while the enumeration runs
+        class Profiler(object):
+            def __init__(self):
+                self.enabled = False
+
+            def enable(self):
+                self.enabled = True
+
+            def disable(self):
+                self.enabled = False
+
+        profiler = Profiler()
+        for compact in (False, True):
+            for _ in tree_labeling.get_labeled_graphs_instrumented([0, 1, 2], 2, profiler=profiler, compact=compact)[1]:
+                assert not profiler.enabled
+
+    def test_symmetric_edge_labeling(self):
+        for lst in ([0, 1, 2, 3], [0, 1, 2, 2, 1, 1], [0, 1, 2, 1, 2, 1, 2, 3, 2, 3]):
+            for max_label in (2, 3, 4):
+                count = tree_labeling.count_labelings(lst, max_label, True)
+                # every step of the engine yields a new labeling (the first center is not stepped)
+                (_, t, et) = tree_labeling.gen_tree_from_list(lst)
+                assert t[0].symm
+                steps = 1
+                while tree_labeling._next_labeling(t, et, -1, -1, max_label, frozenset([-1, 0])):
+                    assert t[0].label == t[1].label
+                    steps += 1
+                assert steps == count
+                labelings = self.gen_colour_lst(tree_labeling.get_labeled_graphs(lst, max_label, True, True))
+                assert len(set(labelings)) == count
+
+    def test_compact_tree(self):
+        # the compact tree has to yield the same labelings in the same order
+        for lst in ([0], [0, 1], [0, 1, 2], [0, 1, 1, 2], [0, 1, 2, 3], [0, 1, 2, 3, 1, 2, 3], [0, 1, 2, 2, 1, 1],
+                    [0, 1, 2, 3, 4, 4, 5, 5, 3, 4], [0, 1, 2, 2, 1, 2, 2], [0, 1, 2, 1, 2, 3, 1, 2, 2, 1]):
+            for max_label in (1, 2, 3):
+                for edge_labeling in (False, True):
+                    assert self.check_lst_equal(
+                        self.gen_colour_lst(tree_labeling.get_labeled_graphs(lst, max_label, edge_labeling, True)),
+                        self.gen_colour_lst(tree_labeling.get_labeled_graphs(lst, max_label, edge_labeling)))
+        # labels that do not fit into a byte
+        assert len(self.gen_colour_lst(tree_labeling.get_labeled_graphs([0, 1], 300, compact=True))) == 45150
+
+    def test_memoized_labelings(self):
+        # the composed labelings of the memoized classes follow the same order (any part of the tree can be memoized)
+        for n in xrange(1, 9):
+            for lst in tree_labeling.free_trees(n):
+                for max_label in (2, 3):
+                    for edge_labeling in (False, True):
+                        labelings = self.gen_colour_lst(tree_labeling.get_labeled_graphs(lst, max_label, edge_labeling))
+                        (_, t, et) = tree_labeling.gen_tree_from_list(lst)
+                        ct = tree_labeling.CompactTree(t, et)
+                        for max_class_size in (0, 3, 50, 4096):
+                            assert self.check_lst_equal(self.gen_colour_lst(tree_labeling.next_composed_labeling(
+                                ct, max_label, edge_labeling, max_class_size=max_class_size)), labelings)
+        cache = tree_labeling.TreeCache()
+        for lst in ([0, 1, 1, 1, 1, 1, 1], [0, 1, 2, 2, 2, 1, 2, 2, 2, 1, 2, 2, 2]):
+            for edge_labeling in (False, True):
+                labelings = self.gen_colour_lst(tree_labeling.get_labeled_graphs(lst, 3, edge_labeling))
+                for c in (None, cache):
+                    assert self.check_lst_equal(self.gen_colour_lst(tree_labeling.get_labeled_graphs(
+                        lst, 3, edge_labeling, cache=c, memoized=True)), labelings)
+        # the branches that have too many labelings are stepped label by label
+        lst = range(3000)
+        assert list(itertools.islice(tree_labeling.get_labeled_graphs(lst, 3, memoized=True), 200)) == \
+            list(itertools.islice(tree_labeling.get_labeled_graphs(lst, 3, compact=True), 200))
+
+    def test_compiled_labelings(self):
+        # the specialized enumerators yield the labelings of next_labeling in the same order
+        for n in xrange(1, 9):
+            for lst in tree_labeling.free_trees(n):
+                for max_label in (1, 2, 3):
+                    for edge_labeling in (False, True):
+                        (_, t, et) = tree_labeling.gen_tree_from_list(lst)
+                        assert self.check_lst_equal(
+                            self.gen_colour_lst(tree_labeling.next_labeling_compiled(t, et, max_label, edge_labeling)),
+                            self.gen_colour_lst(tree_labeling.get_labeled_graphs(lst, max_label, edge_labeling)))
+        # an isomorphic traversal reuses the compiled enumerator
+        lst = [0, 1, 2, 2, 2, 1, 2, 2, 2, 1, 2, 2, 2]
+        (_, t, et) = tree_labeling.gen_tree_from_list(lst)
+        enumerator = tree_labeling.compile_enumerator(tree_labeling.CompactTree(t, et), 3, True)
+        (_, t, et) = tree_labeling.gen_tree_from_list([0, 1, 2, 2, 2, 3, 4, 4, 4, 3, 4, 4, 4])
+        assert tree_labeling.compile_enumerator(tree_labeling.CompactTree(t, et), 3, True) is enumerator
+        assert tree_labeling.compile_enumerator(tree_labeling.CompactTree(t, et), 2, True) is not enumerator
+        with self.assertRaises(ValueError):
+            list(tree_labeling.get_labeled_graphs(lst, 3, memoized=True, compiled=True))
+        cache = tree_labeling.TreeCache()
+        for c in (None, cache, cache):
+            assert self.check_lst_equal(
+                self.gen_colour_lst(tree_labeling.get_labeled_graphs(lst, 3, True, cache=c, compiled=True)),
+                self.gen_colour_lst(tree_labeling.get_labeled_graphs(lst, 3, True)))
+        lst = range(3000)
+        assert list(itertools.islice(tree_labeling.get_labeled_graphs(lst, 3, compiled=True), 200)) == \
+            list(itertools.islice(tree_labeling.get_labeled_graphs(lst, 3), 200))
+
+    def test_deep_tree_labeling(self):
+        # the engines do not exhaust the stack on trees that are deeper than the recursion limit
+        for lst in (range(6000), [d for i in xrange(3000) for d in (i, i + 1)]):
+            labelings = [list(itertools.islice(tree_labeling.get_labeled_graphs(lst, 3, compact=compact), 200))
+                         for compact in (False, True)]
+            assert labelings[0] == labelings[1] and len(set(labelings[0])) == 200
+            deltas = list(itertools.islice(tree_labeling.get_labeling_deltas(lst, 3), 200))
+            assert len(deltas) == 200
+            index = tree_labeling.rank(lst, labelings[0][-1], 3)
+            assert tree_labeling.rank(lst, tree_labeling.unrank(lst, index, 3), 3) == index
+
+    def test_sort_tree(self):
+        (lst, t, et) = tree_labeling.gen_tree_from_list([0, 1, 2, 3, 1, 2, 2, 1, 2, 3, 1])
+        # isomorphic branches get the same canonical ID
+        canons = [t[c].canon for c in t[0].children_list]
+        assert canons[1] == canons[2] and len(set(canons)) == 3
+        # the children are ordered by their count of children and then by their children's branches
+        assert [len(t[c].children_list) for c in t[0].children_list] == [0, 1, 1, 2]
+        assert [et[c].m for c in et[0].children_list] == [1, 2, 1]
+
+        # deep trees do not exhaust the stack
+        t = {0: tree_labeling.Node(None, 0)}
+        for i in xrange(1, 5000):
+            t[i] = tree_labeling.Node(i - 1, i)
+            t[i - 1].children_list.append(i)
+        tree_labeling.sort_tree(t, t[0])
+        assert len(set(t[i].canon for i in t)) == 5000
+
+    def test_balance_tree_list(self):
+        assert tree_labeling.find_center([0, 1, 2, 3, 4]) == [(2, 2)]
+        assert tree_labeling.find_center([0, 1, 2, 3]) == [(1, 1), (2, 2)]
+        # the three pre-order traversals of the same tree give the same balanced traversal
+        for lst in ([0, 1, 2, 3, 4, 4, 5, 5, 3, 4], [0, 1, 2, 2, 3, 3, 1, 2, 1, 2]):
+            assert tree_labeling.balance_tree_list(lst, tree_labeling.find_center(lst)) == \
+                [0, 1, 2, 2, 3, 3, 1, 2, 1, 2]
+        lst = [0, 1, 1, 2, 2, 1, 2, 3, 2, 3]
+        assert tree_labeling.balance_tree_list(lst, tree_labeling.find_center(lst)) == [0, 1, 2, 3, 2, 3, 1, 1, 2, 2]
+        lst = [0, 1, 2, 1, 2, 3, 4, 1, 2, 1]
+        assert tree_labeling.balance_tree_list(lst, tree_labeling.find_center(lst)) == [0, 1, 2, 3, 1, 2, 2, 3, 2, 3]
+
+        # large trees
+        lst = range(100000)
+        assert tree_labeling.find_center(lst) == [(49999, 49999), (50000, 50000)]
+        assert tree_labeling.balance_tree_list(lst, tree_labeling.find_center(lst)) == \
+            [0] + range(1, 50001) + range(1, 50000)
+
+    def test_labeling_deltas(self):
+        # applying the changes to a buffer has to give the same labelings
+        for lst in ([0], [0, 1], [0, 1, 2], [0, 1, 1, 2], [0, 1, 2, 3], [0, 1, 2, 3, 1, 2, 3], [0, 1, 2, 2, 1, 1],
+                    [0, 1, 2, 3, 4, 4, 5, 5, 3, 4], [0, 1, 2, 2, 1, 2, 2], [0, 1, 2, 1, 2, 3, 1, 2, 2, 1]):
+            for max_label in (1, 2, 3):
+                for edge_labeling in (False, True):
+                    labelings = self.gen_colour_lst(tree_labeling.get_labeled_graphs(lst, max_label, edge_labeling))
+                    deltas = tree_labeling.get_labeling_deltas(lst, max_label, edge_labeling)
+                    buf = [0] * (len(lst) - 1 if edge_labeling else len(lst))
+                    assert self.check_lst_equal([tuple(b) for b in tree_labeling.apply_labeling_deltas(deltas, buf)],
+                                                labelings)
+        # only the changed labels are reported
+        assert self.check_lst_equal(self.gen_colour_lst(tree_labeling.get_labeling_deltas([0, 1, 2])),
+                                    [[], [(1, 1)], [(2, 1)], [(0, 1), (1, 0), (2, 0)], [(1, 1)], [(2, 1)]])
+
+    @unittest.skipIf(tree_labeling.np is None, "NumPy is not installed")
+    def test_labeled_graphs_batched(self):
+        np = tree_labeling.np
+        with self.assertRaises(ValueError):
+            list(tree_labeling.get_labeled_graphs_batched([0, 1], 2, False, 0))
+
+        for lst in ([0], [0, 1], [0, 1, 2, 3], [0, 1, 2, 2, 1, 1], [0, 1, 2, 3, 4, 4, 5, 5, 3, 4]):
+            for max_label in (1, 2, 3):
+                for edge_labeling in (False, True):
+                    labelings = self.gen_colour_lst(tree_labeling.get_labeled_graphs(lst, max_label, edge_labeling))
+                    blocks = list(tree_labeling.get_labeled_graphs_batched(lst, max_label, edge_labeling, 7))
+                    assert all(block.shape[0] == 7 and block.dtype == np.uint8 for block in blocks[:-1])
+                    assert [tuple(row) for block in blocks for row in block] == labelings
+        # labels that do not fit into a byte
+        blocks = list(tree_labeling.get_labeled_graphs_batched([0, 1], 300))
+        assert blocks[0].dtype == np.uint16 and sum(len(block) for block in blocks) == 45150
+
+    def test_rank_unrank(self):
+        with self.assertRaises(ValueError):
+            tree_labeling.unrank([0, 1, 2], 6)
+        with self.assertRaises(ValueError):
+            tree_labeling.rank([0, 1, 2], [0, 2, 0])
+        with self.assertRaises(ValueError):
+            tree_labeling.rank([0, 1, 2], [0, 1])
+
+        # every labeling is mapped to its index and back
+        for lst in ([0], [0, 1], [0, 1, 2], [0, 1, 1, 2], [0, 1, 2, 3], [0, 1, 2, 2, 1, 1], [0, 1, 2, 2, 1, 2, 2],
+                    [0, 1, 1, 1, 2, 2, 2]):
+            for max_label in (1, 2, 3):
+                for edge_labeling in (False, True):
+                    labelings = self.gen_colour_lst(tree_labeling.get_labeled_graphs(lst, max_label, edge_labeling))
+                    for (index, labeling) in enumerate(labelings):
+                        assert tree_labeling.rank(lst, list(labeling), max_label, edge_labeling) == index
+                        assert tree_labeling.unrank(lst, index, max_label, edge_labeling) == labeling
+        # equivalent labelings get the same index
+        assert tree_labeling.rank([0, 1, 2], [0, 0, 1]) == tree_labeling.rank([0, 1, 2], [0, 1, 0]) == 1
+
+        # large trees
+        lst = [0] + [1, 2, 3] * 500
+        cnt = tree_labeling.count_labelings(lst, 3)
+        for index in (0, 1, cnt // 3, cnt - 1):
+            assert tree_labeling.rank(lst, list(tree_labeling.unrank(lst, index, 3)), 3) == index
+
+    @staticmethod
+    def labeled_free_tree_form(lst, labeling, edge_labeling):
+        # the smallest labeled AHU string of the tree rooted at any of its nodes (the edge labels belong to the children)
+        parents = tree_labeling.find_parents(lst)[0]
+        adjacent = [[] for _ in lst]
+        edge_labels = {}
+        for (i, p) in enumerate(parents):
+            if p >= 0:
+                adjacent[i].append(p)
+                adjacent[p].append(i)
+                if edge_labeling:
+                    edge_labels[(i, p)] = edge_labels[(p, i)] = labeling[i - 1]
+
+        def form(node, parent):
+            label = edge_labels.get((node, parent), "") if edge_labeling else labeling[node]
+            return "(%s" % label + "".join(sorted(form(c, node) for c in adjacent[node] if c != parent)) + ")"
+        return min(form(i, -1) for i in xrange(len(lst)))
+
+    def test_canonicalize(self):
+        with self.assertRaises(ValueError):
+            tree_labeling.canonicalize([0, 1, 2], [0, 1])
+
+        # the labelings belong to the balanced traversal by default, otherwise to the given traversal (the middle
+        # node is the center)
+        assert tree_labeling.canonicalize([0, 1, 2], [0, 0, 1], balanced=False) == \
+            tree_labeling.canonicalize([0, 1, 2], [1, 0, 0], balanced=False) == \
+            tree_labeling.canonicalize([0, 1, 2], [0, 1, 0]) == (0, 1, 0)
+        rnd = random.Random(0)
+        for lst in ([0], [0, 1], [0, 1, 1, 1], [0, 1, 2, 3], [0, 1, 2, 2, 1, 1], [0, 1, 2, 3, 1, 2, 3],
+                    [0, 1, 2, 1, 2, 1, 2, 3, 2, 3], [0, 1, 2, 3, 4, 4, 5, 5, 3, 4]):
+            balanced = tree_labeling.balanced_traversal(lst)
+            for edge_labeling in (False, True):
+                labelings = self.gen_colour_lst(tree_labeling.get_labeled_graphs(lst, 3, edge_labeling))
+                # the representatives are fixed points
+                assert list(tree_labeling.canonicalize_labelings(lst, labelings, edge_labeling, True)) == labelings
+                # an arbitrary labeling is mapped to the enumerated labeling of its orbit
+                samples = [[rnd.randrange(3) for _ in labelings[0]] for _ in xrange(200)]
+                for (labeling, canonical) in zip(samples, tree_labeling.canonicalize_labelings(lst, samples,
+                                                                                               edge_labeling, True)):
+                    assert canonical == labelings[tree_labeling.rank(lst, labeling, 3, edge_labeling)]
+                # the labelings of the given (not balanced) traversal keep their orbits
+                for (labeling, canonical) in zip(samples, tree_labeling.canonicalize_labelings(lst, samples,
+                                                                                               edge_labeling, False)):
+                    assert canonical in labelings
+                    assert self.labeled_free_tree_form(lst, labeling, edge_labeling) == \
+                        self.labeled_free_tree_form(balanced, canonical, edge_labeling)
+
+    def test_get_labeled_graphs_parallel(self):
+        with self.assertRaises(ValueError):
+            self.gen_colour_lst(tree_labeling.get_labeled_graphs_parallel([0, 1], chunk_size=0))
+
+        for lst in ([0], [0, 1], [0, 1, 2, 3], [0, 1, 2, 3, 1, 2, 3], [0, 1, 2, 2, 1, 1], [0, 1, 2, 3, 4, 4, 5, 5, 3, 4]):
+            for edge_labeling in (False, True):
+                labelings = self.gen_colour_lst(tree_labeling.get_labeled_graphs(lst, 3, edge_labeling))
+                # ordered shards give the same order, the unordered ones give the same labelings
+                assert self.check_lst_equal(self.gen_colour_lst(tree_labeling.get_labeled_graphs_parallel(
+                    lst, 3, edge_labeling, processes=2, chunk_size=100)), labelings)
+                assert sorted(self.gen_colour_lst(tree_labeling.get_labeled_graphs_parallel(
+                    lst, 3, edge_labeling, processes=2, chunk_size=77, ordered=False))) == sorted(labelings)
+                # the workers reduce their shards
+                shards = self.gen_colour_lst(tree_labeling.get_labeled_graphs_parallel(
+                    lst, 3, edge_labeling, processes=2, chunk_size=100, reducer=list))
+                assert len(shards) == (len(labelings) + 99) // 100 and list(itertools.chain(*shards)) == labelings
+        # the labels that do not fit into a byte
+        assert self.check_lst_equal(self.gen_colour_lst(tree_labeling.get_labeled_graphs_parallel(
+            [0, 1, 1], 300, processes=2)), self.gen_colour_lst(tree_labeling.get_labeled_graphs([0, 1, 1], 300)))
+        # an abandoned enumeration of a huge count of labelings stops its pool
+        for ordered in (True, False):
+            labelings = tree_labeling.get_labeled_graphs_parallel(range(100), 3, processes=2, ordered=ordered)
+            assert len(list(itertools.islice(labelings, 30000))) == 30000
+            labelings.close()
+
+    def test_sample_labelings(self):
+        with self.assertRaises(ValueError):
+            tree_labeling.sample_labelings([0, 1], 2, -1)
+
+        assert tree_labeling.sample_labelings([0, 1], 2, 0) == []
+        assert tree_labeling.sample_labelings([0], 2, 2, True) == [(), ()]
+        assert tree_labeling.sample_labelings([0, 1, 2, 3], 3, 10, seed=42) == \
+            tree_labeling.sample_labelings([0, 1, 2, 3], 3, 10, seed=42)
+
+        # every labeling is drawn with the same probability
+        for (lst, max_label, edge_labeling) in (([0, 1, 1, 2], 3, False), ([0, 1, 2, 2, 1, 1], 3, True)):
+            labelings = self.gen_colour_lst(tree_labeling.get_labeled_graphs(lst, max_label, edge_labeling))
+            samples = tree_labeling.sample_labelings(lst, max_label, 1000 * len(labelings), edge_labeling, seed=1)
+            counts = dict((labeling, 0) for labeling in labelings)
+            for sample in samples:
+                counts[sample] += 1
+            assert len(counts) == len(labelings) and 850 < min(counts.values()) and max(counts.values()) < 1150
+
+        if tree_labeling.np is not None:
+            block = tree_labeling.sample_labelings([0, 1, 2, 3], 3, 10, True, seed=42, as_array=True)
+            assert block.shape == (10, 3) and [tuple(row) for row in block] == \
+                tree_labeling.sample_labelings([0, 1, 2, 3], 3, 10, True, seed=42)
+            # the vectorized unranking draws the same samples (the large classes are unranked sample by sample)
+            for (lst, max_label) in (([0, 1, 2, 2, 1, 2, 2], 3), ([0] + [1] * 40, 40), ([0] + [1, 2, 2, 2] * 6, 40)):
+                for edge_labeling in (False, True):
+                    block = tree_labeling.sample_labelings(lst, max_label, 100, edge_labeling, seed=7, as_array=True)
+                    assert [tuple(row) for row in block.tolist()] == \
+                        tree_labeling.sample_labelings(lst, max_label, 100, edge_labeling, seed=7)
+
+    @staticmethod
+    def free_tree_form(lst):
+        # the smallest AHU string of the tree rooted at one of its centers
+        parents = tree_labeling.find_parents(lst)[0]
+        adjacent = [[] for _ in lst]
+        for (i, p) in enumerate(parents):
+            if p >= 0:
+                adjacent[i].append(p)
+                adjacent[p].append(i)
+
+        def form(node, parent):
+            return "(" + "".join(sorted(form(c, node) for c in adjacent[node] if c != parent)) + ")"
+        return min(form(i, -1) for (_, i) in tree_labeling.find_center(lst))
+
+    def test_free_trees(self):
+        with self.assertRaises(ValueError):
+            list(tree_labeling.free_trees(0))
+
+        # the counts of the free-trees (OEIS A000055)
+        assert [len(list(tree_labeling.free_trees(n))) for n in xrange(1, 13)] == \
+            [1, 1, 1, 2, 3, 6, 11, 23, 47, 106, 235, 551]
+        for n in xrange(1, 11):
+            trees = list(tree_labeling.free_trees(n))
+            assert all(len(lst) == n and tree_labeling.is_proper_traversal(lst) for lst in trees)
+            assert len(set(self.free_tree_form(lst) for lst in trees)) == len(trees)
+
+        # the shared preprocessing gives the same labelings as the separate calls
+        for n in (1, 2, 5, 8):
+            for edge_labeling in (False, True):
+                for compact in (False, True):
+                    for (lst, labelings) in tree_labeling.get_labeled_free_trees(n, 3, edge_labeling, compact):
+                        assert self.check_lst_equal(self.gen_colour_lst(labelings), self.gen_colour_lst(
+                            tree_labeling.get_labeled_graphs(lst, 3, edge_labeling)))
+        # the table is restarted between the trees (the labelings are consumed after the restarts)
+        with self.assertRaises(ValueError):
+            next(tree_labeling.get_labeled_free_trees(5, 3, max_classes=0))
+        for (lst, labelings) in list(tree_labeling.get_labeled_free_trees(8, 3, max_classes=5)):
+            assert self.check_lst_equal(self.gen_colour_lst(labelings),
+                                        self.gen_colour_lst(tree_labeling.get_labeled_graphs(lst, 3)))
+
+    def test_input_formats(self):
+        for (convert, tree) in ((tree_labeling.traversal_from_parents, [-1, 0, -1]),
+                                (tree_labeling.traversal_from_parents, [1, 2, 0]),
+                                (tree_labeling.traversal_from_parents, []),
+                                (tree_labeling.traversal_from_edges, [(0, 1), (0, 1)]),
+                                (tree_labeling.traversal_from_edges, [(0, 3)]),
+                                (tree_labeling.traversal_from_pruefer, [0, 4])):
+            with self.assertRaises(ValueError):
+                convert(tree)
+        with self.assertRaises(ValueError):
+            list(tree_labeling.read_trees(["0 1 0"]))
+        with self.assertRaises(ValueError):
+            list(tree_labeling.read_trees(["0 1 1"], 'edges'))
+
+        assert tree_labeling.traversal_from_pruefer([3, 3, 3, 4]) == [0, 1, 2, 1, 1, 1]
+        # every format gives the same free-tree (the edges and the Prüfer sequences are built from the parents)
+        rnd = random.Random(0)
+        for n in xrange(1, 9):
+            for lst in tree_labeling.free_trees(n):
+                parents = tree_labeling.find_parents(lst)[0]
+                nodes = range(n)
+                rnd.shuffle(nodes)
+                parents = [-1 if parents[i] < 0 else nodes[parents[i]] for i in sorted(nodes, key=nodes.__getitem__)]
+                edges = [(i, p) for (i, p) in enumerate(parents) if p >= 0]
+                degree = [0] * n
+                for edge in edges:
+                    degree[edge[0]] += 1
+                    degree[edge[1]] += 1
+                pruefer = []
+                while len(pruefer) < n - 2:
+                    leaf = min(i for i in nodes if degree[i] == 1)
+                    edge = next(e for e in edges if leaf in e)
+                    edges.remove(edge)
+                    pruefer.append(edge[0] + edge[1] - leaf)
+                    degree[edge[0]] -= 1
+                    degree[edge[1]] -= 1
+                edges = [(i, p) for (i, p) in enumerate(parents) if p >= 0]
+                balanced = tree_labeling.balanced_traversal(lst)
+                lines = ["# comment", "", " ".join(map(str, lst)), ",".join(map(str, parents)),
+                         " ".join("%d %d" % edge for edge in edges), ", ".join(map(str, pruefer))]
+                for (fmt, line) in zip(('traversal', 'parents', 'edges', 'pruefer'), lines[2:]):
+                    # the empty edge lists and Prüfer sequences are skipped as empty lines
+                    if not line:
+                        continue
+                    trees = list(tree_labeling.read_trees(lines[:2] + [line], fmt))
+                    assert len(trees) == 1 and len(trees[0]) == n
+                    assert self.free_tree_form(trees[0]) == self.free_tree_form(lst)
+                    assert tree_labeling.count_labelings(trees[0], 3) == tree_labeling.count_labelings(balanced, 3)
+
+        if tree_labeling.np is not None:
+            np = tree_labeling.np
+            assert tree_labeling.is_proper_traversal_array(np.array([0, 1, 2, 2, 1]))
+            assert tree_labeling.is_proper_traversal_array(np.array([0]))
+            for arr in ([], [1], [0, 2], [0, 1, 0], [0.0, 1.0], [[0, 1]]):
+                assert not tree_labeling.is_proper_traversal_array(np.array(arr))
+            # the differences of unsigned integers wrap around
+            assert tree_labeling.is_proper_traversal_array(np.array([0, 1, 2, 1], dtype=np.uint8))
+            assert not tree_labeling.is_proper_traversal_array(np.array([0, 1, 3], dtype=np.uint8))
+            assert not tree_labeling.is_proper_traversal_array(np.array([0, 255, 1], dtype=np.uint8))
+            # the NumPy integers are valid nodes
+            assert tree_labeling.traversal_from_parents(np.array([-1, 0, 1])) == [0, 1, 1]
+
+    def test_tree_cache(self):
+        with self.assertRaises(ValueError):
+            tree_labeling.TreeCache(0)
+
+        # the traversals of the README are the same free-tree (the last one is rooted at the other center)
+        cache = tree_labeling.TreeCache(2)
+        for lst in ([0, 1, 2, 3, 4, 4, 5, 5, 3, 4], [0, 1, 2, 2, 3, 3, 1, 2, 1, 2], [0, 1, 1, 2, 2, 1, 2, 3, 2, 3]):
+            for max_label in (2, 3):
+                assert self.check_lst_equal(self.gen_colour_lst(tree_labeling.get_labeled_graphs(
+                    lst, max_label, cache=cache)), self.gen_colour_lst(tree_labeling.get_labeled_graphs(lst, max_label)))
+        assert len(cache) == 2 and cache.misses == 2
+
+        # random traversals of random trees give the same labelings as the uncached calls
+        rnd = random.Random(0)
+        for _ in xrange(100):
+            n = rnd.randint(1, 9)
+            adjacent = [[] for _ in xrange(n)]
+            for i in xrange(1, n):
+                p = rnd.randrange(i)
+                adjacent[i].append(p)
+                adjacent[p].append(i)
+            lst, stack = [], [(rnd.randrange(n), -1, 0)]
+            while stack:
+                (node, parent, distance) = stack.pop()
+                lst.append(distance)
+                children = [c for c in adjacent[node] if c != parent]
+                rnd.shuffle(children)
+                stack.extend((c, node, distance + 1) for c in children)
+            for edge_labeling in (False, True):
+                labelings = self.gen_colour_lst(tree_labeling.get_labeled_graphs(lst, 3, edge_labeling))
+                assert self.check_lst_equal(self.gen_colour_lst(tree_labeling.get_labeled_graphs(
+                    lst, 3, edge_labeling, cache=cache)), labelings)
+                assert tree_labeling.count_labelings(lst, 3, edge_labeling, cache=cache) == len(labelings)
+                assert tree_labeling.count_labelings(lst, 3, edge_labeling, [None, 2, None], cache=cache) == \
+                    len([labeling for labeling in labelings if labeling.count(1) == 2])
+        assert len(cache) == 2
+
+        # the pickled entries are shared by the caches
+        path = tempfile.mkdtemp()
+        try:
+            lst = [0, 1, 2, 3, 1, 2, 3]
+            self.gen_colour_lst(tree_labeling.get_labeled_graphs(lst, 2, cache=tree_labeling.TreeCache(path=path)))
+            assert len(os.listdir(path)) == 1
+            assert self.check_lst_equal(self.gen_colour_lst(tree_labeling.get_labeled_graphs(
+                range(7), 3, cache=tree_labeling.TreeCache(path=path))),
+                self.gen_colour_lst(tree_labeling.get_labeled_graphs(range(7), 3)))
+            assert len(os.listdir(path)) == 1
+        finally:
+            shutil.rmtree(path)
+
+    def test_resumable_labelings(self):
+        with self.assertRaises(ValueError):
+            tree_labeling.resume_labeled_graphs({'lst': [0, 1]})
+        for (labels, index, version) in (([0, 3, 0], 1, 1), ([0, 1, 0], 2, 0), ([0, 0, 1], 2, 1), ([0, 1, 0], 3, 1),
+                                         ([0, 1, 0], 99, 1)):
+            # out of the alphabet, unknown format version, equal siblings in the wrong order and wrong indexes
+            with self.assertRaises(ValueError):
+                tree_labeling.resume_labeled_graphs({'version': version, 'lst': [0, 1, 1], 'max_label': 3,
+                                                     'edge_labeling': False, 'labels': labels, 'index': index})
+        # the label of the first center of a symmetric edge labeling is the label of the second center
+        with self.assertRaises(ValueError):
+            tree_labeling.resume_labeled_graphs({'version': 1, 'lst': [0, 1], 'max_label': 3, 'edge_labeling': True,
+                                                 'labels': [0, 0, 1], 'index': 2})
+
+        for lst in ([0], [0, 1], [0, 1, 2, 3], [0, 1, 2, 2, 1, 1], [0, 1, 2, 3, 4, 4, 5, 5, 3, 4]):
+            for edge_labeling in (False, True):
+                labelings = self.gen_colour_lst(tree_labeling.get_labeled_graphs(lst, 3, edge_labeling))
+                # interrupt the enumeration at arbitrary points (the state is pickled like a checkpoint file)
+                for k in sorted(set(range(0, len(labelings), len(labelings) // 40 + 1) + [len(labelings) - 1,
+                                                                                       len(labelings)])):
+                    run = tree_labeling.get_labeled_graphs_resumable(lst, 3, edge_labeling)
+                    assert list(itertools.islice(run, k)) == labelings[:k]
+                    state = tree_labeling.pickle.loads(tree_labeling.pickle.dumps(run.checkpoint()))
+                    assert list(tree_labeling.resume_labeled_graphs(state)) == labelings[k:]
+
+        # a run that dies is continued from its last periodic checkpoint
+        path = tempfile.mkdtemp()
+        try:
+            checkpoint_path = os.path.join(path, 'checkpoint')
+            lst = [0, 1, 2, 3, 1, 2, 3]
+            labelings = self.gen_colour_lst(tree_labeling.get_labeled_graphs(lst, 3))
+            run = tree_labeling.get_labeled_graphs_resumable(lst, 3, checkpoint_path=checkpoint_path,
+                                                            checkpoint_every=40)
+            assert list(itertools.islice(run, 100)) == labelings[:100]
+            state = tree_labeling.load_checkpoint(checkpoint_path)
+            assert state['index'] == 80
+            assert list(tree_labeling.resume_labeled_graphs(state)) == labelings[80:]
+        finally:
+            shutil.rmtree(path)
+
+    def test_labeling_file(self):
+        path = tempfile.mkdtemp()
+        try:
+            file_name = os.path.join(path, 'labelings')
+            for (lst, max_label) in (([0], 1), ([0, 1], 2), ([0, 1, 2, 3], 3), ([0, 1, 2, 2, 1, 1], 5),
+                                     ([0, 1, 2, 3, 1, 2, 3], 4), ([0, 1, 1, 1], 9), ([0, 1], 300), ([0], 70000)):
+                for edge_labeling in (False, True):
+                    labelings = self.gen_colour_lst(tree_labeling.get_labeled_graphs(lst, max_label, edge_labeling))
+                    with open(file_name, 'wb') as f:
+                        # a small buffer => several bulk writes
+                        assert tree_labeling.write_labelings(f, lst, max_label, edge_labeling, 7) == len(labelings)
+                    with tree_labeling.LabelingFile(file_name) as labeling_file:
+                        assert labeling_file.max_label == max_label and labeling_file.edge_labeling == edge_labeling
+                        assert labeling_file.traversal == tree_labeling.gen_tree_from_list(lst)[0]
+                        assert len(labeling_file) == len(labelings) and list(labeling_file) == labelings
+                        assert labeling_file[-1] == labelings[-1] and labeling_file[len(labelings) // 2] == \
+                            labelings[len(labelings) // 2]
+                        with self.assertRaises(IndexError):
+                            labeling_file[len(labelings)]
+                        if tree_labeling.np is not None:
+                            block = labeling_file.labels(1, 5)
+                            assert [tuple(row) for row in block] == labelings[1:5]
+                            rows = labeling_file.rows()
+                    # the views outlive the reader
+                    if tree_labeling.np is not None:
+                        assert [tuple(row) for row in block] == labelings[1:5] and rows.sum() >= 0
+                    with self.assertRaises(ValueError):
+                        labeling_file[0]
+
+            # the command-line writer
+            report = io.BytesIO()
+            assert tree_labeling.main(['0,1,2,1', file_name, '--max-label', '3', '--edge-labeling'], report) == 0
+            assert report.getvalue() == "%d labelings written into %s\n" % (
+                tree_labeling.count_labelings([0, 1, 2, 1], 3, True), file_name)
+            with tree_labeling.LabelingFile(file_name) as labeling_file:
+                assert list(labeling_file) == self.gen_colour_lst(tree_labeling.get_labeled_graphs([0, 1, 2, 1], 3,
+                                                                                                  True))
+            # a failed run keeps the existing file (and leaves no temporary file behind)
+            with open(file_name, 'rb') as f:
+                contents = f.read()
+            (stderr, sys.stderr) = (sys.stderr, io.BytesIO())
+            try:
+                with self.assertRaises(SystemExit):
+                    tree_labeling.main(['0,1,2,1', file_name, '--buffer-size', '0'], report)
+            finally:
+                sys.stderr = stderr
+            with open(file_name, 'rb') as f:
+                assert f.read() == contents
+            assert os.listdir(path) == [os.path.basename(file_name)]
+        finally:
+            shutil.rmtree(path)
+
 
 if __name__ == '__main__':
     unittest.main()
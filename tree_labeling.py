@@ -11,12 +11,41 @@
     :email:         denesb@gmail.com
     :maintainer:    Dénes Bartha
 """
-from collections import deque
+import argparse
+import binascii
+import hashlib
+import mmap
+import multiprocessing
+import numbers
+import os
+import Queue
+import random
+import struct
+import sys
+import tempfile
+from array import array
+from collections import deque, OrderedDict
+from functools import cmp_to_key
+from itertools import chain, combinations_with_replacement
+from operator import itemgetter
+from timeit import default_timer as timer
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
 
 
 class Node(object):
     """Represents a node of a tree."""
 
+    __slots__ = ('parent', 'symm', 'distance', 'children_list', 'canon', 'm', 'label')
+
     def __init__(self, parent, distance):
         """Initializes the node object.
 
@@ -28,38 +57,103 @@ class Node(object):
         self.symm = False
         self.distance = distance
         self.children_list = []
-        self.ordervect = []
+        self.canon = None
         self.m = 1
 
     def __str__(self):
         """Makes a string object from the node."""
 
-        return "parent: %s, multiplicity: %s, distance: %s children_list: %s, ordervect: %s" \
-               % (self.parent, self.m, self.distance, self.children_list, self.ordervect)
+        return "parent: %s, multiplicity: %s, distance: %s children_list: %s, canon: %s" \
+               % (self.parent, self.m, self.distance, self.children_list, self.canon)
+
+
+def gen_class_comparator(class_children):
+    """Returns a comparator of the canonical IDs of the branches.
+
+    The branches are ordered by their count of children first, then by their sorted children's branches
+    (lexicographically). Two different branches with the same count of children are decided by their first
+    differing children, so a comparison only follows one chain of branches - the results are memoized along the chain.
+
+    Args:
+        class_children: a list that contains the sorted canonical IDs of the children of every canonical ID
+
+    Returns:
+        function:       compares two canonical IDs (returns -1, 0 or 1)
+    """
+    memo = {}
+
+    def compare(a, b):
+        result = 0
+        chain = []
+        while a != b:
+            result = memo.get((a, b))
+            if result is not None:
+                break
+            ca, cb = class_children[a], class_children[b]
+            if len(ca) != len(cb):
+                result = -1 if len(ca) < len(cb) else 1
+                break
+            chain.append((a, b))
+            i = 0
+            while ca[i] == cb[i]:
+                i += 1
+            a, b = ca[i], cb[i]
+        for pair in chain:
+            memo[pair] = result
+        return result
+    return compare
+
+
+def gen_class_table():
+    """Returns an empty table of the branches' canonical IDs.
+
+    The table can be shared by several sort_tree calls (even on different trees): the branches that are isomorphic to
+    an already seen branch get its ID and the memoized comparisons are reused.
 
+    Returns:
+        tuple:  the canonical IDs of the sorted children lists (dictionary), the sorted children lists of the canonical
+                IDs (list) and the comparator of the canonical IDs (see gen_class_comparator)
+    """
+    class_children = []
+    return {}, class_children, gen_class_comparator(class_children)
 
-def sort_tree(t, node):
+
+def sort_tree(t, node, table=None):
     """Sorts the given directed tree's branch.
 
     Sorting here means that at every level (starting from the root node) the nodes should follow an increasing order
-    at the count of their children.
+    at the count of their children (equal counts are ordered by the children's branches). Every node of the branch gets
+    a canonical integer ID (canon): two branches have the same ID iff they are isomorphic.
 
     Args:
         t:      a dictionary that contains the nodes of a labeled tree
         node:   the actual node of the tree (Node object)
+        table:  the table of the canonical IDs (see gen_class_table), a new one is used if it is not given
     """
-    node.ordervect = [len(node.children_list)]
-    if node.children_list:
-        # iterate through the children
-        for n in node.children_list:
-            sort_tree(t, t[n])
-            node.ordervect.append(t[n].ordervect)
+    # breadth-first order of the branch => the children are processed before their parents in the reversed order
+    nodes = [node]
+    for n in nodes:
+        nodes.extend(t[c] for c in n.children_list)
 
-        # if there is more then one children, sort the children list and the ordervect at the same time (the keys are
-        # the elements of the ordervect)
-        if len(node.children_list) > 1:
-            node.children_list, node.ordervect[1:] = (list(x) for x in zip(
-                *sorted(zip(node.children_list, node.ordervect[1:]), key=lambda pair: t[pair[0]].ordervect)))
+    # the canonical IDs of the sorted children lists and the children lists of the canonical IDs
+    (classes, class_children, compare) = table if table is not None else gen_class_table()
+    class_key = cmp_to_key(compare)
+    for n in reversed(nodes):
+        key = tuple([t[c].canon for c in n.children_list])
+        # if there are different children, sort the children list (stable, so equivalent siblings keep their order)
+        if len(key) == 2:
+            if compare(key[0], key[1]) > 0:
+                n.children_list.reverse()
+                key = key[::-1]
+        elif len(key) > 2 and key.count(key[0]) != len(key):
+            rank = dict((c, i) for i, c in enumerate(sorted(set(key), key=class_key)))
+            n.children_list, key = (list(x) for x in zip(*sorted(zip(n.children_list, key),
+                                                                  key=lambda pair: rank[pair[1]])))
+            key = tuple(key)
+        n.canon = classes.get(key)
+        if n.canon is None:
+            n.canon = classes[key] = len(class_children)
+            class_children.append(key)
 
 
 def reset_labeling(t, s):
@@ -69,9 +163,11 @@ def reset_labeling(t, s):
         t:  a dictionary that contains the nodes of a labeled tree
         s:  the actual node of the tree
     """
-    t[s].label = 0
-    for n in t[s].children_list:
-        reset_labeling(t, n)
+    stack = [s]
+    while stack:
+        n = stack.pop()
+        t[n].label = 0
+        stack.extend(t[n].children_list)
 
 
 def copy_branch_labeling(t, source_node, dest_node):
@@ -82,54 +178,92 @@ def copy_branch_labeling(t, source_node, dest_node):
         source_node:    the source node
         dest_node:      the destination node
     """
-    t[dest_node].label = t[source_node].label
-    for i in xrange(len(t[source_node].children_list)):
-        copy_branch_labeling(t, t[source_node].children_list[i], t[dest_node].children_list[i])
+    stack = [(source_node, dest_node)]
+    while stack:
+        (source, dest) = stack.pop()
+        t[dest].label = t[source].label
+        stack.extend(zip(t[source].children_list, t[dest].children_list))
 
 
-def _next_labeling(t, et, n, en, max_label):
+def _next_labeling(t, et, n, en, max_label, fixed=(), copy_branch=copy_branch_labeling, reset=reset_labeling):
     """Generates the next proper labeling of the given tree.
 
+    The branches are visited with an explicit stack instead of recursion, therefore the depth of the tree is not
+    limited by the interpreter's recursion limit.
+
     Args:
-        t:          a dictionary that contains the nodes of a labeled tree
-        et          a dictionary that contains the nodes of the "equivalence-tree" created from the given tree
-        n:          the actual node of the given t tree
-        en:         the actual node of the given et "equivalence-tree"
-        max_label:  an int that specifies the labeling alphabet's size (the labels come from the set 0..max_label)
+        t:              a dictionary that contains the nodes of a labeled tree
+        et              a dictionary that contains the nodes of the "equivalence-tree" created from the given tree
+        n:              the actual node of the given t tree
+        en:             the actual node of the given et "equivalence-tree"
+        max_label:      an int that specifies the labeling alphabet's size (the labels come from the set 0..max_label)
+        fixed:          the nodes whose labels are not stepped (their branches run out of labelings with their
+                        children)
+        copy_branch:    the function that copies a branch's labeling (see copy_branch_labeling, the instrumented
+                        enumeration replaces it)
+        reset:          the function that resets a branch's labeling (see reset_labeling)
 
     Returns:
         bool: true if it generated all the labelings for the actual branch
     """
 
-    nind = 0
-    for eqnode in et[en].children_list:
-        for j in xrange(et[eqnode].m):
-            anode = t[n].children_list[nind + j]
-            # if the label of the actual node is a valid labeling and the next labeling of the given node is also
-            # valid (we are not at the end of the labeling of the current branch)
-            if t[anode].label < max_label and _next_labeling(t, et, anode, eqnode, max_label):
+    # every frame contains a node, its equivalent node, the index of the actual equivalence class of its children, the
+    # index of the actual child within the class and the index of the class's first child
+    frames = [[n, en, 0, 0, 0]]
+    # the result of the last finished branch (None if a new branch has to be started)
+    result = None
+    while True:
+        frame = frames[-1]
+        (node, enode, ci, j, nind) = frame
+        classes = et[enode].children_list
+        if result is not None:
+            if result:
+                anode = t[node].children_list[nind + j]
                 # for every equivalent siblings of the node till the actual equivalent index (j)
                 for k in xrange(j):
                     # the equivalent branches should be the same
-                    copy_branch_labeling(t, anode, t[n].children_list[nind + k])
-                # returns True, because there was a valid labeling of the current branch
-                return True
-        # increase nind with the current equivalent node's multiplicity
-        nind += et[eqnode].m
-    # if we are at the end of the actual node's children's labeling
-    else:
-        # increase the actual node's labeling
-        t[n].label += 1
+                    copy_branch(t, anode, t[node].children_list[nind + k])
+                # there was a valid labeling of the current branch
+                frames.pop()
+                if not frames:
+                    return True
+                continue
+            # step to the next child (and to the next equivalence class after the last equivalent child)
+            j += 1
+            if j == et[classes[ci]].m:
+                nind += j
+                ci += 1
+                j = 0
+            frame[2:] = [ci, j, nind]
+            result = None
+        if ci < len(classes):
+            anode = t[node].children_list[nind + j]
+            # if the label of the actual node is a valid labeling, the next labeling of its branch is generated
+            if t[anode].label < max_label:
+                frames.append([anode, classes[ci], 0, 0, 0])
+            else:
+                result = False
+            continue
+        # if we are at the end of the actual node's children's labeling => increase the actual node's labeling
+        if node in fixed:
+            result = False
+            frames.pop()
+            if not frames:
+                return result
+            continue
+        t[node].label += 1
         # if the actual label is a valid labeling => reset the node's children's labeling
-        if t[n].label < max_label:
-            for an in t[n].children_list:
-                reset_labeling(t, an)
-        # otherwise reset the actual node's labeling and return False (it means that the current node's labeling is
-        # not valid)
+        if t[node].label < max_label:
+            for an in t[node].children_list:
+                reset(t, an)
+            result = True
+        # otherwise reset the actual node's labeling (it means that the current node's labeling is not valid)
         else:
-            t[n].label = 0
-            return False
-    return True
+            t[node].label = 0
+            result = False
+        frames.pop()
+        if not frames:
+            return result
 
 
 def is_symmetric(t):
@@ -158,83 +292,66 @@ def is_symmetric(t):
     return len(q1) == 0
 
 
-def find_center(lst):
-    """Finds the center of a given free-tree.
-
-    A center of a tree is a node whose distance from every node is minimal, therefore a tree could have at most
-    two centers.
+def find_parents(lst):
+    """Finds the parent and the end of the branch of every node of a pre-order traversal.
 
     Args:
         lst:    a list that contains a pre-order traversal of a free-tree
 
     Returns:
-        list:   contains one or two centers of the tree
+        list:   the index of every node's parent (-1 for the root node)
+        list:   the index of the end of every node's branch + 1
     """
-    # create a list that contains the original indexes as well
-    ind_lst = zip(lst, range(len(lst)))
-    while True:
-        # the actual root's children count and distance
-        cnt_root_children, root_children_distance = 0, ind_lst[0][0] + 1
-        i = 0
-        while i < len(ind_lst):
-            # if the node is the children of the actual root
-            if ind_lst[i][0] == root_children_distance:
-                cnt_root_children += 1
-            # if it is a leaf => delete it from the list
-            if i == len(ind_lst) - 1 or ind_lst[i + 1][0] <= ind_lst[i][0]:
-                del ind_lst[i]
-            else:
-                i += 1
-        # if the root has only one child => it is a leaf too
-        if cnt_root_children < 2:
-            del ind_lst[0]
-        # if there are only 1 or 2 node remained => it is / those are the centers of the tree
-        if len(ind_lst) <= 2:
-            return ind_lst
-
+    parents = [-1] * len(lst)
+    ends = [len(lst)] * len(lst)
+    # the path from the root node to the actual node
+    path = []
+    for i, d in enumerate(lst):
+        while len(path) > d:
+            ends[path.pop()] = i
+        if path:
+            parents[i] = path[-1]
+        path.append(i)
+    return parents, ends
 
-def find_branch(lst, i):
-    """Finds the whole branch that is rooted from the given node.
-    
-    Args:
-        lst: a list that contains a pre-order traversal of a free-tree
-        i: the index of the actual node
-
-    Returns:
-        int: the given i value
-        int: the index of the end of the branch + 1
-    """
-    pi = i
-    i += 1
-    while i < len(lst):
-        if lst[i] <= lst[pi]:
-            break
-        i += 1
-    return pi, i
 
+def find_center(lst):
+    """Finds the center of a given free-tree.
 
-def find_parent(lst, i, dist):
-    """Finds the parent node of the given node in a pre-order traversal list.
+    A center of a tree is a node whose distance from every node is minimal, therefore a tree could have at most
+    two centers.
 
     Args:
-        lst: a list that contains a pre-order traversal of a free-tree
-        i: the index of the actual node
-        dist: the distance of the actual node
+        lst:    a list that contains a pre-order traversal of a free-tree
 
     Returns:
-        int: the index of the node's parent (-1 if it has no parent)
+        list:   contains one or two centers of the tree (distance, index pairs)
     """
-    while i >= 0:
-        if lst[i] < dist:
-            break
-        i -= 1
-    return i
+    parents = find_parents(lst)[0]
+    # the two longest downward paths of every node (the children always follow their parents in the list)
+    down1, down2 = [0] * len(lst), [0] * len(lst)
+    for i in xrange(len(lst) - 1, 0, -1):
+        p, h = parents[i], down1[i] + 1
+        if h > down1[p]:
+            down1[p], down2[p] = h, down1[p]
+        elif h > down2[p]:
+            down2[p] = h
+    # the eccentricity of every node is its longest downward or upward path
+    up = [0] * len(lst)
+    for i in xrange(1, len(lst)):
+        p = parents[i]
+        up[i] = 1 + max(up[p], down2[p] if down1[i] + 1 == down1[p] else down1[p])
+    ecc = [max(u, d) for u, d in zip(up, down1)]
+    radius = min(ecc)
+    return [(lst[i], i) for i in xrange(len(lst)) if ecc[i] == radius]
 
 
 def balance_tree_list(lst, centers):
     """Returns a tree's pre-order traversal that is balanced.
 
-    A balanced tree is a rooted tree whose root is the same as one of the tree's centers.
+    A balanced tree is a rooted tree whose root is the same as one of the tree's centers. The traversal starts with the
+    center's branch, then it walks up through the center's ancestors: every ancestor is followed by its children that
+    are located after the path in the list (in reversed order) and then by its children that precede the path.
 
     Args:
         lst:        a list that contains a pre-order traversal of a free-tree
@@ -248,62 +365,140 @@ def balance_tree_list(lst, centers):
     if len(centers) == 1 and index == 0:
         return lst
 
-    # find all the elements that are under the center node
-    (pmi, mi) = find_branch(lst, index)
+    (parents, ends) = find_parents(lst)
     if len(centers) == 1:
         # if there is only one center => the center's branch will be the first part of the balanced tree
-        balanced_list = [d - distance for d in lst[pmi:mi]]
+        balanced_list = [d - distance for d in lst[index:ends[index]]]
     else:
         # if there are two centers => the node that has the lower index will be the center and the higher indexed node
-        # branch will be the first part of the reordered tree
+        # branch will be the first part of the reordered tree (followed by the center's children after and before it)
         index2 = max(centers, key=lambda c: c[1])[1]
-        balanced_list = [0] + [d - distance for d in lst[index2: mi]] + [d - distance for d in lst[pmi + 1:index2]]
-
-    # take every branch that is located in the list after the center's branch
-    parent_index = index - 1
-    while mi < len(lst):
-        (pmi, mi) = find_branch(lst, mi)
-        parent_index = find_parent(lst, parent_index, lst[pmi])
-        # rearrange the list => copy the actual branch to its parent's location
-        lst = lst[:parent_index + 1] + lst[pmi:mi] + lst[parent_index + 1:]
-        index += mi - pmi
-        mi += mi - pmi
-
-    # copy the remaining branches from the list by going upper in the center's parents
-    parent_index = index
-    parent_dist = 1
-    while True:
-        child_index = parent_index
-        parent_index = find_parent(lst, parent_index - 1, lst[parent_index])
-        # if we hit the previous root node (the beginning of the list) => we break from the loop
-        if parent_index < 0:
-            break
+        balanced_list = [0] + [d - distance for d in lst[index2:ends[index]]] + \
+                        [d - distance for d in lst[index + 1:index2]]
+
+    # go upper in the center's parents and append their remaining branches with corrected distances
+    child_index, parent_index, parent_dist = index, parents[index], 1
+    while parent_index >= 0:
         diff = lst[parent_index] - parent_dist
-        # append the corrected distances from the current branch
-        for i in xrange(parent_index, child_index):
-            balanced_list.append(lst[i] - diff)
-        parent_dist += 1
+        balanced_list.append(parent_dist)
+        before, after = [], []
+        c = parent_index + 1
+        while c < ends[parent_index]:
+            if c != child_index:
+                (before if c < child_index else after).append(c)
+            c = ends[c]
+        for c in reversed(after):
+            balanced_list.extend([d - diff for d in lst[c:ends[c]]])
+        for c in before:
+            balanced_list.extend([d - diff for d in lst[c:ends[c]]])
+        child_index, parent_index, parent_dist = parent_index, parents[parent_index], parent_dist + 1
 
     # return the newly created balanced list
     return balanced_list
 
 
+def balance_tree_order(lst, centers):
+    """Returns the indexes of the original traversal's nodes in the order of the balanced traversal.
+
+    The nodes are visited in the same order as balance_tree_list visits them, so the i-th node of the balanced traversal
+    is the node at the returned list's i-th index of the original traversal.
+
+    Args:
+        lst:        a list that contains a pre-order traversal of a free-tree
+        centers:    the center nodes (one or two) of the given tree (empty if the tree is not balanced)
+
+    Returns:
+        list:       the original indexes of the balanced traversal's nodes
+    """
+    if not centers:
+        return range(len(lst))
+    index = min(centers, key=lambda c: c[1])[1]
+    if len(centers) == 1 and index == 0:
+        return range(len(lst))
+
+    (parents, ends) = find_parents(lst)
+    if len(centers) == 1:
+        order = range(index, ends[index])
+    else:
+        index2 = max(centers, key=lambda c: c[1])[1]
+        order = [index] + range(index2, ends[index]) + range(index + 1, index2)
+
+    child_index, parent_index = index, parents[index]
+    while parent_index >= 0:
+        order.append(parent_index)
+        before, after = [], []
+        c = parent_index + 1
+        while c < ends[parent_index]:
+            if c != child_index:
+                (before if c < child_index else after).append(c)
+            c = ends[c]
+        for c in reversed(after):
+            order.extend(xrange(c, ends[c]))
+        for c in before:
+            order.extend(xrange(c, ends[c]))
+        child_index, parent_index = parent_index, parents[parent_index]
+    return order
+
+
+def labeling_order(lst, edge_labeling=False):
+    """Returns the indexes of an original labeling's labels in the order of the balanced tree's labelings.
+
+    The labelings of get_labeled_graphs belong to the balanced traversal: labeling[i] of the balanced tree is
+    original_labeling[order[i]]. A vertex labeling contains the labels of the nodes, an edge labeling contains the
+    labels of the edges between the nodes and their parents (the root node has no parent edge). The edges that lie on
+    the path between the original root and the center change their direction in the balanced tree.
+
+    Args:
+        lst:            a list that contains a pre-order traversal of a free-tree
+        edge_labeling:  edge or vertex labeling
+
+    Returns:
+        list:           the original indexes of the balanced labeling's labels
+    """
+    centers = find_center(lst) if len(lst) > 2 else []
+    order = balance_tree_order(lst, centers)
+    if not edge_labeling:
+        return order
+    parents = find_parents(lst)[0]
+    balanced_parents = find_parents(balance_tree_list(lst, centers) if centers else lst)[0]
+    edges = []
+    for i in xrange(1, len(lst)):
+        (node, parent) = (order[i], order[balanced_parents[i]])
+        # the edge belongs to the original child node (the label of node i is at index i - 1)
+        edges.append((node if parents[node] == parent else parent) - 1)
+    return edges
+
+
 def eq_subtree(t, et, n, en):
     """Generates the "equivalence-tree" from the given rooted tree.
 
+    The nodes of the "equivalence-tree" are numbered in pre-order.
+
     Args:
         t:  a dictionary that contains the nodes of a labeled tree
         et: a dictionary that contains the nodes of the "equivalence-tree" created from the given tree
         n:  the actual node of the given t tree
         en: the actual node of the given et "equivalence-tree"
     """
-    i = 0
-    while i < len(t[n].children_list):
-        eq_cnt = 1
-        j = i + 1
-        while j < len(t[n].children_list) and t[t[n].children_list[j]].ordervect == t[t[n].children_list[i]].ordervect:
-            j += 1
-            eq_cnt += 1
+    # the pending equivalence classes: (parent node in the "equivalence-tree", first node of the class, multiplicity)
+    stack = []
+
+    def push_classes(n, en):
+        classes = []
+        i = 0
+        while i < len(t[n].children_list):
+            eq_cnt = 1
+            j = i + 1
+            while j < len(t[n].children_list) and t[t[n].children_list[j]].canon == t[t[n].children_list[i]].canon:
+                j += 1
+                eq_cnt += 1
+            classes.append((en, t[n].children_list[i], eq_cnt))
+            i = j
+        stack.extend(reversed(classes))
+
+    push_classes(n, en)
+    while stack:
+        (en, n, eq_cnt) = stack.pop()
         # create a node in the equvivalance tree
         an = len(et)
         et[an] = Node(en, 0)
@@ -311,12 +506,10 @@ def eq_subtree(t, et, n, en):
         et[an].m = eq_cnt
         # append to its parent's children list
         et[en].children_list.append(an)
-        # call the eq_subtree recursively
-        eq_subtree(t, et, t[n].children_list[i], an)
-        i = j
+        push_classes(n, an)
 
 
-def gen_eq_tree(t, centers):
+def gen_eq_tree(t, centers, table=None):
     """Returns the "equivalence-tree" from the given rooted tree.
 
    An "equivalence-tree" of a tree is a tree that contains all the automorphisms of the given tree with the proper
@@ -325,13 +518,14 @@ def gen_eq_tree(t, centers):
     Args:
         t:          a dictionary that contains the nodes of a labeled tree
         centers:    the center nodes (one or two) of the given tree
+        table:      the table of the canonical IDs of the branches (see gen_class_table)
 
     Returns:
         dictionary: contains the nodes of a labeled tree
         dictionary: the nodes of the "equivalence-tree" created from the given tree
     """
     # sort the tree
-    sort_tree(t, t[0])
+    sort_tree(t, t[0], table)
     # if the tree is symmetric (it must have 2 centers)
     if len(t) == 2 or len(centers) == 2 and is_symmetric(t):
         t[0].symm = True
@@ -344,7 +538,7 @@ def gen_eq_tree(t, centers):
         # remove the edge between the old root and it's first child
         t[0].children_list.remove(1)
         # sort the tree again
-        sort_tree(t, t[-1])
+        sort_tree(t, t[-1], table)
     else:
         root_id = 0
 
@@ -357,11 +551,12 @@ def gen_eq_tree(t, centers):
     return t, et
 
 
-def gen_tree_from_list(lst):
+def gen_tree_from_list(lst, table=None):
     """Generates a directed, labeled tree from the given list.
 
     Args:
         lst:        a list that contains a pre-order traversal of a free-tree
+        table:      the table of the canonical IDs of the branches (see gen_class_table)
 
     Returns:
         list:       a list that contains a pre-order traversal of a balanced tree (according to the given tree)
@@ -390,7 +585,7 @@ def gen_tree_from_list(lst):
         pnode = node
         node += 1
 
-    (t, et) = gen_eq_tree(t, centers)
+    (t, et) = gen_eq_tree(t, centers, table)
     return lst, t, et
 
 
@@ -424,86 +619,3627 @@ def next_labeling(t, et, max_label, edge_labeling):
         list:           the next labeling of the given tree
     """
 
-    keys = sorted(t)
+    keys = labeling_keys(t, edge_labeling)
+    (root, fixed) = fixed_nodes(t, edge_labeling)
+    yield graph_labeling_to_list(t, keys)
+    while _next_labeling(t, et, root, root, max_label, fixed):
+        yield graph_labeling_to_list(t, keys)
+
+
+def fixed_nodes(t, edge_labeling):
+    """Returns the root of a tree and the nodes whose labels are not stepped.
+
+    Args:
+        t:              a dictionary that contains the nodes of a labeled tree
+        edge_labeling:  edge or vertex labeling
+
+    Returns:
+        int:            the root node of the tree
+        frozenset:      the fixed nodes (see _next_labeling)
+    """
+
     if t[0].symm:
+        # the "fictive" center node has no label
+        (root, fixed) = (-1, [-1])
         if edge_labeling:
-            # remove the temporary and the real root nodes' from the keys
-            keys.remove(-1)
-            keys.remove(0)
-            yield graph_labeling_to_list(t, keys)
-            while _next_labeling(t, et, -1, -1, max_label):
-                # if the tree is symmetric => the whole process ends when the "fictive" center node's labeling changes
-                if t[-1].label != 0:
-                    break
-                # skip the "redundant" labelings
-                if t[0].label == 0 or t[1].label != 0:
-                    yield graph_labeling_to_list(t, keys)
-        else:
-            # vertex labeling
-            keys.remove(-1)
-            yield graph_labeling_to_list(t, keys)
-            while _next_labeling(t, et, -1, -1, max_label):
-                # if the tree is symmetric => the whole process ends when the "fictive" center node's labeling changes
-                if t[-1].label != 0:
-                    break
-                yield graph_labeling_to_list(t, keys)
+            # the label of the second center belongs to the central edge: the first center carries the same label, it
+            # is copied together with the second center's branch
+            fixed.append(0)
     else:
+        (root, fixed) = (0, [])
         if edge_labeling:
-            # remove the root node from the keys
-            keys.remove(0)
-            yield graph_labeling_to_list(t, keys)
-            while _next_labeling(t, et, 0, 0, max_label):
-                # if the root node's label has changed => terminate (since we shift each vertex label to the parent's
-                # edge)
-                if t[0].label != 0:
-                    break
-                yield graph_labeling_to_list(t, keys)
-        else:
-            yield graph_labeling_to_list(t, keys)
-            while _next_labeling(t, et, 0, 0, max_label):
-                yield graph_labeling_to_list(t, keys)
+            # the root node has no parent edge
+            fixed.append(0)
+    return root, frozenset(fixed)
 
 
-def is_proper_traversal(lst):
-    """Determines whether the given list is a valid nonempty pre-order traversal of a tree or not.
+class EnumerationStats(object):
+    """The counters and the timers of an instrumented enumeration (see get_labeled_graphs_instrumented).
+
+    The stages are next_labeling (the stepping of a labeling, it contains the copies and the resets of its branches),
+    copy_branch_labeling, reset_labeling and graph_labeling_to_list (the building of the tuples). The touched nodes are
+    the nodes whose labels are written by a stage. The compact enumeration has the CompactTree (the building of the
+    arrays), step_compact_labeling (the stepping, it contains the copies of the branches) and labels_to_tuple stages,
+    its touched nodes are the positions whose labels are changed by a step.
+    """
+
+    __slots__ = ('calls', 'seconds', 'labelings', 'nodes_touched', 'copied_sizes', 'profiler')
+
+    STAGES = ('gen_tree_from_list', 'next_labeling', 'copy_branch_labeling', 'reset_labeling', 'graph_labeling_to_list',
+              'CompactTree', 'step_compact_labeling', 'labels_to_tuple')
+
+    def __init__(self, profiler=None):
+        """Initializes the zero counters.
+
+        Args:
+            profiler:   an object that has enable and disable methods (like cProfile.Profile): it is enabled while the
+                        enumeration runs (it is disabled while the caller processes the yielded labelings)
+        """
+        self.calls = dict((stage, 0) for stage in self.STAGES)
+        self.seconds = dict((stage, 0.0) for stage in self.STAGES)
+        self.labelings = 0
+        self.nodes_touched = 0
+        # the count of the copied branches by their sizes
+        self.copied_sizes = {}
+        self.profiler = profiler
+
+    def nodes_per_labeling(self):
+        """Returns the average count of the touched nodes per yielded labeling."""
+        return float(self.nodes_touched) / self.labelings if self.labelings else 0.0
+
+    def __str__(self):
+        """Makes a report from the counters."""
+        lines = ["%-24s %12s %12s" % ("stage", "calls", "seconds")]
+        lines.extend("%-24s %12d %12.4f" % (stage, self.calls[stage], self.seconds[stage]) for stage in self.STAGES)
+        lines.append("labelings: %d, touched nodes per labeling: %.2f, copied branches: %d" %
+                     (self.labelings, self.nodes_per_labeling(), sum(self.copied_sizes.itervalues())))
+        return "\n".join(lines)
+
+
+def next_labeling_instrumented(t, et, root, keys, max_label, fixed, stats):
+    """Yields all the labelings of a tree like next_labeling, while its stages are measured.
 
     Args:
-        lst:    a list that contains integers
+        t:          a dictionary that contains the nodes of a labeled tree
+        et:         a dictionary that contains the nodes of the "equivalence-tree" created from the given tree
+        root:       the root node of the tree
+        keys:       the keys of the labeled nodes
+        max_label:  an int that specifies the labeling alphabet's size
+        fixed:      the nodes whose labels are not stepped (see _next_labeling)
+        stats:      an EnumerationStats object
+    """
+    (calls, seconds, copied_sizes, profiler) = (stats.calls, stats.seconds, stats.copied_sizes, stats.profiler)
+    # the size of every branch (the nodes are reached from their parents in the stack order)
+    size = {}
+    order = [root]
+    for n in order:
+        order.extend(t[n].children_list)
+    for n in reversed(order):
+        size[n] = 1 + sum(size[c] for c in t[n].children_list)
+
+    def copy_branch(t, source_node, dest_node):
+        start = timer()
+        copy_branch_labeling(t, source_node, dest_node)
+        seconds['copy_branch_labeling'] += timer() - start
+        calls['copy_branch_labeling'] += 1
+        copied_sizes[size[source_node]] = copied_sizes.get(size[source_node], 0) + 1
+        stats.nodes_touched += size[source_node]
+
+    def reset(t, s):
+        start = timer()
+        reset_labeling(t, s)
+        seconds['reset_labeling'] += timer() - start
+        calls['reset_labeling'] += 1
+        stats.nodes_touched += size[s]
+
+    def to_list():
+        start = timer()
+        lblvect = graph_labeling_to_list(t, keys)
+        seconds['graph_labeling_to_list'] += timer() - start
+        calls['graph_labeling_to_list'] += 1
+        stats.labelings += 1
+        return lblvect
+
+    if profiler is not None:
+        profiler.enable()
+    try:
+        lblvect = to_list()
+        while True:
+            if profiler is not None:
+                profiler.disable()
+            yield lblvect
+            if profiler is not None:
+                profiler.enable()
+            start = timer()
+            stepped = _next_labeling(t, et, root, root, max_label, fixed, copy_branch, reset)
+            seconds['next_labeling'] += timer() - start
+            calls['next_labeling'] += 1
+            if not stepped:
+                break
+            # the label of the stepped node
+            stats.nodes_touched += 1
+            lblvect = to_list()
+    finally:
+        if profiler is not None:
+            profiler.disable()
+
+
+class CompactTree(object):
+    """Array-backed representation of a sorted tree.
+
+    The nodes are renumbered by the pre-order traversal of the sorted tree (the "position" of the node), therefore
+    every branch occupies a contiguous range of positions and equivalent branches have the same layout. The children
+    are stored in CSR layout: the children of the node at position p are children[child_offsets[p]:child_offsets[p + 1]].
+    The post-order of the positions and the "jumps" (the nearest ancestor-or-self of every node that has preceding
+    equivalent siblings) drive the non-recursive stepping of the labelings.
+    """
+
+    __slots__ = ('ids', 'size', 'child_offsets', 'children', 'class_first', 'symm', 'parents', 'slots', 'post', 'jumps')
+
+    def __init__(self, t, et):
+        """Initializes the compact tree from a sorted tree and its "equivalence-tree".
+
+        Args:
+            t:  a dictionary that contains the nodes of a labeled tree
+            et: a dictionary that contains the nodes of the "equivalence-tree" created from the given tree
+        """
+        self.symm = t[0].symm
+        root_id = -1 if self.symm else 0
+        # pre-order traversal of the sorted tree
+        self.ids = array('l')
+        stack = [root_id]
+        while stack:
+            n = stack.pop()
+            self.ids.append(n)
+            stack.extend(reversed(t[n].children_list))
+        pos = dict((n, p) for p, n in enumerate(self.ids))
+
+        self.child_offsets = array('l', [0]) * (len(self.ids) + 1)
+        self.children = array('l')
+        # the child slot of the first sibling that is equivalent to the child at the given slot
+        self.class_first = array('l')
+        # the nodes of the "equivalence-tree" that belong to the nodes of the tree
+        eq_nodes = {root_id: root_id}
+        for p, n in enumerate(self.ids):
+            self.child_offsets[p] = len(self.children)
+            nind = 0
+            for eqnode in et[eq_nodes.pop(n)].children_list:
+                first = len(self.children)
+                for j in xrange(et[eqnode].m):
+                    anode = t[n].children_list[nind + j]
+                    eq_nodes[anode] = eqnode
+                    self.children.append(pos[anode])
+                    self.class_first.append(first)
+                nind += et[eqnode].m
+        self.child_offsets[len(self.ids)] = len(self.children)
+
+        self.size = array('l', [1]) * len(self.ids)
+        for p in xrange(len(self.ids) - 1, -1, -1):
+            for s in xrange(self.child_offsets[p], self.child_offsets[p + 1]):
+                self.size[p] += self.size[self.children[s]]
+
+        # the parent and the child slot of every position (-1 for the root)
+        self.parents = array('l', [-1]) * len(self.ids)
+        self.slots = array('l', [-1]) * len(self.ids)
+        for p in xrange(len(self.ids)):
+            for s in xrange(self.child_offsets[p], self.child_offsets[p + 1]):
+                self.parents[self.children[s]] = p
+                self.slots[self.children[s]] = s
+        # the jumps can be computed in pre-order, because the parents precede their children
+        self.jumps = array('l', [-1]) * len(self.ids)
+        for p in xrange(1, len(self.ids)):
+            s = self.slots[p]
+            self.jumps[p] = p if self.class_first[s] < s else self.jumps[self.parents[p]]
+        self.post = array('l')
+        stack = [(0, False)]
+        while stack:
+            (p, visited) = stack.pop()
+            if visited:
+                self.post.append(p)
+            else:
+                stack.append((p, True))
+                stack.extend((self.children[s], False)
+                             for s in xrange(self.child_offsets[p + 1] - 1, self.child_offsets[p] - 1, -1))
+
+    def positions(self, keys):
+        """Returns the positions of the given nodes of the original tree.
+
+        Args:
+            keys:   the keys of the nodes in the original tree
+
+        Returns:
+            list:   the positions of the nodes
+        """
+        pos = dict((n, p) for p, n in enumerate(self.ids))
+        return [pos[n] for n in keys]
+
+
+def gen_labels_getter(positions):
+    """Returns a function that builds a labeling tuple from the given positions of a label array.
+
+    Args:
+        positions:  a list of positions of the label array
 
     Returns:
-        bool:   the given list is valid or not
+        function:   maps a label array to a tuple
     """
+    if len(positions) == 0:
+        return lambda labels: ()
+    if len(positions) == 1:
+        p = positions[0]
+        return lambda labels: (labels[p],)
+    return itemgetter(*positions)
 
-    if len(lst) == 0 or lst[0] != 0:
-        return False
-    for i in xrange(len(lst) - 1):
-        # if the actual element of the list is not an integer or the next number (distance) is greater than the current
-        # number (distance) + 1 => it is not a valid list
-        if type(lst[i]) != int or lst[i + 1] > lst[i] + 1:
+
+def compact_labeling_positions(ct, edge_labeling):
+    """Returns the positions of the compact tree's nodes whose labels form a labeling (in the order of next_labeling).
+
+    Args:
+        ct:             a CompactTree object
+        edge_labeling:  edge or vertex labeling
+
+    Returns:
+        list:           the positions of the labeled nodes
+    """
+    keys = sorted(ct.ids)
+    if ct.symm:
+        keys.remove(-1)
+    if edge_labeling:
+        keys.remove(0)
+    return ct.positions(keys)
+
+
+def fixed_positions(ct, edge_labeling):
+    """Returns the positions of the compact tree whose labels are not stepped.
+
+    The labels of the roots are not stepped: the "fictive" center node has no label, neither has the root of an edge
+    labeling. In a symmetric edge labeling the first center carries the label of the central edge (the label of the
+    second center) which is copied together with the second center's branch.
+
+    Args:
+        ct:             a CompactTree object
+        edge_labeling:  edge or vertex labeling
+
+    Returns:
+        set:            the fixed positions
+    """
+    fixed = set()
+    if ct.symm or edge_labeling:
+        fixed.add(0)
+    if ct.symm and edge_labeling:
+        fixed.update(ct.positions([0]))
+    return fixed
+
+
+def stepped_positions(ct, edge_labeling):
+    """Returns the positions of the compact tree whose labels are stepped in post-order (the digits of the odometer of
+    next_labeling, the least significant one first).
+
+    Args:
+        ct:             a CompactTree object
+        edge_labeling:  edge or vertex labeling
+
+    Returns:
+        array:          the stepped positions
+    """
+    fixed = fixed_positions(ct, edge_labeling)
+    return array('l', (p for p in ct.post if p not in fixed))
+
+
+def copy_equivalent_branches(ct, labels, c, changes=None):
+    """Copies the labeling of a changed branch to the preceding equivalent siblings of the branch and of its ancestors.
+
+    Args:
+        ct:         a CompactTree object
+        labels:     the label array of the compact tree's nodes
+        c:          the nearest ancestor-or-self of the changed position that has preceding equivalent siblings (see
+                    CompactTree.jumps, -1 if there is none)
+        changes:    if it is a dictionary, the original labels of the changed positions are stored in it (only the
+                    differing labels are copied)
+    """
+    (children, class_first, size, parents, slots, jumps) = (ct.children, ct.class_first, ct.size, ct.parents, ct.slots,
+                                                            ct.jumps)
+    while c >= 0:
+        s = slots[c]
+        sz = size[c]
+        for q in xrange(class_first[s], s):
+            if changes is None:
+                d = children[q]
+                labels[d:d + sz] = labels[c:c + sz]
+                continue
+            d = children[q] - c
+            for i in xrange(c, c + sz):
+                if labels[i + d] != labels[i]:
+                    changes.setdefault(i + d, labels[i + d])
+                    labels[i + d] = labels[i]
+        c = jumps[parents[c]]
+
+
+def step_compact_labeling(ct, labels, max_label, edge_labeling, changes=None):
+    """Steps the label array of a compact tree through all the labelings (in the same order as next_labeling).
+
+    Args:
+        ct:             a CompactTree object
+        labels:         the label array of the compact tree's nodes (all zeros at the beginning)
+        max_label:      an int that specifies the labeling alphabet's size
+        edge_labeling:  edge or vertex labeling
+        changes:        if it is a dictionary, the original labels of the changed positions are stored in it
+
+    Yields:
+        None:           every time the label array contains the next labeling
+    """
+
+    (children, class_first, size, parents, slots, jumps) = (ct.children, ct.class_first, ct.size, ct.parents, ct.slots,
+                                                            ct.jumps)
+    post = stepped_positions(ct, edge_labeling)
+
+    # The odometer of next_labeling visits the nodes in post-order: the exhausted nodes are reset to zero until the
+    # first node that has a next label. Then the changed branch is copied to the preceding equivalent siblings of its
+    # ancestors.
+    def _next():
+        for p in post:
+            label = labels[p] + 1
+            if label < max_label:
+                labels[p] = label
+                break
+            labels[p] = 0
+        else:
             return False
-    return type(lst[-1]) == int
+        c = jumps[p]
+        while c >= 0:
+            # copy the labeling of the branch to the preceding equivalent siblings
+            s = slots[c]
+            sz = size[c]
+            for q in xrange(class_first[s], s):
+                d = children[q]
+                labels[d:d + sz] = labels[c:c + sz]
+            c = jumps[parents[c]]
+        return True
+
+    def _next_changes():
+        for p in post:
+            changes.setdefault(p, labels[p])
+            label = labels[p] + 1
+            if label < max_label:
+                labels[p] = label
+                break
+            labels[p] = 0
+        else:
+            return False
+        copy_equivalent_branches(ct, labels, jumps[p], changes)
+        return True
 
+    step = _next if changes is None else _next_changes
+    yield
+    while step():
+        yield
 
-def get_labeled_graphs(lst, max_label=2, edge_labeling=False):
-    """Generates all the given free-tree's vertex / edge labelings.
+
+def step_bounded_labeling(ct, labels, max_label, edge_labeling, bounds, changes=None):
+    """Steps the label array of a compact tree through the labelings whose label histograms are within the bounds (in
+    the same order as next_labeling).
 
     Args:
-        lst:            a list that contains a pre-order traversal of a free-tree
+        ct:             a CompactTree object
+        labels:         the label array of the compact tree's nodes (all zeros at the beginning)
         max_label:      an int that specifies the labeling alphabet's size
-        edge_labeling:  if this is set to true the function generates the edge labelings of the given tree (otherwise
-                        the vertex labelings)
+        edge_labeling:  edge or vertex labeling
+        bounds:         the (lower bounds, upper bounds) lists of the label histograms (see label_count_bounds)
+        changes:        if it is a dictionary, the original labels of the changed positions are stored in it
+
+    Yields:
+        None:           every time the label array contains the next labeling
     """
 
-    if type(lst) is not list or not is_proper_traversal(lst):
-        raise ValueError("The given object should be a nonempty list that contains a valid pre-order traversal of a "
-                         "free-tree...")
-    if type(max_label) is not int or max_label <= 0:
-        raise ValueError("max_label should be a positive integer...")
+    (children, class_first, parents, jumps) = (ct.children, ct.class_first, ct.parents, ct.jumps)
+    post = stepped_positions(ct, edge_labeling)
 
-    (lst, t, et) = gen_tree_from_list(lst)
-    # print lst, "\n"
-    labeling_cnt = 0
-    for lblvect in next_labeling(t, et, max_label, edge_labeling):
-        labeling_cnt += 1
-        yield lblvect
-    # print "Count of possible labelings:", labeling_cnt
+    (lo, hi) = bounds
+    hi = [len(post) if h is None else h for h in hi]
+    counted = bytearray(len(labels))
+    for p in post:
+        counted[p] = 1
+    # the count of the labeled earlier equivalent siblings of every position
+    earlier = array('l', [0]) * len(labels)
+    for s in xrange(len(children)):
+        if class_first[s] < s:
+            earlier[children[s]] = earlier[children[s - 1]] + counted[children[s - 1]]
+    # the full post-order (with the fixed positions), the index of every position in it and the count of the
+    # labeled positions that precede every index (the free positions when the position at the index is stepped)
+    order = ct.post
+    index = array('l', [0]) * len(labels)
+    before = array('l', [0]) * (len(order) + 1)
+    for (i, p) in enumerate(order):
+        index[p] = i
+        before[i + 1] = before[i] + counted[p]
+    # the offset of the next equivalent sibling of every position (0 for the last sibling of a class) and the
+    # preceding equivalent sibling of every position (-1 for the first sibling of a class)
+    later = array('l', [0]) * len(labels)
+    preceding = array('l', [-1]) * len(labels)
+    for s in xrange(len(children)):
+        if class_first[s] < s:
+            later[children[s - 1]] = children[s] - children[s - 1]
+            preceding[children[s]] = children[s - 1]
+    # the nearest ancestor-or-self of every position that has a next equivalent sibling (the positions are in
+    # pre-order, so the parents precede their children)
+    tight_jumps = array('l', [-1]) * len(labels)
+    for p in xrange(1, len(labels)):
+        tight_jumps[p] = p if later[p] else tight_jumps[parents[p]]
+    # the branches whose labelings are still equal to their next equivalent siblings' labelings
+    tight = bytearray(len(labels))
+
+    # The histogram of the labeled positions that are not free (the free positions precede the stepped position in
+    # the post-order and get their labels from fill), the missing counts of the lower bounds, the remaining
+    # capacities of the upper bounds and their sums. They are updated with every counted label, so the bounds are
+    # tested at the stepped position without recounting the labeling.
+    hist = [0] * max_label
+    need = list(lo)
+    cap = list(hi)
+    totals = [sum(need), sum(cap), 0]  # missing counts, capacities, count of the exceeded upper bounds
+
+    def count(label, d):
+        cnt = hist[label] + d
+        hist[label] = cnt
+        missing = lo[label] - cnt if lo[label] > cnt else 0
+        totals[0] += missing - need[label]
+        need[label] = missing
+        cap[label] -= d
+        totals[1] -= d
+        if cnt == hi[label] + (d > 0):
+            totals[2] += d
+
+    def feasible(free, mins, mins_total):
+        # The free positions can get any labels, but mins[v] of them (the earlier equivalent siblings of the stepped
+        # branches) cannot get smaller labels than v.
+        if totals[2] or not totals[0] <= free <= totals[1]:
+            return False
+        if mins_total:
+            need_below = totals[0]
+            mins_above = cap_above = 0
+            for label in xrange(max_label - 1, 0, -1):
+                mins_above += mins[label]
+                cap_above += cap[label]
+                need_below -= need[label]
+                if mins_above > cap_above or need_below > free - mins_above:
+                    return False
+        return True
+
+    def set_label(p, label):
+        if changes is not None:
+            changes.setdefault(p, labels[p])
+        labels[p] = label
+
+    def fill(stop):
+        # Gives the first labels to the positions that precede the stop index of the post-order (in reversed
+        # post-order: the most significant position first). The label of a position is the least one that keeps
+        # its tight branches not smaller than their next equivalent siblings and that can be completed within the
+        # bounds, so the filled labeling is the first one after the stepped position. Returns the index of the first
+        # position that has no such label (-1 if every position got a label).
+        # The unlabeled branches cannot get smaller root labels than their next equivalent siblings: these are the
+        # preceding siblings of the stepped position and of its ancestors.
+        mins = [0] * max_label
+        mins_total = 0
+        if stop < len(order):
+            c = jumps[order[stop]]
+            while c >= 0:
+                if counted[preceding[c]]:
+                    mins[labels[c]] += 1
+                    mins_total += 1
+                c = jumps[parents[c]]
+        for i in xrange(stop - 1, -1, -1):
+            p = order[i]
+            if later[p]:
+                tight[p] = 1
+                if counted[p]:
+                    mins[labels[p + later[p]]] -= 1
+                    mins_total -= 1
+            # the least label that keeps the tight branches (the ones within the filled positions) ordered
+            least = 0
+            c = tight_jumps[p]
+            while c >= 0 and index[c] < stop:
+                if tight[c]:
+                    least = max(least, labels[p + later[c]])
+                c = tight_jumps[parents[c]]
+            if counted[p]:
+                label = least
+                while label < max_label:
+                    count(label, 1)
+                    if feasible(before[i], mins, mins_total):
+                        break
+                    count(label, -1)
+                    label += 1
+                if label == max_label:
+                    return i
+            else:
+                # the fixed first center carries the label of the second center
+                label = least
+            set_label(p, label)
+            c = tight_jumps[p]
+            while c >= 0 and index[c] < stop:
+                if tight[c] and label > labels[p + later[c]]:
+                    tight[c] = 0
+                c = tight_jumps[parents[c]]
+            if preceding[p] >= 0 and counted[preceding[p]]:
+                mins[label] += 1
+                mins_total += 1
+        return -1
+
+    def skip(dead_end):
+        # the positions up to the dead end get the last labels, so the next step continues after them
+        for i in xrange(dead_end + 1):
+            p = order[i]
+            set_label(p, max_label - 1)
+            if counted[p]:
+                count(max_label - 1, 1)
+
+    def _next_bounded():
+        while True:
+            for (free, p) in enumerate(post):
+                if changes is not None:
+                    changes.setdefault(p, labels[p])
+                count(labels[p], -1)
+                label = labels[p] + 1
+                (mins, mins_total, siblings) = (None, 0, 0)
+                if label < max_label and p != 0:
+                    # the earlier equivalent siblings of p's ancestors are not smaller than the ancestors
+                    c = jumps[parents[p]]
+                    siblings = earlier[p]
+                    if c >= 0 or siblings:
+                        mins = [0] * max_label
+                        while c >= 0:
+                            mins[labels[c]] += earlier[c]
+                            mins_total += earlier[c]
+                            c = jumps[parents[c]]
+                # skip the labels that cannot be completed to a labeling within the bounds
+                while label < max_label:
+                    count(label, 1)
+                    if siblings:
+                        mins[label] += siblings
+                    feasible_label = feasible(free, mins, mins_total + siblings)
+                    if siblings:
+                        mins[label] -= siblings
+                    if feasible_label:
+                        break
+                    count(label, -1)
+                    label += 1
+                if label < max_label:
+                    labels[p] = label
+                    break
+                labels[p] = 0
+            else:
+                return False
+            # the exhausted positions get the first labeling that can be completed (instead of stepping through
+            # the labelings that are out of the bounds)
+            dead_end = fill(index[p])
+            if dead_end < 0:
+                return True
+            skip(dead_end)
+
+    # a labeling without labeled positions is not checked by fill
+    if not post and not feasible(0, None, 0):
+        return
+    dead_end = fill(len(order))
+    if dead_end >= 0:
+        skip(dead_end)
+        if not _next_bounded():
+            return
+    yield
+    while _next_bounded():
+        yield
+
+
+def step_compatible_labeling(ct, labels, max_label, edge_labeling, relation, changes=None):
+    """Steps the label array of a compact tree through the labelings whose adjacent labels are compatible (in the same
+    order as next_labeling).
+
+    Args:
+        ct:             a CompactTree object
+        labels:         the label array of the compact tree's nodes (all zeros at the beginning)
+        max_label:      an int that specifies the labeling alphabet's size
+        edge_labeling:  edge or vertex labeling
+        relation:       the compatibility matrix of the adjacent labels (see compatibility_matrix)
+        changes:        if it is a dictionary, the original labels of the changed positions are stored in it
+
+    Yields:
+        None:           every time the label array contains the next labeling
+    """
+
+    (children, child_offsets, size, parents, slots, jumps) = (ct.children, ct.child_offsets, ct.size, ct.parents,
+                                                              ct.slots, ct.jumps)
+    post = stepped_positions(ct, edge_labeling)
+
+    # the roots without label do not constrain their children
+    checked = bytearray(len(labels))
+    for p in xrange(1, len(labels)):
+        checked[p] = parents[p] != 0 or not (ct.symm or edge_labeling)
+    # the labels of every branch that can be completed to a compatible labeling of the branch (bottom-up)
+    allowed = [None] * len(labels)
+    for p in xrange(len(labels) - 1, -1, -1):
+        mask = [True] * max_label
+        for s in xrange(child_offsets[p], child_offsets[p + 1]):
+            c = children[s]
+            for label in xrange(max_label):
+                mask[label] = mask[label] and any(not checked[c] or relation[label][child_label]
+                                                  for child_label in allowed[c])
+        allowed[p] = [label for label in xrange(max_label) if mask[label]]
+    # the nearest ancestor-or-self of every position that has earlier siblings
+    left_jumps = array('l', [-1]) * len(labels)
+    for p in xrange(1, len(labels)):
+        left_jumps[p] = p if slots[p] > child_offsets[parents[p]] else left_jumps[parents[p]]
+    # the central edge of a symmetric tree connects two equivalent centers (it has no direction): the first center
+    # (the earlier sibling, its branch is the beginning of the post-order) is checked against the second one
+    if ct.symm and not edge_labeling:
+        (first, second) = ct.positions([0, 1])
+        central = [[relation[l0][l1] or relation[l1][l0] for l1 in xrange(max_label)] for l0 in xrange(max_label)]
+    else:
+        (first, second) = (-1, -1)
+
+    def next_label(p, label):
+        # the next label of the position that is compatible with its parent's label (-1 if there is none)
+        parent_label = labels[parents[p]] if checked[p] else -1
+        for next_lbl in allowed[p]:
+            if next_lbl > label and (parent_label < 0 or relation[parent_label][next_lbl]) and \
+                    (p != first or central[labels[second]][next_lbl]):
+                return next_lbl
+        return -1
+
+    def reset(start, stop):
+        # resets the positions top-down (the positions are in pre-order) to their first compatible labels (the first
+        # center may have none, but its branch is reset only before the second center's branch is copied to it)
+        for p in xrange(start, stop):
+            label = next_label(p, -1)
+            if label >= 0 and labels[p] != label:
+                if changes is not None:
+                    changes.setdefault(p, labels[p])
+                labels[p] = label
+
+    def _next_related(start=0):
+        while True:
+            for i in xrange(start, len(post)):
+                p = post[i]
+                label = next_label(p, labels[p])
+                if label >= 0:
+                    if changes is not None:
+                        changes.setdefault(p, labels[p])
+                    labels[p] = label
+                    break
+            else:
+                return False
+            # the exhausted branches (the ones that precede p in post-order) get their first labelings: the
+            # branches of p's children and the branches of the earlier siblings of p's ancestors
+            reset(p + 1, p + size[p])
+            a = left_jumps[p]
+            while a >= 0:
+                u = parents[a]
+                for s in xrange(child_offsets[u], slots[a]):
+                    reset(children[s], children[s] + size[children[s]])
+                a = left_jumps[u]
+            copy_equivalent_branches(ct, labels, jumps[p], changes)
+            if first < 0 or central[labels[first]][labels[second]]:
+                return True
+            # the copied first center is not compatible with the second one => the first center's branch gets the
+            # first labeling whose root label is greater (and compatible)
+            label = next_label(first, labels[first])
+            if label >= 0:
+                if changes is not None:
+                    changes.setdefault(first, labels[first])
+                labels[first] = label
+                reset(first + 1, first + size[first])
+                return True
+            # there is no such labeling => the step continues in the second center's branch
+            start = size[first]
+
+    # the first labeling: every label is the first compatible one (the first center is labeled after the second)
+    start = 1 if ct.symm or edge_labeling else 0
+    order = chain(xrange(second, len(labels)), xrange(first, second)) if first >= 0 else \
+        xrange(start, len(labels))
+    for p in order:
+        label = next_label(p, -1)
+        if label < 0:
+            # only the first center can be incompatible with its (equivalent) neighbour => the step continues in
+            # the second center's branch
+            if p != first or not _next_related(size[first]):
+                return
+            break
+        if changes is not None:
+            changes.setdefault(p, labels[p])
+        labels[p] = label
+    yield
+    while _next_related():
+        yield
+
+
+def step_constrained_labeling(ct, labels, max_label, edge_labeling, changes=None, bounds=None, relation=None):
+    """Steps the label array of a compact tree with the stepper of the given constraints (see step_compact_labeling,
+    step_bounded_labeling and step_compatible_labeling).
+
+    Args:
+        ct:             a CompactTree object
+        labels:         the label array of the compact tree's nodes (all zeros at the beginning)
+        max_label:      an int that specifies the labeling alphabet's size
+        edge_labeling:  edge or vertex labeling
+        changes:        if it is a dictionary, the original labels of the changed positions are stored in it
+        bounds:         the bounds of the labelings' label histograms (see label_count_bounds)
+        relation:       the compatibility matrix of the adjacent labels (see compatibility_matrix)
+
+    Returns:
+        generator:      the stepper
+    """
+    if bounds is not None:
+        return step_bounded_labeling(ct, labels, max_label, edge_labeling, bounds, changes)
+    if relation is not None:
+        return step_compatible_labeling(ct, labels, max_label, edge_labeling, relation, changes)
+    return step_compact_labeling(ct, labels, max_label, edge_labeling, changes)
+
+
+def new_label_array(size, max_label):
+    """Returns a label array that contains only zeros.
+
+    Args:
+        size:       the size of the array
+        max_label:  an int that specifies the labeling alphabet's size
+
+    Returns:
+        bytearray / array:  the label array (a bytearray if the labels fit into a byte)
+    """
+    return bytearray(size) if max_label < 256 else array('l', [0]) * size
+
+
+def next_compact_labeling(ct, max_label, edge_labeling, bounds=None, relation=None, positions=None):
+    """Yields all the labelings of a compact tree (in the same order as next_labeling).
+
+    Args:
+        ct:             a CompactTree object
+        max_label:      an int that specifies the labeling alphabet's size
+        edge_labeling:  edge or vertex labeling
+        bounds:         the bounds of the labelings' label histograms (see label_count_bounds)
+        relation:       the compatibility matrix of the adjacent labels (see compatibility_matrix)
+        positions:      the positions of the labeled nodes (see compact_labeling_positions, it is the default)
+
+    Yields:
+        tuple:          the next labeling of the given tree
+    """
+
+    labels = new_label_array(len(ct.ids), max_label)
+    if positions is None:
+        positions = compact_labeling_positions(ct, edge_labeling)
+    to_tuple = gen_labels_getter(positions)
+    for _ in step_constrained_labeling(ct, labels, max_label, edge_labeling, bounds=bounds, relation=relation):
+        yield to_tuple(labels)
+
+
+def next_compact_labeling_instrumented(ct, max_label, edge_labeling, stats):
+    """Yields all the labelings of a compact tree like next_compact_labeling, while its stages are measured.
+
+    Args:
+        ct:             a CompactTree object
+        max_label:      an int that specifies the labeling alphabet's size
+        edge_labeling:  edge or vertex labeling
+        stats:          an EnumerationStats object
+    """
+
+    (calls, seconds, profiler) = (stats.calls, stats.seconds, stats.profiler)
+    labels = new_label_array(len(ct.ids), max_label)
+    to_tuple = gen_labels_getter(compact_labeling_positions(ct, edge_labeling))
+    # the original labels of the positions that are changed by a step
+    changes = {}
+    steps = step_compact_labeling(ct, labels, max_label, edge_labeling, changes)
+
+    if profiler is not None:
+        profiler.enable()
+    try:
+        while True:
+            start = timer()
+            stepped = next(steps, False) is None
+            seconds['step_compact_labeling'] += timer() - start
+            calls['step_compact_labeling'] += 1
+            if not stepped:
+                break
+            stats.nodes_touched += sum(1 for p, label in changes.iteritems() if label != labels[p])
+            changes.clear()
+            start = timer()
+            lblvect = to_tuple(labels)
+            seconds['labels_to_tuple'] += timer() - start
+            calls['labels_to_tuple'] += 1
+            stats.labelings += 1
+            if profiler is not None:
+                profiler.disable()
+            yield lblvect
+            if profiler is not None:
+                profiler.enable()
+    finally:
+        if profiler is not None:
+            profiler.disable()
+
+
+def next_compact_delta(ct, max_label, edge_labeling, bounds=None, relation=None):
+    """Yields the changes between the consecutive labelings of a compact tree.
+
+    The first change list contains the differences of the first labeling from the all zeros labeling (it is empty
+    without bounds).
+
+    Args:
+        ct:             a CompactTree object
+        max_label:      an int that specifies the labeling alphabet's size
+        edge_labeling:  edge or vertex labeling
+        bounds:         the bounds of the labelings' label histograms (see label_count_bounds)
+        relation:       the compatibility matrix of the adjacent labels (see compatibility_matrix)
+
+    Yields:
+        list:           (index, label) pairs of the labels that differ from the previous labeling
+    """
+
+    labels = new_label_array(len(ct.ids), max_label)
+    # the index of every position in the labeling (-1 if the position is not part of the labeling)
+    indexes = [-1] * len(ct.ids)
+    for i, p in enumerate(compact_labeling_positions(ct, edge_labeling)):
+        indexes[p] = i
+    changes = {}
+    for _ in step_constrained_labeling(ct, labels, max_label, edge_labeling, changes, bounds, relation):
+        yield sorted((indexes[p], labels[p]) for p, label in changes.iteritems()
+                     if label != labels[p] and indexes[p] >= 0)
+        changes.clear()
+
+
+def next_compact_batch(ct, max_label, edge_labeling, batch_size, bounds=None, relation=None):
+    """Yields the labelings of a compact tree in NumPy blocks (in the same order as next_labeling).
+
+    Args:
+        ct:             a CompactTree object
+        max_label:      an int that specifies the labeling alphabet's size
+        edge_labeling:  edge or vertex labeling
+        batch_size:     the count of the labelings in a block
+        bounds:         the bounds of the labelings' label histograms (see label_count_bounds)
+        relation:       the compatibility matrix of the adjacent labels (see compatibility_matrix)
+
+    Yields:
+        ndarray:        a (batch_size, labeling length) block of labelings (the last block could be shorter)
+    """
+
+    labels = new_label_array(len(ct.ids), max_label)
+    positions = np.array(compact_labeling_positions(ct, edge_labeling), dtype=np.intp)
+    dtype = np.uint8 if max_label <= 256 else np.uint16 if max_label <= 65536 else np.uint32
+    # the label arrays are copied into a preallocated block (in the order of the compact tree) and the labelings are
+    # gathered from it at once when the block is full
+    width = len(ct.ids)
+    block = new_label_array(width * batch_size, max_label)
+    view = np.frombuffer(block, dtype=np.uint8 if max_label < 256 else np.dtype(block.typecode))
+
+    row = 0
+    for _ in step_constrained_labeling(ct, labels, max_label, edge_labeling, bounds=bounds, relation=relation):
+        block[row:row + width] = labels
+        row += width
+        if row == len(block):
+            yield view.reshape(batch_size, width).take(positions, axis=1).astype(dtype, copy=False)
+            row = 0
+    if row:
+        yield view[:row].reshape(row // width, width).take(positions, axis=1).astype(dtype, copy=False)
+
+
+def branch_classes(ct):
+    """Returns the isomorphism classes of the compact tree's branches (hash-consing).
+
+    Args:
+        ct:     a CompactTree object
+
+    Returns:
+        list:   the class ID of every position (two branches have the same ID iff they are isomorphic)
+        list:   the (first child slot, multiplicity) pairs of the equivalence classes of every class's children
+    """
+    (children, child_offsets, class_first) = (ct.children, ct.child_offsets, ct.class_first)
+    classes = [0] * len(ct.ids)
+    ids = {}
+    groups = []
+    # the children follow their parents in pre-order => the reversed pre-order processes the children first
+    for p in xrange(len(ct.ids) - 1, -1, -1):
+        key = tuple([classes[children[s]] for s in xrange(child_offsets[p], child_offsets[p + 1])])
+        cls = ids.get(key)
+        if cls is None:
+            cls = ids[key] = len(groups)
+            slots = [s for s in xrange(child_offsets[p], child_offsets[p + 1]) if class_first[s] == s]
+            groups.append([(s - child_offsets[p], (slots + [child_offsets[p + 1]])[i + 1] - s)
+                           for i, s in enumerate(slots)])
+        classes[p] = cls
+    return classes, groups
+
+
+def children_labelings(ct, p, classes, groups, memo, max_label):
+    """Returns the labelings of the children of a branch (the labelings of the classes are memoized).
+
+    The labelings of the children are composed from the labelings of their classes: a multiset of m child labelings for
+    every equivalence class (with multiplicity m) of the children. The labelings of a class are the node's own label
+    combined with the labelings of its children.
+
+    Args:
+        ct:         a CompactTree object
+        p:          the position of the branch
+        classes:    the class IDs of the positions (see branch_classes)
+        groups:     the equivalence classes of the classes' children (see branch_classes)
+        memo:       a dictionary that contains the labelings of the already composed classes
+        max_label:  an int that specifies the labeling alphabet's size
+
+    Returns:
+        list:       the labelings of the children (in the pre-order of the branch, in the same order as next_labeling)
+    """
+    (children, child_offsets) = (ct.children, ct.child_offsets)
+    # the classes below the branch whose labelings are not composed yet
+    pending = []
+    stack = [children[s] for s in xrange(child_offsets[p], child_offsets[p + 1])]
+    while stack:
+        q = stack.pop()
+        if classes[q] not in memo:
+            memo[classes[q]] = None
+            pending.append(q)
+            stack.extend(children[s] for s in xrange(child_offsets[q], child_offsets[q + 1]))
+
+    def compose(q):
+        combos = [()]
+        # the first class of the children is the least significant one
+        for (slot, m) in groups[classes[q]]:
+            child_labelings = memo[classes[children[child_offsets[q] + slot]]]
+            # the first equivalent sibling has the greatest labeling
+            part = [sum((child_labelings[i] for i in reversed(states)), ())
+                    for states in combinations_with_replacement(xrange(len(child_labelings)), m)]
+            combos = [combo + labeling for labeling in part for combo in combos]
+        return combos
+
+    # the smaller branches are composed first (the children are smaller than their parents)
+    for q in sorted(pending, key=ct.size.__getitem__):
+        memo[classes[q]] = [(label,) + combo for label in xrange(max_label) for combo in compose(q)]
+    return compose(p)
+
+
+# the maximal count of the composed labelings of a class of isomorphic branches (see get_labeled_graphs)
+MEMOIZED_CLASS_SIZE = 4096
+
+
+def composed_digits(ct, max_label, edge_labeling, max_class_size):
+    """Returns the digits of the odometer of step_composed_labeling.
+
+    Every class of equivalent siblings whose branches have at most max_class_size labelings is a single digit: the
+    labelings of the branches' isomorphism class are composed only once (see children_labelings), and the digit is the
+    multiset of the siblings' labeling indexes. The labels of the other nodes are stepped one by one.
+
+    Args:
+        ct:             a CompactTree object
+        max_label:      an int that specifies the labeling alphabet's size
+        edge_labeling:  edge or vertex labeling
+        max_class_size: the maximal count of the composed labelings of a class
+
+    Returns:
+        list:           the digits in post-order: (first position, end position, labelings of a branch as label arrays
+                        - None for a single label, size of a branch, the nearest position whose branch is copied to its
+                        preceding equivalent siblings after the digit is stepped)
+        bytearray:      the positions whose branches contain multisets (their indexes are copied together with their
+                        labels)
+    """
+    (children, child_offsets, class_first, size, parents, slots) = (ct.children, ct.child_offsets, ct.class_first,
+                                                                    ct.size, ct.parents, ct.slots)
+    (classes, groups) = branch_classes(ct)
+    # the counts of the classes' labelings
+    counts = [0] * len(groups)
+    for p in xrange(len(ct.ids) - 1, -1, -1):
+        cnt = max_label
+        for (slot, m) in groups[classes[p]]:
+            cnt *= multichoose(counts[classes[children[child_offsets[p] + slot]]], m)
+        counts[classes[p]] = cnt
+
+    # the multiplicity of the multisets at their first positions, the positions inside the multisets (the positions
+    # are in pre-order, so the parents and the earlier siblings come first)
+    multiplicity = {}
+    inside = bytearray(len(ct.ids))
+    for p in xrange(1, len(ct.ids)):
+        (q, s) = (parents[p], slots[p])
+        if inside[q] or class_first[s] < s:
+            inside[p] = inside[q] or inside[children[class_first[s]]]
+            continue
+        m = 1
+        while s + m < child_offsets[q + 1] and class_first[s + m] == s:
+            m += 1
+        # the first center of a symmetric edge labeling is fixed, so the centers are not a multiset
+        if counts[classes[p]] <= max_class_size and m * size[p] > 1 and not (ct.symm and edge_labeling and q == 0):
+            multiplicity[p] = m
+            inside[p] = 1
+
+    fixed = fixed_positions(ct, edge_labeling)
+    # the labelings of the classes, they are converted once into the type of the label array (they are copied into it
+    # by slices)
+    memo = {}
+    arrays = {}
+    digits = []
+    indexed = bytearray(len(ct.ids))
+    for p in ct.post:
+        if p in multiplicity:
+            cls = classes[p]
+            if cls not in arrays:
+                if cls not in memo:
+                    memo[cls] = [(label,) + combo for label in xrange(max_label)
+                                 for combo in children_labelings(ct, p, classes, groups, memo, max_label)]
+                arrays[cls] = [bytearray(labeling) if max_label < 256 else array('l', labeling)
+                               for labeling in memo[cls]]
+            digits.append((p, p + multiplicity[p] * size[p], arrays[cls], size[p], ct.jumps[parents[p]]))
+            c = p
+            while c >= 0 and not indexed[c]:
+                indexed[c] = 1
+                c = parents[c]
+        elif not inside[p] and p not in fixed:
+            digits.append((p, p + 1, None, 1, ct.jumps[p]))
+    return digits, indexed
+
+
+def step_composed_labeling(ct, labels, max_label, edge_labeling, max_class_size=MEMOIZED_CLASS_SIZE):
+    """Steps the label array of a compact tree through all the labelings by composing the labelings of its classes.
+
+    The equivalent siblings are ordered: the first sibling has the greatest labeling. A multiset of m labelings is
+    therefore stepped like this: the leading siblings that have the last labeling are skipped, the next sibling gets
+    its next labeling and the skipped ones get the same one (the last labelings are counted, so a step is O(1) Python
+    operations plus the slice copies of the labels). The order of the labelings is the same as next_labeling's.
+
+    Args:
+        ct:             a CompactTree object
+        labels:         the label array of the compact tree's nodes (all zeros at the beginning)
+        max_label:      an int that specifies the labeling alphabet's size
+        edge_labeling:  edge or vertex labeling
+        max_class_size: the maximal count of the composed labelings of a class of isomorphic branches (see
+                        composed_digits)
+
+    Yields:
+        None:           every time the label array contains the next labeling
+    """
+
+    (children, class_first, size, parents, slots, jumps) = (ct.children, ct.class_first, ct.size, ct.parents, ct.slots,
+                                                            ct.jumps)
+    (digits, indexed) = composed_digits(ct, max_label, edge_labeling, max_class_size)
+    # the labeling index of every branch of the multisets (at the first position of the branch) and the count of the
+    # leading branches that have the last labeling (at the first position of the multiset)
+    states = [0] * len(labels)
+    tops = [0] * len(labels)
+    for (p, end, lbls, sz, c) in digits:
+        if lbls is not None and len(lbls) == 1:
+            tops[p] = (end - p) // sz
+
+    def _next():
+        for (p, end, lbls, sz, c) in digits:
+            if lbls is None:
+                label = labels[p] + 1
+                if label < max_label:
+                    labels[p] = label
+                    break
+                labels[p] = 0
+            else:
+                top = tops[p]
+                q = p + top * sz
+                if q < end:
+                    state = states[q] + 1
+                    states[p:q + 1:sz] = [state] * (top + 1)
+                    labels[p:q + sz] = lbls[state] * (top + 1)
+                    tops[p] = top + 1 if state == len(lbls) - 1 else 0
+                    break
+                states[p:end:sz] = [0] * top
+                labels[p:end] = lbls[0] * top
+                tops[p] = top if len(lbls) == 1 else 0
+        else:
+            return False
+        while c >= 0:
+            # copy the labeling of the branch (and the indexes of its multisets) to the preceding equivalent siblings
+            s = slots[c]
+            sz = size[c]
+            for q in xrange(class_first[s], s):
+                d = children[q]
+                labels[d:d + sz] = labels[c:c + sz]
+                if indexed[c]:
+                    states[d:d + sz] = states[c:c + sz]
+                    tops[d:d + sz] = tops[c:c + sz]
+            c = jumps[parents[c]]
+        return True
+
+    yield
+    while _next():
+        yield
+
+
+def next_composed_labeling(ct, max_label, edge_labeling, positions=None, max_class_size=MEMOIZED_CLASS_SIZE):
+    """Yields all the labelings of a compact tree by composing the labelings of its classes (see
+    step_composed_labeling).
+
+    Args:
+        ct:             a CompactTree object
+        max_label:      an int that specifies the labeling alphabet's size
+        edge_labeling:  edge or vertex labeling
+        positions:      the positions of the labeled nodes (see compact_labeling_positions, it is the default)
+        max_class_size: the maximal count of the composed labelings of a class of isomorphic branches
+
+    Yields:
+        tuple:          the next labeling of the given tree
+    """
+
+    labels = new_label_array(len(ct.ids), max_label)
+    if positions is None:
+        positions = compact_labeling_positions(ct, edge_labeling)
+    to_tuple = gen_labels_getter(positions)
+    for _ in step_composed_labeling(ct, labels, max_label, edge_labeling, max_class_size):
+        yield to_tuple(labels)
+
+
+# the compiled enumerators of the recently used tree structures (keyed by the arrays of their CompactTrees, see
+# compile_enumerator)
+COMPILED_ENUMERATORS = OrderedDict()
+COMPILED_ENUMERATORS_SIZE = 128
+
+
+def gen_enumerator_source(ct, max_label, edge_labeling):
+    """Returns the Python source of an enumerator that is specialized to the given tree.
+
+    The odometer of step_compact_labeling is unrolled: every stepped position gets its own block with constant indexes
+    of the label array, and the copies to the preceding equivalent siblings are single slice assignments (the
+    equivalent siblings' branches are adjacent and have the same layout).
+
+    Args:
+        ct:             a CompactTree object
+        max_label:      an int that specifies the labeling alphabet's size
+        edge_labeling:  edge or vertex labeling
+
+    Returns:
+        str:            the source of the enumerate_labelings(labels, to_tuple) generator function
+    """
+    (children, class_first, size, parents, slots, jumps) = (ct.children, ct.class_first, ct.size, ct.parents, ct.slots,
+                                                            ct.jumps)
+    fixed = fixed_positions(ct, edge_labeling)
+    lines = ["def enumerate_labelings(labels, to_tuple):",
+             "    yield to_tuple(labels)",
+             "    while True:"]
+    for p in ct.post:
+        if p in fixed:
+            continue
+        lines.append("        if labels[%d] < %d:" % (p, max_label - 1))
+        lines.append("            labels[%d] += 1" % p)
+        c = jumps[p]
+        while c >= 0:
+            s = slots[c]
+            (first, k, sz) = (children[class_first[s]], s - class_first[s], size[c])
+            if sz == 1:
+                lines.append("            labels[%d:%d] = [labels[%d]] * %d" % (first, c, c, k))
+            else:
+                lines.append("            labels[%d:%d] = labels[%d:%d] * %d" % (first, c, c, c + sz, k))
+            c = jumps[parents[c]]
+        lines.append("            yield to_tuple(labels)")
+        lines.append("            continue")
+        lines.append("        labels[%d] = 0" % p)
+    lines.append("        return")
+    return "\n".join(lines) + "\n"
+
+
+def compile_enumerator(ct, max_label, edge_labeling):
+    """Returns the specialized enumerator of the given tree (compiled once per tree structure, see
+    gen_enumerator_source).
+
+    Args:
+        ct:             a CompactTree object
+        max_label:      an int that specifies the labeling alphabet's size
+        edge_labeling:  edge or vertex labeling
+
+    Returns:
+        function:       a generator function of a label list and a function that maps the label list to a labeling
+    """
+    # the children's layout and the classes of the siblings determine the source (the source is only generated once)
+    key = (ct.child_offsets.tostring(), ct.class_first.tostring(), tuple(sorted(fixed_positions(ct, edge_labeling))),
+           max_label)
+    enumerator = COMPILED_ENUMERATORS.pop(key, None)
+    if enumerator is None:
+        source = gen_enumerator_source(ct, max_label, edge_labeling)
+        namespace = {}
+        exec compile(source, "<tree_labeling enumerator>", 'exec') in namespace
+        enumerator = namespace['enumerate_labelings']
+        if len(COMPILED_ENUMERATORS) >= COMPILED_ENUMERATORS_SIZE:
+            COMPILED_ENUMERATORS.popitem(last=False)
+    COMPILED_ENUMERATORS[key] = enumerator
+    return enumerator
+
+
+def next_compiled_labeling(ct, max_label, edge_labeling, positions=None):
+    """Yields all the labelings of a compact tree by its specialized enumerator (see compile_enumerator).
+
+    Args:
+        ct:             a CompactTree object
+        max_label:      an int that specifies the labeling alphabet's size
+        edge_labeling:  edge or vertex labeling
+        positions:      the positions of the labeled nodes (see compact_labeling_positions, it is the default)
+
+    Yields:
+        tuple:          the next labeling of the given tree (in the same order as next_labeling)
+    """
+    if positions is None:
+        positions = compact_labeling_positions(ct, edge_labeling)
+    enumerator = compile_enumerator(ct, max_label, edge_labeling)
+    for labeling in enumerator([0] * len(ct.ids), gen_labels_getter(positions)):
+        yield labeling
+
+
+def next_labeling_compiled(t, et, max_label, edge_labeling):
+    """Yields all the labelings of a tree by its specialized enumerator (a drop-in replacement of next_labeling).
+
+    Args:
+        t:              a dictionary that contains the nodes of a labeled tree
+        et:             a dictionary that contains the nodes of the "equivalence-tree" created from the given tree
+        max_label:      an int that specifies the labeling alphabet's size
+        edge_labeling:  edge or vertex labeling
+
+    Yields:
+        tuple:          the next labeling of the given tree (in the same order as next_labeling)
+    """
+    return next_compiled_labeling(CompactTree(t, et), max_label, edge_labeling)
+
+
+def canonical_form(lst):
+    """Returns the canonical pre-order traversal of the given free-tree rooted like the trees of the labelings.
+
+    The tree is rooted at its center (at the center that comes first in the given traversal if it has two centers, the
+    other center is the root's first child) and the children of every node are ordered by the ranks of their branches
+    (the ranks are assigned level by level from the bottom, equivalent siblings keep their order). Two traversals get
+    the same canonical traversal iff their balanced trees are isomorphic, and the sorted trees of the two traversals are
+    the same, therefore their labelings are the same (and in the same order) up to the nodes' renumbering.
+
+    Args:
+        lst:    a list that contains a pre-order traversal of a free-tree
+
+    Returns:
+        tuple:  the canonical traversal
+        list:   the index of every node of the canonical traversal in the balanced traversal (see balance_tree_list)
+    """
+    if len(lst) > 2:
+        centers = find_center(lst)
+        lst = balance_tree_list(lst, centers)
+        bicentral = len(centers) == 2
+    else:
+        bicentral = False
+
+    parents = find_parents(lst)[0]
+    children = [[] for _ in lst]
+    levels = [[] for _ in xrange(max(lst) + 1)]
+    for (i, d) in enumerate(lst):
+        if i > 0:
+            children[parents[i]].append(i)
+        levels[d].append(i)
+    ranks = [0] * len(lst)
+    for level in reversed(levels):
+        keys = [tuple(sorted(ranks[c] for c in children[i])) for i in level]
+        rank = dict((key, r) for (r, key) in enumerate(sorted(set(keys))))
+        for (i, key) in zip(level, keys):
+            ranks[i] = rank[key]
+        for i in level:
+            children[i].sort(key=lambda c: ranks[c])
+    if bicentral:
+        # the second center is the first child of the root in the balanced traversal
+        children[0].remove(1)
+        children[0].insert(0, 1)
+
+    nodes = []
+    stack = [0]
+    while stack:
+        i = stack.pop()
+        nodes.append(i)
+        stack.extend(reversed(children[i]))
+    return tuple(lst[i] for i in nodes), nodes
+
+
+def pickle_atomically(obj, file_name):
+    """Pickles an object into a file: it is written into a temporary file first, then it replaces the given file.
+
+    Args:
+        obj:        the object to pickle
+        file_name:  the name of the file
+    """
+    (fd, name) = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(file_name)))
+    with os.fdopen(fd, 'wb') as f:
+        pickle.dump(obj, f, pickle.HIGHEST_PROTOCOL)
+    os.rename(name, file_name)
+
+
+class TreeCache(object):
+    """Bounded LRU cache of the prepared trees (CompactTree and "equivalence-tree") keyed by their canonical forms.
+
+    The isomorphic traversals (that are rooted at the same center, see canonical_form) share an entry. The entries are
+    never modified by the labelings: the labels are stepped in separate arrays (see step_compact_labeling). The
+    canonical forms of the recently seen traversals are kept as well, so a repeated traversal is only hashed. If a
+    directory is given the entries are pickled into it as well, so other processes can start with the prepared trees.
+    Unpickling can execute arbitrary code, so the directory must not be writable by untrusted users.
+    """
+
+    __slots__ = ('maxsize', 'path', 'entries', 'traversals', 'hits', 'misses')
+
+    def __init__(self, maxsize=128, path=None):
+        """Initializes an empty cache.
+
+        Args:
+            maxsize:    the maximal count of the entries in the memory (the least recently used one is evicted)
+            path:       the directory of the pickled entries (None if they are kept only in the memory), it has to
+                        be trusted: the entries are loaded with pickle
+        """
+        if type(maxsize) is not int or maxsize <= 0:
+            raise ValueError("maxsize should be a positive integer...")
+        self.maxsize = maxsize
+        self.path = path
+        self.entries = OrderedDict()
+        self.traversals = OrderedDict()
+        self.hits = self.misses = 0
+
+    def __len__(self):
+        """Returns the count of the entries in the memory."""
+        return len(self.entries)
+
+    def clear(self):
+        """Removes the entries from the memory (the pickled entries are kept)."""
+        self.entries.clear()
+        self.traversals.clear()
+
+    def entry_path(self, key):
+        """Returns the file name of the pickled entry of the given canonical traversal."""
+        return os.path.join(self.path, hashlib.sha1(repr(key)).hexdigest() + '.pickle')
+
+    def load(self, key):
+        """Returns the pickled entry of the given canonical traversal (None if it is not found)."""
+        if self.path is None or not os.path.exists(self.entry_path(key)):
+            return None
+        with open(self.entry_path(key), 'rb') as f:
+            (entry_key, entry) = pickle.load(f)
+        # the file names are hashes => the keys have to be checked
+        return entry if entry_key == key else None
+
+    def store(self, key, entry):
+        """Pickles the entry of the given canonical traversal (the file is replaced atomically)."""
+        if self.path is not None:
+            pickle_atomically((key, entry), self.entry_path(key))
+
+    def prepare(self, lst):
+        """Returns the prepared tree of the given traversal.
+
+        Args:
+            lst:    a list that contains a pre-order traversal of a free-tree
+
+        Returns:
+            CompactTree:    the compact tree of the canonical traversal (read-only)
+            dictionary:     the "equivalence-tree" of the canonical traversal (read-only)
+            list:           the node of the canonical traversal that belongs to every node of the balanced traversal
+        """
+        traversal = tuple(lst)
+        form = self.traversals.pop(traversal, None)
+        if form is None:
+            (key, nodes) = canonical_form(lst)
+            canonical_nodes = [0] * len(nodes)
+            for (k, i) in enumerate(nodes):
+                canonical_nodes[i] = k
+            form = (key, canonical_nodes)
+            if len(self.traversals) >= self.maxsize:
+                self.traversals.popitem(last=False)
+        self.traversals[traversal] = form
+        (key, canonical_nodes) = form
+
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            entry = self.load(key)
+            if entry is None:
+                (_, t, et) = gen_tree_from_list(list(key))
+                entry = (CompactTree(t, et), et)
+                self.store(key, entry)
+            if len(self.entries) >= self.maxsize:
+                self.entries.popitem(last=False)
+        self.entries[key] = entry
+        return entry[0], entry[1], canonical_nodes
+
+
+def cached_labeling_positions(ct, canonical_nodes, edge_labeling):
+    """Returns the positions of a cached compact tree that form the labelings of the balanced traversal.
+
+    Args:
+        ct:                 the CompactTree of the canonical traversal
+        canonical_nodes:    the node of the canonical traversal that belongs to every node of the balanced traversal
+        edge_labeling:      edge or vertex labeling
+
+    Returns:
+        list:               the positions of the labeled nodes (in the order of the balanced traversal)
+    """
+    return ct.positions(canonical_nodes[1:] if edge_labeling else canonical_nodes)
+
+
+def is_proper_traversal(lst):
+    """Determines whether the given list is a valid nonempty pre-order traversal of a tree or not.
+
+    Args:
+        lst:    a list that contains integers
+
+    Returns:
+        bool:   the given list is valid or not
+    """
+
+    if len(lst) == 0 or lst[0] != 0:
+        return False
+    for i in xrange(len(lst) - 1):
+        # if the actual element of the list is not an integer or the next number (distance) is greater than the current
+        # number (distance) + 1 => it is not a valid list
+        if type(lst[i]) != int or lst[i + 1] > lst[i] + 1:
+            return False
+    return type(lst[-1]) == int
+
+
+def check_arguments(lst, max_label):
+    """Checks the arguments of the public functions and raises ValueError if any of them is malformed.
+
+    Args:
+        lst:        a list that contains a pre-order traversal of a free-tree
+        max_label:  an int that specifies the labeling alphabet's size
+    """
+
+    if type(lst) is not list or not is_proper_traversal(lst):
+        raise ValueError("The given object should be a nonempty list that contains a valid pre-order traversal of a "
+                         "free-tree...")
+    if type(max_label) is not int or max_label <= 0:
+        raise ValueError("max_label should be a positive integer...")
+
+
+def label_count_bounds(label_counts, max_label, at_most=False):
+    """Checks the label count constraints and returns the bounds of the labelings' label histograms.
+
+    Args:
+        label_counts:   a list that contains the count of every label (None if the label's count is arbitrary)
+        max_label:      an int that specifies the labeling alphabet's size
+        at_most:        if this is set to true the counts are upper bounds (otherwise exact counts)
+
+    Returns:
+        tuple:          the lists of the lower and the upper bounds of every label's count (None if it is unbounded),
+                        or None if there are no constraints
+    """
+
+    if label_counts is None:
+        return None
+    if type(label_counts) not in (list, tuple) or len(label_counts) != max_label or \
+            any(cnt is not None and (type(cnt) is not int or cnt < 0) for cnt in label_counts):
+        raise ValueError("label_counts should contain a non-negative integer or None for every label...")
+    lo = [0 if at_most or cnt is None else cnt for cnt in label_counts]
+    return lo, list(label_counts)
+
+
+def compatibility_matrix(compatible, max_label):
+    """Checks the compatibility relation of the adjacent labels and returns it as a matrix.
+
+    Args:
+        compatible:     a function that gets a parent's label and its child's label and returns true if they are
+                        compatible, or a max_label x max_label boolean matrix (indexed by the parent's and the child's
+                        labels)
+        max_label:      an int that specifies the labeling alphabet's size
+
+    Returns:
+        list:           the max_label x max_label list of bool lists, or None if there is no relation
+    """
+
+    if compatible is None:
+        return None
+    if callable(compatible):
+        return [[bool(compatible(label, child_label)) for child_label in xrange(max_label)]
+                for label in xrange(max_label)]
+    try:
+        matrix = [[bool(x) for x in row] for row in compatible]
+    except TypeError:
+        raise ValueError("compatible should be a function or a max_label x max_label matrix...")
+    if len(matrix) != max_label or any(len(row) != max_label for row in matrix):
+        raise ValueError("compatible should be a function or a max_label x max_label matrix...")
+    return matrix
+
+
+def check_constraints(bounds, relation):
+    """Raises ValueError if both label count and compatibility constraints are given (they cannot be combined).
+
+    Args:
+        bounds:     the bounds of the labelings' label histograms (see label_count_bounds)
+        relation:   the compatibility matrix of the adjacent labels (see compatibility_matrix)
+    """
+
+    if bounds is not None and relation is not None:
+        raise ValueError("label_counts and compatible cannot be combined...")
+
+
+def get_labeled_graphs(lst, max_label=2, edge_labeling=False, compact=False, label_counts=None, at_most=False,
+                       compatible=None, cache=None, memoized=False, compiled=False):
+    """Generates all the given free-tree's vertex / edge labelings.
+
+    Args:
+        lst:            a list that contains a pre-order traversal of a free-tree
+        max_label:      an int that specifies the labeling alphabet's size
+        edge_labeling:  if this is set to true the function generates the edge labelings of the given tree (otherwise
+                        the vertex labelings)
+        compact:        if this is set to true the labelings are generated on the array-backed CompactTree
+        label_counts:   if it is given, only the labelings that contain label i exactly label_counts[i] times are
+                        generated (None means arbitrary count). The partial labelings that cannot be completed are
+                        skipped on the CompactTree (regardless of compact).
+        at_most:        if this is set to true label_counts contains upper bounds of the counts
+        compatible:     if it is given, only the labelings are generated where the labels of every parent and child
+                        are compatible: a function of the parent's and the child's labels or a max_label x max_label
+                        boolean matrix. The parents are the nodes closer to the center of the tree (the root of the
+                        labelings' pre-order traversal), the central edge of a symmetric tree has to be compatible in
+                        any direction. For edge labelings the labels of a parent edge and its child edges are checked.
+                        The incompatible labels are skipped on the CompactTree (regardless of compact). It cannot be
+                        combined with label_counts yet.
+        cache:          a TreeCache object: the prepared tree is taken from it (the labelings are generated on the
+                        CompactTree regardless of compact)
+        memoized:       if this is set to true the labelings are composed from the labelings of the isomorphic branches'
+                        classes (see step_composed_labeling, it is ignored if label_counts or compatible is given)
+        compiled:       if this is set to true the labelings are generated by an enumerator that is compiled for the
+                        given tree (see compile_enumerator, it is ignored if label_counts or compatible is given). It
+                        cannot be combined with memoized.
+    """
+
+    check_arguments(lst, max_label)
+    bounds = label_count_bounds(label_counts, max_label, at_most)
+    relation = compatibility_matrix(compatible, max_label)
+    check_constraints(bounds, relation)
+    if memoized and compiled:
+        raise ValueError("memoized and compiled cannot be combined...")
+    memoized = memoized and bounds is None and relation is None
+    compiled = compiled and bounds is None and relation is None
+
+    labeling_cnt = 0
+    if cache is not None:
+        (ct, et, canonical_nodes) = cache.prepare(lst)
+        positions = cached_labeling_positions(ct, canonical_nodes, edge_labeling)
+        if memoized:
+            labelings = next_composed_labeling(ct, max_label, edge_labeling, positions)
+        elif compiled:
+            labelings = next_compiled_labeling(ct, max_label, edge_labeling, positions)
+        else:
+            labelings = next_compact_labeling(ct, max_label, edge_labeling, bounds, relation, positions)
+    else:
+        (lst, t, et) = gen_tree_from_list(lst)
+        # print lst, "\n"
+        if memoized:
+            labelings = next_composed_labeling(CompactTree(t, et), max_label, edge_labeling)
+        elif compiled:
+            labelings = next_labeling_compiled(t, et, max_label, edge_labeling)
+        elif compact or bounds is not None or relation is not None:
+            labelings = next_compact_labeling(CompactTree(t, et), max_label, edge_labeling, bounds, relation)
+        else:
+            labelings = next_labeling(t, et, max_label, edge_labeling)
+    for lblvect in labelings:
+        labeling_cnt += 1
+        yield lblvect
+    # print "Count of possible labelings:", labeling_cnt
+
+
+def get_labeling_deltas(lst, max_label=2, edge_labeling=False, label_counts=None, at_most=False, compatible=None):
+    """Generates the changes between the given free-tree's consecutive vertex / edge labelings.
+
+    The labelings are the same (and in the same order) as the ones of get_labeled_graphs. The first change list
+    contains the (index, label) pairs of the first labeling that differ from zero (without label_counts the first
+    labeling contains only zeros, so the first change list is empty), every other change list contains the (index,
+    label) pairs that differ from the previous labeling.
+
+    Args:
+        lst:            a list that contains a pre-order traversal of a free-tree
+        max_label:      an int that specifies the labeling alphabet's size
+        edge_labeling:  if this is set to true the function generates the edge labelings of the given tree (otherwise
+                        the vertex labelings)
+        label_counts:   the count of every label (see get_labeled_graphs)
+        at_most:        if this is set to true label_counts contains upper bounds of the counts
+        compatible:     the compatibility relation of the adjacent labels (see get_labeled_graphs)
+    """
+
+    check_arguments(lst, max_label)
+    bounds = label_count_bounds(label_counts, max_label, at_most)
+    relation = compatibility_matrix(compatible, max_label)
+    check_constraints(bounds, relation)
+
+    (lst, t, et) = gen_tree_from_list(lst)
+    for delta in next_compact_delta(CompactTree(t, et), max_label, edge_labeling, bounds, relation):
+        yield delta
+
+
+def get_labeled_graphs_batched(lst, max_label=2, edge_labeling=False, batch_size=4096, label_counts=None,
+                               at_most=False, compatible=None):
+    """Generates all the given free-tree's vertex / edge labelings in NumPy blocks.
+
+    The rows of the blocks are the labelings of get_labeled_graphs (in the same order). It requires NumPy.
+
+    Args:
+        lst:            a list that contains a pre-order traversal of a free-tree
+        max_label:      an int that specifies the labeling alphabet's size
+        edge_labeling:  if this is set to true the function generates the edge labelings of the given tree (otherwise
+                        the vertex labelings)
+        batch_size:     the count of the labelings in a block (the last block could be shorter)
+        label_counts:   the count of every label (see get_labeled_graphs)
+        at_most:        if this is set to true label_counts contains upper bounds of the counts
+        compatible:     the compatibility relation of the adjacent labels (see get_labeled_graphs)
+    """
+
+    if np is None:
+        raise ImportError("get_labeled_graphs_batched requires NumPy...")
+    check_arguments(lst, max_label)
+    bounds = label_count_bounds(label_counts, max_label, at_most)
+    relation = compatibility_matrix(compatible, max_label)
+    check_constraints(bounds, relation)
+    if type(batch_size) is not int or batch_size <= 0:
+        raise ValueError("batch_size should be a positive integer...")
+
+    (lst, t, et) = gen_tree_from_list(lst)
+    for block in next_compact_batch(CompactTree(t, et), max_label, edge_labeling, batch_size, bounds, relation):
+        yield block
+
+
+def get_labeled_graphs_instrumented(lst, max_label=2, edge_labeling=False, profiler=None, compact=False):
+    """Generates all the given free-tree's vertex / edge labelings while the stages of the enumeration are measured.
+
+    The labelings are the same (and in the same order) as the ones of get_labeled_graphs. The enumeration of
+    get_labeled_graphs is not instrumented: the measured stages are only wrapped here.
+
+    Args:
+        lst:            a list that contains a pre-order traversal of a free-tree
+        max_label:      an int that specifies the labeling alphabet's size
+        edge_labeling:  if this is set to true the function generates the edge labelings of the given tree (otherwise
+                        the vertex labelings)
+        profiler:       a profiler that is enabled while the enumeration runs (see EnumerationStats)
+        compact:        if this is set to true the array-backed enumeration of get_labeled_graphs(compact=True) is
+                        measured (otherwise the one of next_labeling)
+
+    Returns:
+        EnumerationStats:   the counters and the timers (they are updated while the labelings are generated)
+        generator:          the labelings
+    """
+
+    check_arguments(lst, max_label)
+    stats = EnumerationStats(profiler)
+    start = timer()
+    (lst, t, et) = gen_tree_from_list(lst)
+    stats.seconds['gen_tree_from_list'] += timer() - start
+    stats.calls['gen_tree_from_list'] += 1
+    if compact:
+        start = timer()
+        ct = CompactTree(t, et)
+        stats.seconds['CompactTree'] += timer() - start
+        stats.calls['CompactTree'] += 1
+        return stats, next_compact_labeling_instrumented(ct, max_label, edge_labeling, stats)
+    (root, fixed) = fixed_nodes(t, edge_labeling)
+    return stats, next_labeling_instrumented(t, et, root, labeling_keys(t, edge_labeling), max_label, fixed, stats)
+
+
+def apply_labeling_deltas(deltas, labels):
+    """Keeps a labeling buffer up to date with the given changes.
+
+    Args:
+        deltas:     an iterable of change lists (e.g. get_labeling_deltas)
+        labels:     a mutable sequence that contains only zeros (its length is the length of the labelings)
+
+    Yields:
+        the labels after applying every change list
+    """
+
+    for delta in deltas:
+        for (i, label) in delta:
+            labels[i] = label
+        yield labels
+
+
+def multichoose(n, k):
+    """Returns the number of k element multisets of an n element set (the binomial coefficient (n + k - 1, k)).
+
+    Args:
+        n:  the size of the set
+        k:  the size of the multisets
+
+    Returns:
+        int:    the number of multisets
+    """
+
+    if n <= 0:
+        return 1 if k == 0 else 0
+    return binomial(n + k - 1, k)
+
+
+def binomial(n, k):
+    """Returns the binomial coefficient (n, k).
+
+    Args:
+        n:  the size of the set
+        k:  the size of the subsets
+
+    Returns:
+        int:    the number of k element subsets of an n element set
+    """
+
+    if k < 0 or k > n:
+        return 0
+    # (n, k) = (n, n - k) => the shorter product is computed
+    k = min(k, n - k)
+    result = 1
+    for i in xrange(k):
+        result = result * (n - i) // (i + 1)
+    return result
+
+
+def count_eq_subtrees(et, max_label):
+    """Counts the labelings of every branch of the "equivalence-tree".
+
+    The labelings of a branch are the node's own label combined with a multiset of m branch labelings for every
+    equivalent node (with multiplicity m) among its children.
+
+    Args:
+        et:         a dictionary that contains the nodes of the "equivalence-tree"
+        max_label:  an int that specifies the labeling alphabet's size
+
+    Returns:
+        dictionary: the count of the labelings of every branch (keyed by the nodes of et)
+        dictionary: the count of the labelings of the children of every node (without the node's own label)
+    """
+
+    counts, children_counts = {}, {}
+    # the children always have greater keys than their parents => process the nodes in descending order
+    for en in sorted(et, reverse=True):
+        cnt = 1
+        for eqnode in et[en].children_list:
+            cnt *= multichoose(counts[eqnode], et[eqnode].m)
+        children_counts[en] = cnt
+        counts[en] = cnt * max_label
+    return counts, children_counts
+
+
+def count_labelings(lst, max_label=2, edge_labeling=False, label_counts=None, at_most=False, compatible=None,
+                    cache=None):
+    """Counts the given free-tree's vertex / edge labelings without generating them.
+
+    Args:
+        lst:            a list that contains a pre-order traversal of a free-tree
+        max_label:      an int that specifies the labeling alphabet's size
+        edge_labeling:  if this is set to true the function counts the edge labelings of the given tree (otherwise
+                        the vertex labelings)
+        label_counts:   the count of every label (see get_labeled_graphs)
+        at_most:        if this is set to true label_counts contains upper bounds of the counts
+        compatible:     the compatibility relation of the adjacent labels (see get_labeled_graphs)
+        cache:          a TreeCache object: the prepared tree is taken from it
+
+    Returns:
+        int:            the count of the labelings (the count of the items that get_labeled_graphs yields)
+    """
+
+    if label_counts is not None:
+        check_constraints(label_counts, compatible)
+        return sum(count_labelings_by_histogram(lst, max_label, edge_labeling, label_counts, at_most,
+                                                cache).itervalues())
+    check_arguments(lst, max_label)
+    relation = compatibility_matrix(compatible, max_label)
+
+    et = cache.prepare(lst)[1] if cache is not None else gen_tree_from_list(lst)[2]
+    if relation is not None:
+        return count_compatible_labelings(et, relation, edge_labeling)
+    (counts, children_counts) = count_eq_subtrees(et, max_label)
+    # the "fictive" center node of a symmetric tree is the root of the "equivalence-tree"
+    if -1 in et:
+        if edge_labeling:
+            # the two centers share the label of the central edge => only the branches below them are counted
+            return max_label * centers_count(et, children_counts)
+        return children_counts[-1]
+    if edge_labeling:
+        return children_counts[0]
+    return counts[0]
+
+
+def histogram_fits(key, limits, base):
+    """Checks whether a packed label histogram is within the limits.
+
+    Args:
+        key:        the label histogram packed into an int (the count of label i is the i-th digit in the given base)
+        limits:     the upper bounds of the labels' counts (None if it is unbounded)
+        base:       the base of the packed histograms (greater than the count of the labels of a labeling)
+
+    Returns:
+        bool:       true if no label's count exceeds its limit
+    """
+    for limit in limits:
+        (key, cnt) = divmod(key, base)
+        if limit is not None and cnt > limit:
+            return False
+    return True
+
+
+def count_compatible_eq_subtrees(et, relation):
+    """Counts the compatible labelings of every branch of the "equivalence-tree" for every label of the branch's root.
+
+    Args:
+        et:         a dictionary that contains the nodes of the "equivalence-tree"
+        relation:   the compatibility matrix of the adjacent labels (see compatibility_matrix)
+
+    Returns:
+        dictionary: the list of the counts of the labelings of every branch (keyed by the nodes of et, indexed by the
+                    label of the branch's root)
+    """
+
+    counts = {}
+    # the children always have greater keys than their parents => process the nodes in descending order
+    for en in sorted(et, reverse=True):
+        row = []
+        for compatible_labels in relation:
+            cnt = 1
+            for eqnode in et[en].children_list:
+                branches = sum(c for (c, compatible) in zip(counts[eqnode], compatible_labels) if compatible)
+                cnt *= multichoose(branches, et[eqnode].m)
+            row.append(cnt)
+        counts[en] = row
+    return counts
+
+
+def count_compatible_labelings(et, relation, edge_labeling):
+    """Counts the labelings of a tree whose adjacent labels are compatible.
+
+    Args:
+        et:             a dictionary that contains the nodes of the "equivalence-tree" created from the given tree
+        relation:       the compatibility matrix of the adjacent labels (see compatibility_matrix)
+        edge_labeling:  edge or vertex labeling
+
+    Returns:
+        int:            the count of the labelings
+    """
+
+    counts = count_compatible_eq_subtrees(et, relation)
+    if -1 in et:
+        # the centers are the two equivalent children of the "fictive" center node
+        eqnode = et[-1].children_list[0]
+        if edge_labeling:
+            # the two centers share the label of the central edge
+            return sum(multichoose(cnt, 2) for cnt in counts[eqnode])
+        # the central edge has to be compatible in any direction
+        cnt = 0
+        for (label, label_cnt) in enumerate(counts[eqnode]):
+            if relation[label][label]:
+                cnt += multichoose(label_cnt, 2)
+            for other_label in xrange(label + 1, len(relation)):
+                if relation[label][other_label] or relation[other_label][label]:
+                    cnt += label_cnt * counts[eqnode][other_label]
+        return cnt
+    if edge_labeling:
+        # the root has no label: its branches are not constrained by it
+        cnt = 1
+        for eqnode in et[0].children_list:
+            cnt *= multichoose(sum(counts[eqnode]), et[eqnode].m)
+        return cnt
+    return sum(counts[0])
+
+
+def polynomial_product(p1, p2, limits, base):
+    """Returns the product of two polynomials whose terms are keyed by packed label histograms.
+
+    Args:
+        p1:         a dictionary that maps the packed label histograms to their coefficients
+        p2:         a dictionary that maps the packed label histograms to their coefficients
+        limits:     the upper bounds of the labels' counts (None if it is unbounded), the exceeding terms are dropped
+        base:       the base of the packed histograms
+
+    Returns:
+        dictionary: the product
+    """
+    result = {}
+    bounded = any(limit is not None for limit in limits)
+    for (k1, c1) in p1.iteritems():
+        for (k2, c2) in p2.iteritems():
+            # the histograms are added digit by digit
+            key = k1 + k2
+            if not bounded or histogram_fits(key, limits, base):
+                result[key] = result.get(key, 0) + c1 * c2
+    return result
+
+
+def multiset_polynomial(poly, m, degree, limits, base):
+    """Returns the polynomial of the multisets of m branch labelings.
+
+    Args:
+        poly:       the polynomial of the branch labelings (a dictionary that maps the packed label histograms to the
+                    count of the branch labelings that have the histogram)
+        m:          the size of the multisets
+        degree:     the count of the labels of a branch (the sum of every histogram of poly)
+        limits:     the upper bounds of the labels' counts (None if it is unbounded), the exceeding terms are dropped
+        base:       the base of the packed histograms
+
+    Returns:
+        dictionary: the polynomial of the multisets
+    """
+    if not poly:
+        # every branch labeling exceeds the limits
+        return {}
+    if m == 1:
+        return poly
+    if degree == 0:
+        return {0: multichoose(sum(poly.itervalues()), m)}
+    if len(poly) > m:
+        # many histograms => cycle index of the symmetric group: j * H_j = sum(P(x^k) * H_(j - k), k = 1..j)
+        powers = [None]
+        for k in xrange(1, m + 1):
+            powers.append(dict((k * key, c) for (key, c) in poly.iteritems() if histogram_fits(k * key, limits, base)))
+        multisets = [{0: 1}]
+        for j in xrange(1, m + 1):
+            terms = {}
+            for k in xrange(1, j + 1):
+                for (key, c) in polynomial_product(powers[k], multisets[j - k], limits, base).iteritems():
+                    terms[key] = terms.get(key, 0) + c
+            multisets.append(dict((key, c // j) for (key, c) in terms.iteritems()))
+        return multisets[m]
+    # few histograms => the multiset contains j of the a branch labelings with histogram h in multichoose(a, j) ways
+    # (the count of the chosen branch labelings is the digit above the histogram)
+    chosen = base ** len(limits)
+    result = {0: 1}
+    items = poly.items()
+    for (i, (h, a)) in enumerate(items):
+        terms = {}
+        for (key, c) in result.iteritems():
+            rest = m - key // chosen
+            # the last histogram has to complete the multisets
+            for j in (xrange(rest, rest + 1) if i == len(items) - 1 else xrange(rest + 1)):
+                if not histogram_fits(key % chosen + j * h, limits, base):
+                    break
+                hkey = key + j * (h + chosen)
+                terms[hkey] = terms.get(hkey, 0) + c * multichoose(a, j)
+        result = terms
+    return dict((key % chosen, c) for (key, c) in result.iteritems())
+
+
+def add_label_polynomial(poly, limits, base):
+    """Returns the polynomial of the labelings that extend the given labelings with one more label.
+
+    Args:
+        poly:       a dictionary that maps the packed label histograms to their coefficients
+        limits:     the upper bounds of the labels' counts (None if it is unbounded), the exceeding terms are dropped
+        base:       the base of the packed histograms
+
+    Returns:
+        dictionary: the extended polynomial
+    """
+    result = {}
+    for (key, c) in poly.iteritems():
+        for label in xrange(len(limits)):
+            lkey = key + base ** label
+            if histogram_fits(lkey, limits, base):
+                result[lkey] = result.get(lkey, 0) + c
+    return result
+
+
+def label_polynomials(et, max_label, limits, base):
+    """Computes the generating polynomials of the labelings of every branch of the "equivalence-tree".
+
+    The polynomials are keyed by packed label histograms (the count of label i is the i-th digit in the given base),
+    the coefficient of a histogram is the count of the inequivalent labelings that have the histogram.
+
+    Args:
+        et:         a dictionary that contains the nodes of the "equivalence-tree"
+        max_label:  an int that specifies the labeling alphabet's size
+        limits:     the upper bounds of the labels' counts (None if it is unbounded), the exceeding terms are dropped
+        base:       the base of the packed histograms (greater than the count of the labels of a labeling)
+
+    Returns:
+        dictionary: the polynomial of every branch (keyed by the nodes of et)
+        dictionary: the polynomial of the children of every node (without the node's own label)
+        dictionary: the count of the nodes of every branch
+    """
+
+    polys, children_polys, degrees = {}, {}, {}
+    # the children always have greater keys than their parents => process the nodes in descending order
+    for en in sorted(et, reverse=True):
+        poly = {0: 1}
+        degree = 0
+        for eqnode in et[en].children_list:
+            poly = polynomial_product(poly, multiset_polynomial(polys[eqnode], et[eqnode].m, degrees[eqnode], limits,
+                                                                base), limits, base)
+            degree += et[eqnode].m * degrees[eqnode]
+        children_polys[en] = poly
+        polys[en] = add_label_polynomial(poly, limits, base)
+        degrees[en] = degree + 1
+    return polys, children_polys, degrees
+
+
+def count_labelings_by_histogram(lst, max_label=2, edge_labeling=False, label_counts=None, at_most=False, cache=None):
+    """Counts the given free-tree's vertex / edge labelings by their label histograms without generating them.
+
+    The result is the generating polynomial of the labelings: the count of the inequivalent labelings for every label
+    histogram (the i-th item of a histogram is the count of label i in the labeling).
+
+    Args:
+        lst:            a list that contains a pre-order traversal of a free-tree
+        max_label:      an int that specifies the labeling alphabet's size
+        edge_labeling:  if this is set to true the function counts the edge labelings of the given tree (otherwise
+                        the vertex labelings)
+        label_counts:   if it is given, only the histograms within the constraints are counted (see get_labeled_graphs)
+        at_most:        if this is set to true label_counts contains upper bounds of the counts
+        cache:          a TreeCache object: the prepared tree is taken from it
+
+    Returns:
+        dictionary:     the count of the labelings for every histogram (tuple) that occurs
+    """
+
+    check_arguments(lst, max_label)
+    bounds = label_count_bounds(label_counts, max_label, at_most)
+    (lo, limits) = bounds if bounds is not None else ([0] * max_label, [None] * max_label)
+
+    et = cache.prepare(lst)[1] if cache is not None else gen_tree_from_list(lst)[2]
+    base = len(lst) + 1
+    (polys, children_polys, degrees) = label_polynomials(et, max_label, limits, base)
+    # the "fictive" center node of a symmetric tree is the root of the "equivalence-tree"
+    if -1 in et:
+        if edge_labeling:
+            # the two centers share the label of the central edge => the branches below them form the multisets
+            poly = {0: 1}
+            for eqnode in et[-1].children_list:
+                poly = polynomial_product(poly, multiset_polynomial(children_polys[eqnode], et[eqnode].m,
+                                                                    degrees[eqnode] - 1, limits, base), limits, base)
+            poly = add_label_polynomial(poly, limits, base)
+        else:
+            poly = children_polys[-1]
+    elif edge_labeling:
+        poly = children_polys[0]
+    else:
+        poly = polys[0]
+
+    result = {}
+    for (key, c) in poly.iteritems():
+        h = []
+        for _ in xrange(max_label):
+            (key, cnt) = divmod(key, base)
+            h.append(cnt)
+        if all(cnt >= low for (cnt, low) in zip(h, lo)):
+            result[tuple(h)] = c
+    return result
+
+
+def multiset_rank(states, count):
+    """Returns the rank of a multiset of branch labelings among the multisets of the same size.
+
+    The multisets are ordered as next_labeling generates the labelings of equivalent siblings: by their sorted
+    (increasing) sequence, lexicographically.
+
+    Args:
+        states:     the indexes of the branch labelings
+        count:      the count of the branch labelings
+
+    Returns:
+        int:        the rank of the multiset
+    """
+    rank, prev = 0, 0
+    for i, state in enumerate(sorted(states)):
+        # the count of the multisets whose i-th element is between the previous element and the current one
+        r = len(states) - i
+        rank += multichoose(count - prev, r) - multichoose(count - state, r)
+        prev = state
+    return rank
+
+
+def multiset_unrank(rank, size, count):
+    """Returns the multiset of branch labelings that has the given rank (the inverse of multiset_rank).
+
+    Args:
+        rank:       the rank of the multiset
+        size:       the size of the multiset
+        count:      the count of the branch labelings
+
+    Returns:
+        list:       the indexes of the branch labelings (in increasing order)
+    """
+    states = []
+    if count <= 16 * size:
+        # few branch labelings => scan the elements in increasing order: cur is the count of the multisets whose
+        # actual element is the scanned one ((a, b) binomial coefficient, updated incrementally)
+        (a, b) = (count + size - 2, size - 1)
+        cur = binomial(a, b)
+        state = 0
+        for i in xrange(size):
+            while rank >= cur:
+                rank -= cur
+                state += 1
+                (cur, a) = (cur * (a - b) // a, a - 1)
+            states.append(state)
+            if b > 0:
+                (cur, a, b) = (cur * b // a, a - 1, b - 1)
+        return states
+
+    prev = 0
+    for i in xrange(size):
+        r = size - i
+        if r == 1:
+            # the last element is determined by the remaining rank
+            states.append(prev + rank)
+            break
+        total = multichoose(count - prev, r)
+        # binary search for the greatest element whose preceding multisets do not exceed the rank
+        lo, hi = prev, count - 1
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if total - multichoose(count - mid, r) <= rank:
+                lo = mid
+            else:
+                hi = mid - 1
+        rank -= total - multichoose(count - lo, r)
+        states.append(lo)
+        prev = lo
+    return states
+
+
+# the maximal size of the tables of multiset_unrank_array (the larger classes are unranked sample by sample)
+MULTISET_TABLE_SIZE = 1 << 16
+
+
+def multiset_unrank_array(ranks, size, count):
+    """Returns the multisets of branch labelings that have the given ranks (multiset_unrank for a NumPy array of
+    ranks).
+
+    The elements are chosen for all the ranks at once: the counts of the multisets that start with every element are
+    tabulated for every remaining size and the elements are found by binary search in the tables. The ranks have to be
+    smaller than multichoose(count, size) < 2 ** 63.
+
+    Args:
+        ranks:      an int64 NumPy array of the ranks of the multisets
+        size:       the size of the multisets
+        count:      the count of the branch labelings
+
+    Returns:
+        list:       the int64 NumPy arrays of the indexes of the branch labelings (the i-th elements of the multisets,
+                    in increasing order)
+    """
+    if size == 1:
+        return [ranks]
+    if count * size > MULTISET_TABLE_SIZE:
+        rows = [multiset_unrank(rank, size, count) for rank in ranks.tolist()]
+        return list(np.array(rows, dtype=np.int64).reshape(len(rows), size).T)
+
+    states = []
+    ranks = ranks.copy()
+    prev = np.zeros(len(ranks), dtype=np.int64)
+    for r in xrange(size, 0, -1):
+        # table[x] is the count of the r element multisets whose elements are not smaller than x (decreasing)
+        table = np.array([multichoose(count - x, r) for x in xrange(count)], dtype=np.int64)
+        # the greatest element whose preceding multisets do not exceed the rank
+        total = table[prev]
+        state = count - 1 - np.searchsorted(table[::-1], total - ranks)
+        ranks -= total - table[state]
+        states.append(state)
+        prev = state
+    return states
+
+
+def rank_children(et, en, states, counts):
+    """Returns the rank of a node's children's labeling.
+
+    The equivalence classes of the children are the digits of a mixed radix number (the first class is the least
+    significant one), every digit is the rank of the multiset of its equivalent siblings' labelings.
+
+    Args:
+        et:         a dictionary that contains the nodes of the "equivalence-tree"
+        en:         the node's node in the "equivalence-tree"
+        states:     the indexes of the children's branch labelings (in the order of the sorted children list)
+        counts:     the count of the labelings of every branch of the "equivalence-tree"
+
+    Returns:
+        int:        the rank of the children's labeling
+    """
+    rank, radix, nind = 0, 1, 0
+    for eqnode in et[en].children_list:
+        m = et[eqnode].m
+        rank += radix * multiset_rank(states[nind:nind + m], counts[eqnode])
+        radix *= multichoose(counts[eqnode], m)
+        nind += m
+    return rank
+
+
+def unrank_children(et, en, rank, counts):
+    """Returns the children's branch labelings that have the given rank (the inverse of rank_children).
+
+    Args:
+        et:         a dictionary that contains the nodes of the "equivalence-tree"
+        en:         the node's node in the "equivalence-tree"
+        rank:       the rank of the children's labeling
+        counts:     the count of the labelings of every branch of the "equivalence-tree"
+
+    Returns:
+        list:       the indexes of the children's branch labelings (in the order of the sorted children list)
+    """
+    states = []
+    for eqnode in et[en].children_list:
+        m = et[eqnode].m
+        (rank, class_rank) = divmod(rank, multichoose(counts[eqnode], m))
+        # the first equivalent sibling has the greatest labeling
+        states.extend(reversed(multiset_unrank(class_rank, m, counts[eqnode])))
+    return states
+
+
+def gen_eq_nodes(t, et, root_id):
+    """Returns the pre-order traversal of the tree together with the nodes of the "equivalence-tree".
+
+    Args:
+        t:          a dictionary that contains the nodes of a labeled tree
+        et:         a dictionary that contains the nodes of the "equivalence-tree" created from the given tree
+        root_id:    the root node of the trees
+
+    Returns:
+        list:       (node, node of the "equivalence-tree") pairs
+    """
+    pairs = []
+    stack = [(root_id, root_id)]
+    while stack:
+        (n, en) = stack.pop()
+        pairs.append((n, en))
+        nind = len(t[n].children_list)
+        for eqnode in reversed(et[en].children_list):
+            nind -= et[eqnode].m
+            stack.extend((c, eqnode) for c in reversed(t[n].children_list[nind:nind + et[eqnode].m]))
+    return pairs
+
+
+def labeling_keys(t, edge_labeling):
+    """Returns the keys of the nodes whose labels form a labeling (in the order of next_labeling).
+
+    Args:
+        t:              a dictionary that contains the nodes of a labeled tree
+        edge_labeling:  edge or vertex labeling
+
+    Returns:
+        list:           the keys of the labeled nodes
+    """
+    keys = sorted(t)
+    if t[0].symm:
+        keys.remove(-1)
+    if edge_labeling:
+        keys.remove(0)
+    return keys
+
+
+def rank_labeling(t, et, max_label, edge_labeling):
+    """Returns the index of the tree's actual labeling in the order of next_labeling.
+
+    The equivalent siblings' labelings are ordered at every level, therefore every labeling that is equivalent to
+    an enumerated one gets the same index.
+
+    Args:
+        t:              a dictionary that contains the nodes of a labeled tree
+        et:             a dictionary that contains the nodes of the "equivalence-tree" created from the given tree
+        max_label:      an int that specifies the labeling alphabet's size
+        edge_labeling:  edge or vertex labeling
+
+    Returns:
+        int:            the index of the labeling
+    """
+    (counts, children_counts) = count_eq_subtrees(et, max_label)
+    root_id = -1 if t[0].symm else 0
+    if t[0].symm:
+        t[-1].label = 0
+        if edge_labeling:
+            # the label of the second center belongs to the central edge
+            t[0].label = t[1].label
+    elif edge_labeling:
+        t[0].label = 0
+
+    # the index of every branch's labeling (the children are processed before their parents)
+    states = {}
+    for (n, en) in reversed(gen_eq_nodes(t, et, root_id)):
+        states[n] = t[n].label * children_counts[en] + \
+            rank_children(et, en, [states[c] for c in t[n].children_list], counts)
+
+    if t[0].symm and edge_labeling:
+        # the centers carry the label of the central edge => only their branches below them are ranked
+        label = t[1].label
+        states = [states[c] - label * children_counts[en] for (c, en) in zip(t[-1].children_list,
+                                                                              children_eq_nodes(et, -1))]
+        return label * centers_count(et, children_counts) + rank_children(et, -1, states, children_counts)
+    return states[root_id]
+
+
+def centers_count(et, children_counts):
+    """Returns the count of the labelings of a symmetric tree's centers' branches below the centers.
+
+    Args:
+        et:                 a dictionary that contains the nodes of the "equivalence-tree" created from a symmetric tree
+        children_counts:    the count of the labelings of the children of every node of the "equivalence-tree"
+
+    Returns:
+        int:                the count of the labelings
+    """
+    cnt = 1
+    for eqnode in et[-1].children_list:
+        cnt *= multichoose(children_counts[eqnode], et[eqnode].m)
+    return cnt
+
+
+def children_eq_nodes(et, en):
+    """Returns the nodes of the "equivalence-tree" that belong to the children of a node (in the sorted order).
+
+    Args:
+        et:     a dictionary that contains the nodes of the "equivalence-tree"
+        en:     the node's node in the "equivalence-tree"
+
+    Returns:
+        list:   the nodes of the "equivalence-tree" (every node is repeated by its multiplicity)
+    """
+    return [eqnode for eqnode in et[en].children_list for _ in xrange(et[eqnode].m)]
+
+
+def unrank_labelings(t, et, indexes, max_label, edge_labeling):
+    """Returns the labelings that have the given indexes in the order of next_labeling.
+
+    The tree is walked once, every node computes the labels of all the labelings.
+
+    Args:
+        t:              a dictionary that contains the nodes of a labeled tree
+        et:             a dictionary that contains the nodes of the "equivalence-tree" created from the given tree
+        indexes:        the indexes of the labelings
+        max_label:      an int that specifies the labeling alphabet's size
+        edge_labeling:  edge or vertex labeling
+
+    Returns:
+        dictionary:     the labels of every node (a list that contains a label for every index)
+    """
+    if len(indexes) == 0:
+        return dict((n, []) for n in t)
+
+    (counts, children_counts) = count_eq_subtrees(et, max_label)
+    labels = {}
+    if t[0].symm:
+        labels[-1] = [0] * len(indexes)
+        if edge_labeling:
+            # the centers carry the label of the central edge
+            cnt = centers_count(et, children_counts)
+            rows = []
+            for index in indexes:
+                (label, index) = divmod(index, cnt)
+                rows.append([label * children_counts[en] + state for (en, state) in
+                             zip(children_eq_nodes(et, -1), unrank_children(et, -1, index, children_counts))])
+        else:
+            rows = [unrank_children(et, -1, index, counts) for index in indexes]
+        stack = zip(t[-1].children_list, children_eq_nodes(et, -1), zip(*rows))
+    else:
+        stack = [(0, 0, indexes)]
+
+    while stack:
+        (n, en, states) = stack.pop()
+        states = [divmod(state, children_counts[en]) for state in states]
+        labels[n] = [int(label) for (label, _) in states]
+        if t[n].children_list:
+            rows = [unrank_children(et, en, state, counts) for (_, state) in states]
+            stack.extend(zip(t[n].children_list, children_eq_nodes(et, en), zip(*rows)))
+    return labels
+
+
+def unrank_children_array(et, en, ranks, counts):
+    """Returns the children's branch labelings that have the given ranks (unrank_children for a NumPy array of ranks).
+
+    Args:
+        et:         a dictionary that contains the nodes of the "equivalence-tree"
+        en:         the node's node in the "equivalence-tree"
+        ranks:      an int64 NumPy array of the ranks of the children's labelings
+        counts:     the count of the labelings of every branch of the "equivalence-tree"
+
+    Returns:
+        list:       the int64 NumPy arrays of the indexes of the children's branch labelings (in the order of the sorted
+                    children list)
+    """
+    states = []
+    for eqnode in et[en].children_list:
+        m = et[eqnode].m
+        (ranks, class_ranks) = divmod(ranks, multichoose(counts[eqnode], m))
+        # the first equivalent sibling has the greatest labeling
+        states.extend(reversed(multiset_unrank_array(class_ranks, m, counts[eqnode])))
+    return states
+
+
+def unrank_labelings_array(t, et, indexes, max_label, edge_labeling):
+    """Returns the labelings that have the given indexes in the order of next_labeling (unrank_labelings for a NumPy
+    array of indexes).
+
+    Every node computes the labels of all the labelings with NumPy operations, so the cost is O(n) NumPy operations
+    instead of O(n) Python steps per labeling. The count of the labelings has to be smaller than 2 ** 63.
+
+    Args:
+        t:              a dictionary that contains the nodes of a labeled tree
+        et:             a dictionary that contains the nodes of the "equivalence-tree" created from the given tree
+        indexes:        an int64 NumPy array of the indexes of the labelings
+        max_label:      an int that specifies the labeling alphabet's size
+        edge_labeling:  edge or vertex labeling
+
+    Returns:
+        dictionary:     the labels of every node (an int64 NumPy array that contains a label for every index)
+    """
+    (counts, children_counts) = count_eq_subtrees(et, max_label)
+    labels = {}
+    if t[0].symm:
+        labels[-1] = np.zeros(len(indexes), dtype=np.int64)
+        if edge_labeling:
+            # the centers carry the label of the central edge
+            (label, indexes) = divmod(indexes, centers_count(et, children_counts))
+            states = [label * children_counts[en] + state for (en, state) in
+                      zip(children_eq_nodes(et, -1), unrank_children_array(et, -1, indexes, children_counts))]
+        else:
+            states = unrank_children_array(et, -1, indexes, counts)
+        stack = zip(t[-1].children_list, children_eq_nodes(et, -1), states)
+    else:
+        stack = [(0, 0, indexes)]
+
+    while stack:
+        (n, en, states) = stack.pop()
+        (labels[n], states) = divmod(states, children_counts[en])
+        if t[n].children_list:
+            stack.extend(zip(t[n].children_list, children_eq_nodes(et, en), unrank_children_array(et, en, states,
+                                                                                                  counts)))
+    return labels
+
+
+def unrank_labeling(t, et, index, max_label, edge_labeling):
+    """Sets the tree's labeling to the one that has the given index in the order of next_labeling.
+
+    Args:
+        t:              a dictionary that contains the nodes of a labeled tree
+        et:             a dictionary that contains the nodes of the "equivalence-tree" created from the given tree
+        index:          the index of the labeling
+        max_label:      an int that specifies the labeling alphabet's size
+        edge_labeling:  edge or vertex labeling
+    """
+    for (n, labels) in unrank_labelings(t, et, [index], max_label, edge_labeling).iteritems():
+        t[n].label = labels[0]
+
+
+def rank(lst, labeling, max_label=2, edge_labeling=False):
+    """Returns the index of a labeling in the order of get_labeled_graphs without generating the preceding ones.
+
+    Args:
+        lst:            a list that contains a pre-order traversal of a free-tree
+        labeling:       a vertex / edge labeling of the balanced tree (as get_labeled_graphs yields it), every
+                        equivalent labeling gets the same index
+        max_label:      an int that specifies the labeling alphabet's size
+        edge_labeling:  if this is set to true the labeling is an edge labeling (otherwise a vertex labeling)
+
+    Returns:
+        int:            the index of the labeling
+    """
+
+    check_arguments(lst, max_label)
+
+    (lst, t, et) = gen_tree_from_list(lst)
+    keys = labeling_keys(t, edge_labeling)
+    if len(labeling) != len(keys) or any(type(label) is not int or not 0 <= label < max_label for label in labeling):
+        raise ValueError("labeling should contain %d labels from 0..max_label - 1..." % len(keys))
+    for (n, label) in zip(keys, labeling):
+        t[n].label = label
+    return rank_labeling(t, et, max_label, edge_labeling)
+
+
+def unrank(lst, index, max_label=2, edge_labeling=False):
+    """Returns the labeling that has the given index in the order of get_labeled_graphs without generating the
+    preceding ones.
+
+    Args:
+        lst:            a list that contains a pre-order traversal of a free-tree
+        index:          the index of the labeling (0..count_labelings(lst, max_label, edge_labeling) - 1)
+        max_label:      an int that specifies the labeling alphabet's size
+        edge_labeling:  if this is set to true the function returns an edge labeling (otherwise a vertex labeling)
+
+    Returns:
+        tuple:          the labeling
+    """
+
+    if not 0 <= index < count_labelings(lst, max_label, edge_labeling):
+        raise ValueError("index should be between 0 and the count of the labelings...")
+
+    (lst, t, et) = gen_tree_from_list(lst)
+    unrank_labeling(t, et, index, max_label, edge_labeling)
+    return graph_labeling_to_list(t, labeling_keys(t, edge_labeling))
+
+
+def gen_canonicalizer(t, et, edge_labeling):
+    """Returns a function that maps a labeling of the tree to the equivalent labeling that next_labeling generates.
+
+    The branches are ranked bottom-up like sort_tree ranks them, but their labels are folded into the ranks: the key of
+    a branch is its root's label followed by the sorted ranks of every equivalence class of its children (the last
+    class first), which is the order of the branches' labelings in next_labeling. The branches are only compared to
+    their equivalent branches (the branches of the same node of the "equivalence-tree"). Then the branches are
+    reordered top-down, the first equivalent sibling gets the greatest labeling.
+
+    Args:
+        t:              a dictionary that contains the nodes of a labeled tree
+        et:             a dictionary that contains the nodes of the "equivalence-tree" created from the given tree
+        edge_labeling:  edge or vertex labeling
+
+    Returns:
+        function:       maps a labeling (in the order of labeling_keys) to the representative labeling (tuple)
+    """
+    keys = labeling_keys(t, edge_labeling)
+    root_id = -1 if t[0].symm else 0
+    # the tree's nodes of every node of the "equivalence-tree" (the children classes have greater keys)
+    (groups, groups_of) = ({}, {})
+    for (n, en) in gen_eq_nodes(t, et, root_id):
+        groups.setdefault(en, []).append(n)
+        groups_of[n] = en
+    # the slices of the children lists that belong to the equivalence classes (the last class first)
+    slices = {}
+    for en in groups:
+        (bounds, nind) = ([], 0)
+        for eqnode in et[en].children_list:
+            bounds.append((nind, nind + et[eqnode].m))
+            nind += et[eqnode].m
+        slices[en] = bounds[::-1]
+    order = sorted(groups, reverse=True)
+
+    def canonicalize_labeling(labeling):
+        labels = dict(zip(keys, labeling))
+        if t[0].symm:
+            # the "fictive" center node has no label, the label of the second center belongs to the central edge
+            labels[-1] = 0
+            if edge_labeling:
+                labels[0] = labels[1]
+        elif edge_labeling:
+            labels[0] = 0
+
+        ranks = {}
+        for en in order:
+            branch_keys = []
+            for n in groups[en]:
+                children = t[n].children_list
+                branch_keys.append((labels[n],) + tuple(tuple(sorted(ranks[c] for c in children[i:j]))
+                                                        for (i, j) in slices[en]))
+            rank = dict((key, r) for (r, key) in enumerate(sorted(set(branch_keys))))
+            for (n, key) in zip(groups[en], branch_keys):
+                ranks[n] = rank[key]
+
+        # copy the labels of the sorted branches (the sources) to the branches in the order of next_labeling
+        canonical = {}
+        stack = [(root_id, root_id)]
+        while stack:
+            (dest, source) = stack.pop()
+            canonical[dest] = labels[source]
+            (dest_children, source_children) = (t[dest].children_list, t[source].children_list)
+            for (i, j) in slices[groups_of[dest]]:
+                stack.extend(zip(dest_children[i:j], sorted(source_children[i:j], key=lambda c: -ranks[c])))
+        return tuple(canonical[n] for n in keys)
+    return canonicalize_labeling
+
+
+def check_labeling(labeling, keys):
+    """Raises ValueError if the labeling does not contain a non-negative integer label for every given key.
+
+    Args:
+        labeling:   a vertex / edge labeling
+        keys:       the keys of the labeled nodes (see labeling_keys)
+    """
+    if len(labeling) != len(keys) or any(type(label) is not int or label < 0 for label in labeling):
+        raise ValueError("labeling should contain %d non-negative integer labels..." % len(keys))
+
+
+def canonicalize(lst, labeling, edge_labeling=False, balanced=True):
+    """Maps a labeling to the equivalent labeling that get_labeled_graphs generates (its orbit's representative).
+
+    Args:
+        lst:            a list that contains a pre-order traversal of a free-tree
+        labeling:       a vertex / edge labeling of the balanced traversal (as get_labeled_graphs yields it and rank
+                        takes it)
+        edge_labeling:  if this is set to true the labeling is an edge labeling (otherwise a vertex labeling)
+        balanced:       if this is set to false the labeling belongs to the given traversal instead (see
+                        labeling_order)
+
+    Returns:
+        tuple:          the representative labeling (of the balanced traversal)
+    """
+    return next(canonicalize_labelings(lst, [labeling], edge_labeling, balanced))
+
+
+def canonicalize_labelings(lst, labelings, edge_labeling=False, balanced=True):
+    """Maps the labelings of a free-tree to their representatives one by one (see canonicalize).
+
+    The tree and its canonicalizer are prepared only once for all the labelings.
+
+    Args:
+        lst:            a list that contains a pre-order traversal of a free-tree
+        labelings:      an iterable of vertex / edge labelings of the balanced traversal
+        edge_labeling:  if this is set to true the labelings are edge labelings (otherwise vertex labelings)
+        balanced:       if this is set to false the labelings belong to the given traversal instead
+
+    Yields:
+        tuple:          the representative of the next labeling (of the balanced traversal)
+    """
+    check_arguments(lst, 1)
+
+    order = None if balanced else labeling_order(lst, edge_labeling)
+    (lst, t, et) = gen_tree_from_list(lst)
+    keys = labeling_keys(t, edge_labeling)
+    canonicalize_labeling = gen_canonicalizer(t, et, edge_labeling)
+    for labeling in labelings:
+        check_labeling(labeling, keys)
+        if order is not None:
+            labeling = [labeling[i] for i in order]
+        yield canonicalize_labeling(labeling)
+
+
+# the state of a worker process of get_labeled_graphs_parallel
+_shard_state = {}
+
+
+def _init_shard_worker(lst, max_label, edge_labeling, reducer=None):
+    """Prepares the tree in a worker process of get_labeled_graphs_parallel.
+
+    Args:
+        lst:            a list that contains a pre-order traversal of a free-tree
+        max_label:      an int that specifies the labeling alphabet's size
+        edge_labeling:  edge or vertex labeling
+        reducer:        the function that reduces the labelings of a shard (None if they are packed)
+    """
+    (lst, t, et) = gen_tree_from_list(lst)
+    ct = CompactTree(t, et)
+    _shard_state.update(t=t, et=et, ct=ct, max_label=max_label, edge_labeling=edge_labeling, reducer=reducer,
+                        to_tuple=gen_labels_getter(compact_labeling_positions(ct, edge_labeling)))
+
+
+def _shard_labelings(shard):
+    """Generates the labelings of a shard in a worker process of get_labeled_graphs_parallel.
+
+    Args:
+        shard:  the first index and the end index of the shard's labelings
+
+    Yields:
+        tuple:  the next labeling of the shard
+    """
+    (start, stop) = shard
+    (t, ct, max_label, edge_labeling) = (_shard_state['t'], _shard_state['ct'], _shard_state['max_label'],
+                                         _shard_state['edge_labeling'])
+    # jump to the shard's first labeling, then continue the enumeration from there
+    unrank_labeling(t, _shard_state['et'], start, max_label, edge_labeling)
+    labels = new_label_array(len(ct.ids), max_label)
+    for (p, n) in enumerate(ct.ids):
+        labels[p] = t[n].label
+
+    to_tuple = _shard_state['to_tuple']
+    count = 0
+    for _ in step_compact_labeling(ct, labels, max_label, edge_labeling):
+        yield to_tuple(labels)
+        count += 1
+        if count == stop - start:
+            break
+
+
+def _enumerate_shard(shard):
+    """Enumerates a shard in a worker process of get_labeled_graphs_parallel.
+
+    The labelings are packed into one string (a label per byte, or the bytes of an array('l') if the labels do not fit
+    into a byte), so the parent process unpickles a single string instead of a tuple per labeling.
+
+    Args:
+        shard:  the first index and the end index of the shard's labelings
+
+    Returns:
+        str:    the packed labelings of the shard (see unpack_shard), or the result of the reducer
+    """
+    if _shard_state['reducer'] is not None:
+        return _shard_state['reducer'](_shard_labelings(shard))
+    rows = new_label_array(0, _shard_state['max_label'])
+    for labeling in _shard_labelings(shard):
+        rows.extend(labeling)
+    return bytes(rows) if type(rows) is bytearray else rows.tostring()
+
+
+def unpack_shard(data, count, width, max_label):
+    """Generates the labelings of a shard that is packed by _enumerate_shard (a tuple is built only when it is
+    consumed).
+
+    Args:
+        data:       the packed labelings
+        count:      the count of the labelings
+        width:      the count of the labels of a labeling
+        max_label:  an int that specifies the labeling alphabet's size
+
+    Yields:
+        tuple:      the next labeling
+    """
+    if width == 0:
+        for _ in xrange(count):
+            yield ()
+        return
+    rows = bytearray(data) if max_label < 256 else array('l', data)
+    for offset in xrange(0, len(rows), width):
+        yield tuple(rows[offset:offset + width])
+
+
+def get_labeled_graphs_parallel(lst, max_label=2, edge_labeling=False, processes=None, chunk_size=10000,
+                                ordered=True, reducer=None):
+    """Generates all the given free-tree's vertex / edge labelings in a pool of worker processes.
+
+    The labelings are split into shards of consecutive indexes: every worker jumps to the first labeling of its shard
+    (see unrank) and generates the shard's labelings from there. At most two shards per process are submitted ahead of
+    the consumer, so the memory is bounded and an abandoned enumeration stops its pool as soon as these shards are
+    finished.
+
+    The workers send every shard as one packed string (see unpack_shard): the parent process only unpickles the
+    strings and builds the tuples of the consumed labelings, the labelings are stepped and their labels are gathered in
+    the workers. Building the tuples still bounds the speed of the parent (~800000 labelings of 100 nodes per second,
+    ~2.5 times the speed of a worker), so a consumer that can process the shards separately should pass a reducer:
+    the workers reduce the labelings of their shards and only the results are sent to the parent. Starting the pool
+    takes ~0.1 seconds, so it pays off for long enumerations on several CPUs. bench_parallel in benchmarks.py measures
+    the break-even on the given machine.
+
+    Args:
+        lst:            a list that contains a pre-order traversal of a free-tree
+        max_label:      an int that specifies the labeling alphabet's size
+        edge_labeling:  if this is set to true the function generates the edge labelings of the given tree (otherwise
+                        the vertex labelings)
+        processes:      the count of the worker processes (the count of the CPUs by default)
+        chunk_size:     the count of the labelings in a shard
+        ordered:        if this is set to true the labelings are yielded in the order of get_labeled_graphs (otherwise
+                        the shards are yielded as they are finished)
+        reducer:        a picklable function (e.g. a module-level one) that gets the iterator of a shard's labelings in
+                        a worker process and returns a picklable result: if it is given, the results of the shards are
+                        yielded instead of the labelings
+
+    Yields:
+        tuple:          the next labeling (or the result of the reducer for the next shard)
+    """
+
+    count = count_labelings(lst, max_label, edge_labeling)
+    if type(chunk_size) is not int or chunk_size <= 0:
+        raise ValueError("chunk_size should be a positive integer...")
+    if processes is not None and (type(processes) is not int or processes <= 0):
+        raise ValueError("processes should be a positive integer...")
+
+    def shards():
+        start = 0
+        while start < count:
+            yield (start, min(start + chunk_size, count))
+            start += chunk_size
+
+    pool = multiprocessing.Pool(processes, _init_shard_worker, (lst, max_label, edge_labeling, reducer))
+    # the shards are submitted in a bounded window (Pool.imap would feed the pool with all the shards, and terminate
+    # hangs while its feeder thread is blocked on the full task queue)
+    window = 2 * (processes or multiprocessing.cpu_count())
+    pending = deque()
+    # the finished shards wake up the unordered consumer (a failed shard does not, so it is polled as well)
+    finished = Queue.Queue()
+
+    width = len(lst) - 1 if edge_labeling else len(lst)
+
+    def next_shard():
+        if ordered:
+            (shard, result) = pending.popleft()
+        else:
+            while not any(result.ready() for (_, result) in pending):
+                try:
+                    finished.get(timeout=0.1)
+                except Queue.Empty:
+                    pass
+            (shard, result) = next(item for item in pending if item[1].ready())
+            pending.remove((shard, result))
+        if reducer is not None:
+            return [result.get()]
+        return unpack_shard(result.get(), shard[1] - shard[0], width, max_label)
+
+    try:
+        for shard in shards():
+            pending.append((shard, pool.apply_async(_enumerate_shard, (shard,),
+                                                    callback=lambda _: finished.put(None))))
+            if len(pending) >= window:
+                for lblvect in next_shard():
+                    yield lblvect
+        while pending:
+            for lblvect in next_shard():
+                yield lblvect
+    finally:
+        # a worker that sends a shard holds the lock of the result queue: terminate would hang on it after the result
+        # handler stops reading, so the submitted shards are finished first
+        for (_, result) in pending:
+            result.wait()
+        pool.terminate()
+        pool.join()
+
+
+def random_index(rnd, count):
+    """Returns a uniformly distributed random integer from 0..count - 1 (exactly, even for big integers).
+
+    Args:
+        rnd:    a random.Random object
+        count:  a positive integer
+
+    Returns:
+        int:    the random integer
+    """
+    bits = count.bit_length()
+    index = rnd.getrandbits(bits)
+    while index >= count:
+        index = rnd.getrandbits(bits)
+    return index
+
+
+def sample_labelings(lst, max_label=2, k=1, edge_labeling=False, seed=None, as_array=False):
+    """Draws uniformly distributed random labelings of the given free-tree.
+
+    Every inequivalent labeling (every labeling of get_labeled_graphs) has the same probability. The samples are
+    drawn as uniform random indexes and they are unranked together: the tree is prepared and walked only once. The
+    samples are unranked one by one with Python integers, which costs O(n) Python steps per sample. If as_array is
+    set, every node unranks all the samples with NumPy operations instead (see unrank_labelings_array), unless the
+    count of the labelings does not fit into int64. The same seed draws the same samples in both cases.
+
+    Args:
+        lst:            a list that contains a pre-order traversal of a free-tree
+        max_label:      an int that specifies the labeling alphabet's size
+        k:              the count of the samples
+        edge_labeling:  if this is set to true the function draws edge labelings (otherwise vertex labelings)
+        seed:           the seed of the random generator
+        as_array:       if this is set to true the samples are unranked with NumPy and they are returned as a
+                        (k, labeling length) NumPy array
+
+    Returns:
+        list:           the labelings (tuples)
+    """
+
+    count = count_labelings(lst, max_label, edge_labeling)
+    if type(k) is not int or k < 0:
+        raise ValueError("k should be a non-negative integer...")
+    if as_array and np is None:
+        raise ImportError("as_array requires NumPy...")
+
+    rnd = random.Random(seed)
+    indexes = [random_index(rnd, count) for _ in xrange(k)]
+
+    (lst, t, et) = gen_tree_from_list(lst)
+    keys = labeling_keys(t, edge_labeling)
+    if as_array:
+        dtype = np.uint8 if max_label <= 256 else np.uint16 if max_label <= 65536 else np.uint32
+        if count < 1 << 63:
+            labels = unrank_labelings_array(t, et, np.array(indexes, dtype=np.int64), max_label, edge_labeling)
+        else:
+            labels = unrank_labelings(t, et, indexes, max_label, edge_labeling)
+        block = np.empty((k, len(keys)), dtype=dtype)
+        for (i, n) in enumerate(keys):
+            block[:, i] = labels[n]
+        return block
+    labels = unrank_labelings(t, et, indexes, max_label, edge_labeling)
+    columns = [labels[n] for n in keys]
+    if len(columns) == 0:
+        return [()] * k
+    return zip(*columns)
+
+
+def next_rooted_level_sequence(lst, p=None):
+    """Returns the successor of a rooted tree's level sequence (in the reverse lexicographic order of the sequences).
+
+    Args:
+        lst:    a list that contains the canonical pre-order traversal (level sequence) of a rooted tree
+        p:      the index of the node that is decreased (the last node that is not a child of the root by default)
+
+    Returns:
+        list:   the next level sequence (None if the given one is the last one)
+    """
+    if p is None:
+        p = len(lst) - 1
+        while lst[p] == 1:
+            p -= 1
+    if p == 0:
+        return None
+    # the nearest preceding node of the node's parent level: its branch is repeated from the node's index on
+    q = p - 1
+    while lst[q] != lst[p] - 1:
+        q -= 1
+    result = list(lst)
+    for i in xrange(p, len(result)):
+        result[i] = result[i - p + q]
+    return result
+
+
+def split_level_sequence(lst):
+    """Splits a rooted tree's level sequence into the first branch of the root and the rest of the tree.
+
+    Args:
+        lst:    a list that contains the level sequence of a rooted tree
+
+    Returns:
+        list:   the level sequence of the root's first branch (rooted at the root's first child)
+        list:   the level sequence of the tree without the root's first branch
+    """
+    m = 2
+    while m < len(lst) and lst[m] != 1:
+        m += 1
+    return [d - 1 for d in lst[1:m]], [0] + lst[m:]
+
+
+def next_free_level_sequence(lst):
+    """Returns the first level sequence from the given one that is the canonical sequence of a free-tree.
+
+    The free-trees are rooted at their centroid: the root's first branch is not higher (and not larger if they have
+    the same height) than the rest of the tree, and the first branch of a tree with two centroids is not greater than
+    the rest.
+
+    Args:
+        lst:    a list that contains the level sequence of a rooted tree
+
+    Returns:
+        list:   the level sequence of the free-tree (None if there are no more free-trees)
+    """
+    (left, rest) = split_level_sequence(lst)
+    (left_height, rest_height) = (max(left), max(rest))
+    if rest_height > left_height or rest_height == left_height and \
+            (len(left) < len(rest) or len(left) == len(rest) and left <= rest):
+        return lst
+    p = len(left)
+    result = next_rooted_level_sequence(lst, p)
+    if lst[p] > 2:
+        # the rest of the tree is replaced by the smallest path that is not lower than the first branch
+        (left, _) = split_level_sequence(result)
+        suffix = range(1, max(left) + 2)
+        result[-len(suffix):] = suffix
+    return result
+
+
+def free_trees(n):
+    """Generates all the non-isomorphic free-trees with n nodes.
+
+    The trees are generated by the algorithm of Wright, Richmond, Odlyzko and McKay: the canonical level sequences of
+    the trees (rooted at their centroids) are visited in reverse lexicographic order and the sequences that are not
+    canonical are skipped, which takes a constant amortized count of steps per tree.
+
+    Args:
+        n:      the count of the nodes of the trees
+
+    Yields:
+        list:   a pre-order traversal of the next free-tree (see is_proper_traversal)
+    """
+    if type(n) is not int or n <= 0:
+        raise ValueError("n should be a positive integer...")
+    if n <= 2:
+        yield range(n)
+        return
+
+    # the first tree is the path rooted at its center
+    lst = range(n // 2 + 1) + range(1, (n + 1) // 2)
+    while lst is not None:
+        lst = next_free_level_sequence(lst)
+        if lst is not None:
+            yield lst
+            lst = next_rooted_level_sequence(lst)
+
+
+def get_labeled_free_trees(n, max_label=2, edge_labeling=False, compact=False, max_classes=100000):
+    """Generates the vertex / edge labelings of every non-isomorphic free-tree with n nodes.
+
+    The trees are generated by free_trees and they share the canonical IDs of their branches (see gen_class_table):
+    the branches that appeared in an earlier tree are not compared again while the trees are sorted. The table (and the
+    memoized comparisons) grow with the count of the trees, so a new table is started between two trees if it contains
+    more than max_classes IDs.
+
+    Args:
+        n:              the count of the nodes of the trees
+        max_label:      an int that specifies the labeling alphabet's size
+        edge_labeling:  if this is set to true the function generates the edge labelings of the trees (otherwise the
+                        vertex labelings)
+        compact:        if this is set to true the labelings are generated on a CompactTree (see get_labeled_graphs)
+        max_classes:    the count of the canonical IDs that are kept between the trees
+
+    Yields:
+        tuple:          the balanced pre-order traversal of the next tree and the generator of its labelings (the
+                        labelings belong to the traversal, like the ones of get_labeled_graphs)
+    """
+    check_arguments([0], max_label)
+    if type(max_classes) is not int or max_classes <= 0:
+        raise ValueError("max_classes should be a positive integer...")
+    table = gen_class_table()
+    for lst in free_trees(n):
+        # the labelings of the earlier trees only use the IDs of their nodes, not the table
+        if len(table[1]) > max_classes:
+            table = gen_class_table()
+        (lst, t, et) = gen_tree_from_list(lst, table)
+        if compact:
+            yield lst, next_compact_labeling(CompactTree(t, et), max_label, edge_labeling)
+        else:
+            yield lst, next_labeling(t, et, max_label, edge_labeling)
+
+
+# the version of the format of the states of ResumableLabelings (the states of other versions cannot be resumed)
+CHECKPOINT_VERSION = 1
+
+
+class ResumableLabelings(object):
+    """Iterator of a free-tree's labelings (in the order of get_labeled_graphs) that can be checkpointed and resumed.
+
+    The state of the enumeration is the label array of the CompactTree (the labels of the last yielded labeling) and
+    the count of the yielded labelings: the stepping of the labelings only depends on the actual labels. A resumed
+    state is checked to be the labeling of the given index (a label array that is not reachable would be stepped
+    through other labelings silently).
+    """
+
+    def __init__(self, lst, max_label=2, edge_labeling=False, labels=None, index=0, checkpoint_path=None,
+                 checkpoint_every=None):
+        """Prepares the enumeration.
+
+        Args:
+            lst:                a list that contains a pre-order traversal of a free-tree
+            max_label:          an int that specifies the labeling alphabet's size
+            edge_labeling:      edge or vertex labeling
+            labels:             the label array of the last yielded labeling (None if nothing was yielded)
+            index:              the count of the yielded labelings
+            checkpoint_path:    the file of the periodic checkpoints (None if there are no periodic checkpoints)
+            checkpoint_every:   the count of the labelings between the periodic checkpoints
+        """
+        check_arguments(lst, max_label)
+        if checkpoint_path is not None and (type(checkpoint_every) is not int or checkpoint_every <= 0):
+            raise ValueError("checkpoint_every should be a positive integer...")
+        (self.lst, self.max_label, self.edge_labeling) = (lst, max_label, edge_labeling)
+        (self.checkpoint_path, self.checkpoint_every) = (checkpoint_path, checkpoint_every)
+
+        (_, t, et) = gen_tree_from_list(lst)
+        ct = CompactTree(t, et)
+        self.labels = new_label_array(len(ct.ids), max_label)
+        if type(index) is not int or index < 0 or (labels is None) != (index == 0):
+            raise ValueError("index should be the count of the yielded labelings...")
+        if labels is not None:
+            if len(labels) != len(self.labels) or any(type(label) is not int or not 0 <= label < max_label
+                                                      for label in labels):
+                raise ValueError("The labels of the state do not belong to the tree...")
+            for (p, label) in enumerate(labels):
+                self.labels[p] = label
+        self.index = index
+        positions = compact_labeling_positions(ct, edge_labeling)
+        self.to_tuple = gen_labels_getter(positions)
+        if labels is not None:
+            self.check_state(ct, positions)
+        self.steps = step_compact_labeling(ct, self.labels, max_label, edge_labeling)
+        if labels is not None:
+            # the labeling of the state has already been yielded
+            next(self.steps, None)
+
+    def check_state(self, ct, positions):
+        """Raises ValueError if the label array is not the one of the index-th labeling of get_labeled_graphs.
+
+        Args:
+            ct:         the CompactTree of the enumeration
+            positions:  the positions of the labeled nodes (see compact_labeling_positions)
+        """
+        labeling = self.to_tuple(self.labels)
+        if self.index > count_labelings(self.lst, self.max_label, self.edge_labeling) or \
+                unrank(self.lst, self.index - 1, self.max_label, self.edge_labeling) != labeling:
+            raise ValueError("The labels of the state are not the labeling of the given index...")
+        # the positions without labels: the roots are zeros, the first center of a symmetric edge labeling carries the
+        # label of the second center
+        expected = new_label_array(len(self.labels), self.max_label)
+        for (p, label) in zip(positions, labeling):
+            expected[p] = label
+        if ct.symm and self.edge_labeling:
+            (first, second) = ct.positions([0, 1])
+            expected[first] = expected[second]
+        if expected != self.labels:
+            raise ValueError("The labels of the state are not the labeling of the given index...")
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        """Returns the next labeling (and writes the periodic checkpoint of the already consumed labelings)."""
+        if self.checkpoint_path is not None and self.index > 0 and self.index % self.checkpoint_every == 0:
+            pickle_atomically(self.checkpoint(), self.checkpoint_path)
+        next(self.steps)
+        self.index += 1
+        return self.to_tuple(self.labels)
+
+    def checkpoint(self):
+        """Returns the state of the enumeration (a picklable dictionary, see resume_labeled_graphs)."""
+        return {'version': CHECKPOINT_VERSION, 'lst': list(self.lst), 'max_label': self.max_label,
+                'edge_labeling': self.edge_labeling, 'labels': list(self.labels) if self.index > 0 else None,
+                'index': self.index}
+
+
+def get_labeled_graphs_resumable(lst, max_label=2, edge_labeling=False, checkpoint_path=None, checkpoint_every=100000):
+    """Generates all the given free-tree's vertex / edge labelings with an iterator that can be checkpointed.
+
+    The labelings are the same (and in the same order) as the ones of get_labeled_graphs. The checkpoint method of the
+    returned iterator returns the state of the enumeration, resume_labeled_graphs continues it.
+
+    Args:
+        lst:                a list that contains a pre-order traversal of a free-tree
+        max_label:          an int that specifies the labeling alphabet's size
+        edge_labeling:      if this is set to true the function generates the edge labelings of the given tree
+                            (otherwise the vertex labelings)
+        checkpoint_path:    if it is given, the state is pickled into this file after every checkpoint_every consumed
+                            labelings (see load_checkpoint)
+        checkpoint_every:   the count of the labelings between the periodic checkpoints
+
+    Returns:
+        ResumableLabelings: the iterator of the labelings
+    """
+    return ResumableLabelings(lst, max_label, edge_labeling, checkpoint_path=checkpoint_path,
+                              checkpoint_every=checkpoint_every)
+
+
+def resume_labeled_graphs(state, checkpoint_path=None, checkpoint_every=100000):
+    """Continues an enumeration from its state: the labelings after the already yielded ones are generated.
+
+    Args:
+        state:              the state of the enumeration (see ResumableLabelings.checkpoint)
+        checkpoint_path:    the file of the periodic checkpoints (see get_labeled_graphs_resumable)
+        checkpoint_every:   the count of the labelings between the periodic checkpoints
+
+    Returns:
+        ResumableLabelings: the iterator of the remaining labelings
+    """
+    try:
+        if state['version'] != CHECKPOINT_VERSION:
+            raise ValueError("The state has an unknown format version: %r..." % state['version'])
+        return ResumableLabelings(state['lst'], state['max_label'], state['edge_labeling'], state['labels'],
+                                  state['index'], checkpoint_path, checkpoint_every)
+    except (KeyError, TypeError):
+        raise ValueError("The given object is not a state of an enumeration...")
+
+
+def load_checkpoint(checkpoint_path):
+    """Loads the state of an enumeration from a periodic checkpoint file.
+
+    Args:
+        checkpoint_path:    the file of the checkpoints
+
+    Returns:
+        dictionary:         the state of the enumeration (see resume_labeled_graphs)
+    """
+    with open(checkpoint_path, 'rb') as f:
+        return pickle.load(f)
+
+
+# the header of a packed labeling file: magic, version, edge labeling, bits per label, reserved, max_label, labels per
+# row, length of the traversal, count of the rows (the header is followed by the traversal and the rows)
+LABELING_FILE_HEADER = struct.Struct('<4sBBBBIIIQ')
+LABELING_FILE_MAGIC = b'TGLB'
+
+
+def label_bits(max_label):
+    """Returns the count of the bits of a packed label: ceil(log2(max_label)) (at least 1).
+
+    Args:
+        max_label:  an int that specifies the labeling alphabet's size
+
+    Returns:
+        int:        the count of the bits
+    """
+    return max(1, (max_label - 1).bit_length())
+
+
+def gen_row_packer(width, bits):
+    """Returns a function that packs a labeling into a row of a packed labeling file.
+
+    The labels are written as a big-endian bit stream (the first label's most significant bit first) and the row is
+    padded with zero bits to whole bytes, the same layout as the one of numpy.packbits.
+
+    Args:
+        width:      the count of the labels of a row
+        bits:       the count of the bits of a label
+
+    Returns:
+        function:   maps a labeling to a byte string
+    """
+    row_bytes = (width * bits + 7) // 8
+    if bits == 8:
+        return lambda labeling: bytes(bytearray(labeling))
+    if row_bytes == 0:
+        return lambda labeling: b''
+    pad = row_bytes * 8 - width * bits
+    fmt = '%%0%dx' % (2 * row_bytes)
+
+    def pack(labeling):
+        v = 0
+        for label in labeling:
+            v = (v << bits) | label
+        return binascii.unhexlify(fmt % (v << pad))
+    return pack
+
+
+def write_labelings(f, lst, max_label=2, edge_labeling=False, buffer_size=1 << 20):
+    """Writes all the given free-tree's vertex / edge labelings into a packed labeling file.
+
+    The header contains the balanced traversal (the labelings belong to it, see get_labeled_graphs) and max_label, it is
+    followed by the rows of the labelings: every label takes label_bits(max_label) bits, every row is padded to whole
+    bytes. The rows are collected in a buffer and written in bulk, the count of the rows is written into the header at
+    the end (therefore the file has to be seekable).
+
+    Args:
+        f:              a file object opened for binary writing
+        lst:            a list that contains a pre-order traversal of a free-tree
+        max_label:      an int that specifies the labeling alphabet's size
+        edge_labeling:  if this is set to true the function writes the edge labelings of the given tree (otherwise the
+                        vertex labelings)
+        buffer_size:    the size of the write buffer in bytes
+
+    Returns:
+        int:            the count of the written labelings
+    """
+    check_arguments(lst, max_label)
+    if type(buffer_size) is not int or buffer_size <= 0:
+        raise ValueError("buffer_size should be a positive integer...")
+    balanced = balanced_traversal(lst)
+    (width, bits) = (len(lst) - 1 if edge_labeling else len(lst), label_bits(max_label))
+
+    start = f.tell()
+    f.write(LABELING_FILE_HEADER.pack(LABELING_FILE_MAGIC, 1, edge_labeling, bits, 0, max_label, width, len(balanced),
+                                      0))
+    f.write(struct.pack('<%dI' % len(balanced), *balanced))
+    pack = gen_row_packer(width, bits)
+    buf = []
+    (buffered, count) = (0, 0)
+    for labeling in get_labeled_graphs(lst, max_label, edge_labeling, compact=True):
+        row = pack(labeling)
+        buf.append(row)
+        buffered += len(row)
+        count += 1
+        if buffered >= buffer_size:
+            f.write(b''.join(buf))
+            del buf[:]
+            buffered = 0
+    f.write(b''.join(buf))
+
+    end = f.tell()
+    f.seek(start)
+    f.write(LABELING_FILE_HEADER.pack(LABELING_FILE_MAGIC, 1, edge_labeling, bits, 0, max_label, width, len(balanced),
+                                      count))
+    f.seek(end)
+    return count
+
+
+class LabelingFile(object):
+    """Memory-mapped reader of a packed labeling file (see write_labelings).
+
+    The rows can be accessed randomly, the NumPy views of the rows share the memory of the file. Closing the reader
+    does not unmap the file: the mapping is released when the last view is garbage collected, so the views stay usable
+    (but the reader itself cannot be used after close).
+    """
+
+    __slots__ = ('f', 'mm', 'traversal', 'max_label', 'edge_labeling', 'bits', 'width', 'count', 'row_bytes',
+                 'offset')
+
+    def __init__(self, file_name):
+        """Opens and maps a packed labeling file.
+
+        Args:
+            file_name:  the name of the file
+        """
+        self.f = open(file_name, 'rb')
+        try:
+            header = self.f.read(LABELING_FILE_HEADER.size)
+            if len(header) != LABELING_FILE_HEADER.size:
+                raise ValueError("The given file is not a packed labeling file...")
+            (magic, version, edge_labeling, self.bits, _, self.max_label, self.width, length, self.count) = \
+                LABELING_FILE_HEADER.unpack(header)
+            if magic != LABELING_FILE_MAGIC or version != 1:
+                raise ValueError("The given file is not a packed labeling file...")
+            self.edge_labeling = bool(edge_labeling)
+            self.traversal = list(struct.unpack('<%dI' % length, self.f.read(4 * length)))
+            self.row_bytes = (self.width * self.bits + 7) // 8
+            self.offset = LABELING_FILE_HEADER.size + 4 * length
+            if os.fstat(self.f.fileno()).st_size < self.offset + self.count * self.row_bytes:
+                raise ValueError("The given packed labeling file is truncated...")
+            self.mm = mmap.mmap(self.f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, struct.error):
+            self.f.close()
+            raise
+
+    def __len__(self):
+        """Returns the count of the labelings."""
+        return self.count
+
+    def check_open(self):
+        """Raises ValueError if the reader has been closed."""
+        if self.mm is None:
+            raise ValueError("I/O operation on a closed labeling file...")
+
+    def __getitem__(self, index):
+        """Returns a labeling (tuple) of the file by its index."""
+        self.check_open()
+        if type(index) not in (int, long) or not -self.count <= index < self.count:
+            raise IndexError("labeling index out of range")
+        if index < 0:
+            index += self.count
+        start = self.offset + index * self.row_bytes
+        row = self.mm[start:start + self.row_bytes]
+        if self.bits == 8:
+            return tuple(bytearray(row))
+        v = int(binascii.hexlify(row), 16) >> (self.row_bytes * 8 - self.width * self.bits) if row else 0
+        mask = (1 << self.bits) - 1
+        labeling = [0] * self.width
+        for i in xrange(self.width - 1, -1, -1):
+            labeling[i] = v & mask
+            v >>= self.bits
+        return tuple(labeling)
+
+    def __iter__(self):
+        for index in xrange(self.count):
+            yield self[index]
+
+    def rows(self, start=0, stop=None):
+        """Returns a (rows, row bytes) uint8 NumPy view of the packed rows (it shares the memory of the file).
+
+        Args:
+            start:  the index of the first row
+            stop:   the end index of the rows (the count of the rows by default)
+        """
+        if np is None:
+            raise ImportError("rows requires NumPy...")
+        self.check_open()
+        (start, stop, _) = slice(start, stop).indices(self.count)
+        stop = max(start, stop)
+        if self.row_bytes == 0:
+            return np.zeros((stop - start, 0), dtype=np.uint8)
+        return np.frombuffer(self.mm, dtype=np.uint8, count=(stop - start) * self.row_bytes,
+                             offset=self.offset + start * self.row_bytes).reshape(stop - start, self.row_bytes)
+
+    def labels(self, start=0, stop=None):
+        """Returns a (rows, labeling length) NumPy array of the labelings.
+
+        If a label takes 8, 16 or 32 bits the array is a view that shares the memory of the file (with a big-endian
+        dtype for 16 and 32 bits), otherwise the rows are unpacked into a new array.
+
+        Args:
+            start:  the index of the first row
+            stop:   the end index of the rows (the count of the rows by default)
+        """
+        rows = self.rows(start, stop)
+        if self.bits in (8, 16, 32):
+            return rows.view('>u%d' % (self.bits // 8)) if self.width > 0 else rows
+        dtype = np.uint8 if self.bits <= 8 else np.uint16 if self.bits <= 16 else np.uint32
+        unpacked = np.unpackbits(rows, axis=1)[:, :self.width * self.bits].reshape(len(rows), self.width, self.bits)
+        weights = 1 << np.arange(self.bits - 1, -1, -1)
+        return unpacked.dot(weights).astype(dtype)
+
+    def close(self):
+        """Closes the file (the mapping is released together with the last NumPy view of the rows)."""
+        self.mm = None
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def balanced_traversal(lst):
+    """Returns the balanced pre-order traversal of a free-tree (see balance_tree_list).
+
+    Args:
+        lst:    a list that contains a pre-order traversal of a free-tree
+
+    Returns:
+        list:   the balanced traversal (the labelings of get_labeled_graphs belong to it)
+    """
+    return balance_tree_list(lst, find_center(lst)) if len(lst) > 2 else lst
+
+
+def traversal_from_children(children, root):
+    """Returns the pre-order traversal of a rooted tree that is given by the children of its nodes.
+
+    Args:
+        children:   a list that contains the list of the children of every node
+        root:       the root node
+
+    Returns:
+        list:       the pre-order traversal (the distances of the nodes from the root)
+    """
+    lst = []
+    stack = [(root, 0)]
+    while stack:
+        (n, distance) = stack.pop()
+        lst.append(distance)
+        stack.extend((c, distance + 1) for c in reversed(children[n]))
+    return lst
+
+
+def is_node_index(value):
+    """Determines whether the given value can be the index of a node (an int, a long or a NumPy integer, not a bool).
+
+    Args:
+        value:  the value to check
+
+    Returns:
+        bool:   the value is an integer or not
+    """
+    return isinstance(value, numbers.Integral) and not isinstance(value, bool)
+
+
+def traversal_from_parents(parents):
+    """Converts a parent array to the balanced pre-order traversal of the tree in linear time.
+
+    Args:
+        parents:    a list that contains the parent of every node (-1 for the root node)
+
+    Returns:
+        list:       the balanced pre-order traversal of the tree
+    """
+    n = len(parents)
+    if n == 0:
+        raise ValueError("The parent array should contain at least one node...")
+    children = [[] for _ in xrange(n)]
+    roots = []
+    for (i, p) in enumerate(parents):
+        if not is_node_index(p) or not -1 <= p < n or p == i:
+            raise ValueError("The parent of every node should be another node or -1...")
+        if p < 0:
+            roots.append(i)
+        else:
+            children[p].append(i)
+    lst = traversal_from_children(children, roots[0]) if len(roots) == 1 else []
+    # a cycle is not reached from the root
+    if len(lst) != n:
+        raise ValueError("The parent array should contain a tree that has exactly one root...")
+    return balanced_traversal(lst)
+
+
+def traversal_from_edges(edges, n=None):
+    """Converts an edge list to the balanced pre-order traversal of the tree in linear time.
+
+    Args:
+        edges:  a list of (node, node) pairs, the nodes are 0..n - 1
+        n:      the count of the nodes (len(edges) + 1 by default)
+
+    Returns:
+        list:   the balanced pre-order traversal of the tree
+    """
+    if n is None:
+        n = len(edges) + 1
+    if n <= 0 or len(edges) != n - 1:
+        raise ValueError("A tree with n nodes should have n - 1 edges...")
+    adjacent = [[] for _ in xrange(n)]
+    for edge in edges:
+        if len(edge) != 2 or any(not is_node_index(v) or not 0 <= v < n for v in edge):
+            raise ValueError("Every edge should be a pair of nodes from 0..n - 1...")
+        (u, v) = edge
+        adjacent[u].append(v)
+        adjacent[v].append(u)
+
+    # n - 1 edges => the graph is a tree iff it is connected
+    children = [[] for _ in xrange(n)]
+    visited = bytearray(n)
+    visited[0] = 1
+    stack = [0]
+    while stack:
+        u = stack.pop()
+        for v in adjacent[u]:
+            if not visited[v]:
+                visited[v] = 1
+                children[u].append(v)
+                stack.append(v)
+    if not all(visited):
+        raise ValueError("The edges should form a tree...")
+    return balanced_traversal(traversal_from_children(children, 0))
+
+
+def traversal_from_pruefer(sequence):
+    """Converts a Prüfer sequence to the balanced pre-order traversal of the tree in linear time.
+
+    Args:
+        sequence:   a list that contains the Prüfer sequence of a tree with len(sequence) + 2 nodes (0..n - 1)
+
+    Returns:
+        list:       the balanced pre-order traversal of the tree
+    """
+    n = len(sequence) + 2
+    if any(not is_node_index(v) or not 0 <= v < n for v in sequence):
+        raise ValueError("The Prüfer sequence should contain nodes from 0..len(sequence) + 1...")
+    degree = [1] * n
+    for v in sequence:
+        degree[v] += 1
+
+    # the smallest leaf is found by a pointer that only moves forward (and by the new leaves that are smaller)
+    edges = []
+    ptr = degree.index(1)
+    leaf = ptr
+    for v in sequence:
+        edges.append((leaf, v))
+        degree[v] -= 1
+        if degree[v] == 1 and v < ptr:
+            leaf = v
+        else:
+            ptr += 1
+            while degree[ptr] != 1:
+                ptr += 1
+            leaf = ptr
+    edges.append((leaf, n - 1))
+    return traversal_from_edges(edges, n)
+
+
+def is_proper_traversal_array(arr):
+    """Determines whether the given NumPy array is a valid nonempty pre-order traversal of a tree (vectorized).
+
+    Unlike is_proper_traversal, only the first node can be at distance 0 (the array contains a single tree).
+
+    Args:
+        arr:    a one-dimensional NumPy array
+
+    Returns:
+        bool:   the given array is valid or not
+    """
+    if np is None:
+        raise ImportError("is_proper_traversal_array requires NumPy...")
+    arr = np.asarray(arr)
+    if arr.ndim != 1 or len(arr) == 0 or arr.dtype.kind not in 'iu' or arr[0] != 0:
+        return False
+    # arr[i + 1] - 1 <= arr[i] instead of the difference (the difference of unsigned integers wraps around)
+    return len(arr) == 1 or bool(arr[1:].min() >= 1 and (arr[1:] - 1 <= arr[:-1]).all())
+
+
+def traversal_from_edge_values(values):
+    """Converts the nodes of an edge list (pairwise, in a flat list) to the balanced pre-order traversal of the tree.
+
+    Args:
+        values:     a list that contains the two nodes of every edge after each other
+
+    Returns:
+        list:       the balanced pre-order traversal of the tree (see traversal_from_edges)
+    """
+    if len(values) % 2 != 0:
+        raise ValueError("The edge list should contain pairs of nodes...")
+    return traversal_from_edges(zip(values[::2], values[1::2]))
+
+
+# the converters of the tree formats of read_trees
+TREE_FORMATS = {
+    'traversal': balanced_traversal,
+    'parents': traversal_from_parents,
+    'edges': traversal_from_edge_values,
+    'pruefer': traversal_from_pruefer,
+}
+
+
+def read_trees(f, fmt='traversal'):
+    """Reads the trees of a file one by one (the file is never loaded into the memory as a whole).
+
+    Every line contains a tree: its values are separated by commas and / or whitespaces. The empty lines and the lines
+    that start with # are skipped.
+
+    Args:
+        f:      an iterable of lines (e.g. a file object)
+        fmt:    the format of the trees: 'traversal' (a pre-order traversal), 'parents' (a parent array), 'edges'
+                (the nodes of the edges, pairwise) or 'pruefer' (a Prüfer sequence)
+
+    Yields:
+        list:   the balanced pre-order traversal of the next tree
+    """
+    convert = TREE_FORMATS.get(fmt)
+    if convert is None:
+        raise ValueError("fmt should be one of %s..." % ", ".join(sorted(TREE_FORMATS)))
+    for (line_no, line) in enumerate(f, 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        try:
+            values = [int(v) for v in line.replace(',', ' ').split()]
+            if fmt == 'traversal' and (not is_proper_traversal(values) or 0 in values[1:]):
+                raise ValueError("The line does not contain a valid pre-order traversal...")
+            yield convert(values)
+        except ValueError as e:
+            raise ValueError("line %d: %s" % (line_no, e))
+
+
+def main(argv=None, stream=None):
+    """Writes all the labelings of a free-tree into a packed labeling file (see write_labelings).
+
+    Args:
+        argv:   the command-line arguments (sys.argv[1:] by default)
+        stream: the stream of the report of the written labelings (sys.stderr by default)
+
+    Returns:
+        int:    the exit code
+    """
+    parser = argparse.ArgumentParser(description="Writes all the labelings of a free-tree into a packed labeling "
+                                                 "file.")
+    parser.add_argument('traversal', help="a pre-order traversal of the free-tree (comma separated distances)")
+    parser.add_argument('output', help="the name of the packed labeling file")
+    parser.add_argument('-m', '--max-label', type=int, default=2, help="the size of the labeling alphabet")
+    parser.add_argument('-e', '--edge-labeling', action='store_true', help="write the edge labelings")
+    parser.add_argument('-b', '--buffer-size', type=int, default=1 << 20, help="the size of the write buffer")
+    args = parser.parse_args(argv)
+    try:
+        lst = [int(d) for d in args.traversal.split(',')]
+    except ValueError:
+        parser.error("the traversal should contain comma separated integers")
+
+    # the labelings are written into a temporary file first, so a failed run does not clobber an existing output
+    (fd, name) = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(args.output)))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            count = write_labelings(f, lst, args.max_label, args.edge_labeling, args.buffer_size)
+        os.rename(name, args.output)
+    except BaseException as e:
+        os.remove(name)
+        if isinstance(e, ValueError):
+            parser.error(str(e))
+        raise
+    (stream or sys.stderr).write("%d labelings written into %s\n" % (count, args.output))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())